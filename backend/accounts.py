@@ -0,0 +1,133 @@
+"""
+Read-only per-wallet handles for monitoring many accounts at once.
+
+Handles are cheap: they hold only a wallet address and API base URL and
+share the registry's HTTP session, a short-lived response cache and one
+rate governor. ``fan_out`` runs a per-wallet call for many wallets
+concurrently under a concurrency cap, so an aggregated view takes roughly
+as long as the slowest account instead of the sum of all of them.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from metrics import metrics
+
+class RateGovernor:
+    """Caps concurrent upstream calls and smooths them to a steady request rate"""
+
+    def __init__(self, max_concurrency: int = 8, rate_per_second: float = 15.0):
+        self.max_concurrency = max_concurrency
+        self.rate_per_second = rate_per_second
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tokens = rate_per_second
+        self._updated = time.monotonic()
+        self._token_lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self._take_token()
+        async with self._semaphore:
+            yield
+
+    async def _take_token(self):
+        async with self._token_lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.rate_per_second,
+                    self._tokens + (now - self._updated) * self.rate_per_second
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate_per_second)
+
+class ResponseCache:
+    """Tiny TTL cache for info responses shared by all account handles"""
+
+    def __init__(self, ttl: float = 2.0, max_entries: int = 2048):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple, Tuple[float, Any]] = {}
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            metrics.record_cache("account_info", True)
+            return entry[1]
+        metrics.record_cache("account_info", False)
+        return None
+
+    def put(self, key: Tuple, value: Any):
+        if len(self._entries) >= self.max_entries:
+            now = time.monotonic()
+            self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+
+class AccountHandle:
+    """Read-only view of one wallet on the shared transport"""
+
+    def __init__(self, wallet_address: str, base_url: str, session: requests.Session,
+                 governor: RateGovernor, cache: ResponseCache):
+        self.wallet_address = wallet_address
+        self.base_url = base_url
+        self.session = session
+        self.governor = governor
+        self.cache = cache
+
+    async def user_state(self) -> Dict[str, Any]:
+        return await self._info("clearinghouseState")
+
+    async def spot_state(self) -> Dict[str, Any]:
+        return await self._info("spotClearinghouseState")
+
+    async def open_orders(self) -> List[Dict[str, Any]]:
+        return await self._info("openOrders")
+
+    async def user_fills(self) -> List[Dict[str, Any]]:
+        return await self._info("userFills")
+
+    async def _info(self, info_type: str) -> Any:
+        key = (self.base_url, info_type, self.wallet_address)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        async with self.governor.slot():
+            data = await asyncio.to_thread(self._post, info_type)
+        self.cache.put(key, data)
+        return data
+
+    def _post(self, info_type: str) -> Any:
+        with metrics.track_upstream(info_type):
+            response = self.session.post(
+                f"{self.base_url}/info",
+                json={"type": info_type, "user": self.wallet_address},
+                timeout=10
+            )
+            response.raise_for_status()
+            return response.json()
+
+async def fan_out(handles: List[AccountHandle], call: Callable[[AccountHandle], Awaitable[Any]],
+                  max_concurrency: int) -> Dict[str, Dict[str, Any]]:
+    """Run ``call`` for every handle concurrently; errors are reported per wallet"""
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run(handle: AccountHandle) -> Tuple[str, Dict[str, Any]]:
+        async with semaphore:
+            try:
+                return handle.wallet_address, {"data": await call(handle)}
+            except Exception as e:
+                print(f"Account fan-out failed for {handle.wallet_address}: {e}")
+                return handle.wallet_address, {"error": str(e)}
+
+    results = await asyncio.gather(*(run(handle) for handle in handles))
+    return dict(results)
@@ -0,0 +1,113 @@
+"""
+Benchmark of upstream payload decoding.
+
+Compares the previous per-row parsers (stdlib JSON, ``float()``/``.get()``
+per field, a model per row) with ``hl_decode`` on synthetic payloads sized
+like a large universe, a long candle snapshot and a deep fill history.
+
+    cd backend && python bench_decoding.py [iterations]
+"""
+
+import json
+import random
+import sys
+import os
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from hl_decode import loads, decode_candles, decode_fills, decode_meta_and_asset_ctxs
+from models import CandlestickData
+
+def time_call(call, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        call()
+    return (time.perf_counter() - start) / iterations * 1e3
+
+def make_payloads():
+    universe = [{"name": f"COIN{i}", "szDecimals": i % 6, "maxLeverage": 3 + i % 47} for i in range(400)]
+    ctxs = [{
+        "markPx": f"{random.uniform(0.001, 1e5):.5f}", "midPx": f"{random.uniform(0.001, 1e5):.5f}",
+        "oraclePx": f"{random.uniform(0.001, 1e5):.5f}", "prevDayPx": f"{random.uniform(0.001, 1e5):.5f}",
+        "dayNtlVlm": f"{random.uniform(0, 1e9):.2f}", "funding": f"{random.uniform(-1e-4, 1e-4):.8f}",
+        "openInterest": f"{random.uniform(0, 1e7):.2f}"
+    } for _ in universe]
+    candles = [{
+        "t": 1700000000000 + i * 60000, "T": 1700000059999 + i * 60000, "s": "BTC", "i": "1m",
+        "o": f"{random.uniform(1e4, 1e5):.1f}", "h": f"{random.uniform(1e4, 1e5):.1f}",
+        "l": f"{random.uniform(1e4, 1e5):.1f}", "c": f"{random.uniform(1e4, 1e5):.1f}",
+        "v": f"{random.uniform(0, 100):.5f}", "n": random.randint(1, 500)
+    } for i in range(5000)]
+    fills = [{
+        "coin": random.choice(["BTC", "ETH", "SOL"]), "px": f"{random.uniform(1, 1e5):.2f}",
+        "sz": f"{random.random():.4f}", "side": random.choice("AB"), "time": 1700000000000 + i,
+        "startPosition": "0.0", "dir": "Open Long", "closedPnl": "0.0", "hash": "0x" + "ab" * 32,
+        "oid": i, "crossed": True, "fee": "0.01", "tid": i * 7, "feeToken": "USDC"
+    } for i in range(20000)]
+    return (
+        json.dumps([{"universe": universe}, ctxs]).encode(),
+        json.dumps(candles).encode(),
+        json.dumps(fills).encode()
+    )
+
+def legacy_universe(raw: bytes):
+    meta, ctxs = json.loads(raw)
+    return [
+        (asset.get("name"), int(asset.get("szDecimals", 0)), int(asset.get("maxLeverage", 1)),
+         asset.get("isDelisted", False), float(ctx.get("markPx", 0)), float(ctx.get("prevDayPx", 0)),
+         float(ctx.get("dayNtlVlm", 0)), float(ctx.get("funding", 0)), float(ctx.get("openInterest", 0)))
+        for asset, ctx in zip(meta["universe"], ctxs)
+    ]
+
+def legacy_candles(raw: bytes, limit: int):
+    candlesticks = []
+    for candle in json.loads(raw):
+        candlesticks.append(CandlestickData(
+            coin="BTC", timestamp=datetime.fromtimestamp(candle["t"] / 1000),
+            open=float(candle["o"]), high=float(candle["h"]), low=float(candle["l"]),
+            close=float(candle["c"]), volume=float(candle.get("v", 0))
+        ))
+    return candlesticks[-limit:]
+
+def decoded_candles(raw: bytes, limit: int):
+    candles = decode_candles(loads(raw))
+    first = max(0, len(candles.open_time) - limit)
+    return [
+        CandlestickData(coin="BTC", timestamp=datetime.fromtimestamp(t / 1000),
+                        open=o, high=h, low=l, close=c, volume=v)
+        for t, o, h, l, c, v in zip(
+            candles.open_time[first:].tolist(), candles.open[first:].tolist(),
+            candles.high[first:].tolist(), candles.low[first:].tolist(),
+            candles.close[first:].tolist(), candles.volume[first:].tolist()
+        )
+    ]
+
+def legacy_fills(raw: bytes):
+    return [
+        (fill.get("coin"), float(fill["px"]), float(fill["sz"]), fill.get("side") == "B",
+         fill.get("time", 0), fill.get("oid"), fill.get("tid"),
+         float(fill.get("closedPnl", 0)), float(fill.get("fee", 0)))
+        for fill in json.loads(raw)
+    ]
+
+def main(iterations: int):
+    universe_raw, candles_raw, fills_raw = make_payloads()
+    cases = [
+        ("metaAndAssetCtxs (400 assets)", lambda: legacy_universe(universe_raw),
+         lambda: decode_meta_and_asset_ctxs(loads(universe_raw))),
+        ("candleSnapshot (5000, return 500)", lambda: legacy_candles(candles_raw, 500),
+         lambda: decoded_candles(candles_raw, 500)),
+        ("userFills (20000)", lambda: legacy_fills(fills_raw),
+         lambda: decode_fills(loads(fills_raw))),
+    ]
+
+    print(f"{'payload':<36}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name, before_call, after_call in cases:
+        before = time_call(before_call, iterations)
+        after = time_call(after_call, iterations)
+        print(f"{name:<36}{before:>12.2f}{after:>12.2f}{before / after:>9.1f}x")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,78 @@
+"""
+Benchmark of per-route response serialization cost.
+
+Compares the previous path (``.dict()`` on every model, ``APIResponse``
+validation against ``response_model``, ``jsonable_encoder`` and
+``JSONResponse``) with ``fast_json`` for representative payloads of the
+busiest routes. Uses mock data, so it needs no network or database.
+
+    cd backend && python bench_serialization.py [iterations]
+"""
+
+import asyncio
+import sys
+import os
+import time
+import warnings
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from fast_json import CachedPayload, FastJSONResponse, api_response
+from hyperliquid_service import HyperliquidService
+from models import APIResponse
+
+# The legacy path uses the deprecated .dict() on purpose
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+response_field = create_response_field(name="response", type_=APIResponse)
+
+async def legacy_body(data_dict) -> bytes:
+    """Serialization as the routes did it before fast_json"""
+    content = await serialize_response(
+        field=response_field,
+        response_content=APIResponse(success=True, message="ok", data=data_dict())
+    )
+    return JSONResponse(content).body
+
+def fast_body(data) -> bytes:
+    return api_response(success=True, message="ok", data=data).body
+
+async def time_call(call, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        result = call()
+        if asyncio.iscoroutine(result):
+            await result
+    return (time.perf_counter() - start) / iterations * 1e6
+
+async def main(iterations: int):
+    service = HyperliquidService(wallet_address="", api_key="", api_secret="")
+    portfolio = service._generate_mock_portfolio()
+    orders = service._generate_mock_orders(100)
+    candles = service._generate_mock_candlestick_data("BTC", 500)
+    order_book = service._generate_mock_order_book("BTC")
+    coins = [{"symbol": f"COIN{i}", "name": f"Coin {i}", "maxLeverage": 10} for i in range(200)]
+    coins_payload = CachedPayload(ttl=300)
+    coins_payload.set(APIResponse.model_construct(success=True, message="ok", data=coins))
+
+    routes = [
+        ("/api/portfolio", lambda: portfolio.dict(), portfolio, None),
+        ("/api/orders/open (100)", lambda: [o.dict() for o in orders], orders, None),
+        ("/api/market/BTC/candles (500)", lambda: [c.dict() for c in candles], candles, None),
+        ("/api/market/BTC/orderbook", lambda: order_book.dict(), order_book, None),
+        ("/api/coins (200)", lambda: coins, coins, lambda: FastJSONResponse(coins_payload.get()).body),
+    ]
+
+    print(f"{'route':<32}{'before us':>12}{'after us':>12}{'speedup':>10}{'cached us':>12}")
+    for name, data_dict, data, cached in routes:
+        before = await time_call(lambda: legacy_body(data_dict), iterations)
+        after = await time_call(lambda: fast_body(data), iterations)
+        cached_us = f"{await time_call(cached, iterations):>12.1f}" if cached else f"{'-':>12}"
+        print(f"{name:<32}{before:>12.1f}{after:>12.1f}{before / after:>9.1f}x{cached_us}")
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
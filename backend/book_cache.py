@@ -0,0 +1,96 @@
+"""
+Cached order books for pricing market orders.
+
+Hyperliquid has no true market order: a market order is an IOC limit priced
+aggressively enough to cross the book. Fetching ``l2Book`` before signing
+would add a round trip, so books are kept in memory instead, from the
+``l2Book`` WebSocket stream (subscribed the first time a coin is tracked)
+and from any REST snapshot the app fetched anyway.
+
+The limit price is sized to the order: it is the price of the level where
+the order's size is fully filled, walking the cached levels, plus a small
+buffer for book movement. It never goes further than the maximum slippage
+from the best price. Whatever cannot fill within that bound is cancelled by
+IOC, so a market order completes in one round trip with bounded slippage.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional, Set
+
+import numpy as np
+
+from hl_decode import decode_l2_book
+
+class TopOfBook(NamedTuple):
+    coin: str
+    received_at: float
+    # Best price first
+    bid_px: np.ndarray
+    bid_sz: np.ndarray
+    ask_px: np.ndarray
+    ask_sz: np.ndarray
+
+    def age(self) -> float:
+        return time.time() - self.received_at
+
+    def sweep_price(self, is_buy: bool, size: float) -> Optional[float]:
+        """Worst price needed to fill size against the cached levels (deepest level if too thin)"""
+        px, sz = (self.ask_px, self.ask_sz) if is_buy else (self.bid_px, self.bid_sz)
+        if not len(px):
+            return None
+        level = int(np.searchsorted(np.cumsum(sz), size))
+        return float(px[min(level, len(px) - 1)])
+
+def marketable_price(book: TopOfBook, is_buy: bool, size: float,
+                     max_slippage: float, buffer: float) -> float:
+    """IOC limit price that sweeps size through the book, bounded by max_slippage from the best price"""
+    sweep = book.sweep_price(is_buy, size)
+    if sweep is None:
+        raise ValueError(f"No {'asks' if is_buy else 'bids'} in the {book.coin} book to fill a market order")
+    if is_buy:
+        return min(sweep * (1 + buffer), float(book.ask_px[0]) * (1 + max_slippage))
+    return max(sweep * (1 - buffer), float(book.bid_px[0]) * (1 - max_slippage))
+
+class BookCache:
+    """Latest book per coin of one API base URL"""
+
+    def __init__(self, stream_info: Optional[Callable[[], Any]] = None, depth: int = 20):
+        # Returns an SDK Info with its WebSocket running; None disables streaming
+        self.stream_info = stream_info
+        self.depth = depth
+        self._books: Dict[str, TopOfBook] = {}
+        self._tracked: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def update(self, payload: Dict[str, Any]) -> TopOfBook:
+        """Store an l2Book snapshot (REST response or stream message data)"""
+        l2 = decode_l2_book(payload)
+        depth = self.depth
+        book = TopOfBook(
+            l2.coin, time.time(),
+            l2.bid_px[:depth], l2.bid_sz[:depth], l2.ask_px[:depth], l2.ask_sz[:depth]
+        )
+        # A single dict store, so stream callbacks can call this from the SDK thread
+        self._books[book.coin] = book
+        return book
+
+    def get(self, coin: str, max_age: float) -> Optional[TopOfBook]:
+        book = self._books.get(coin)
+        if book is None or book.age() > max_age:
+            return None
+        return book
+
+    def track(self, coin: str) -> bool:
+        """Keep the coin's book current from the l2Book stream; returns True once subscribed (blocking)"""
+        if self.stream_info is None:
+            return False
+        with self._lock:
+            if coin in self._tracked:
+                return True
+            self.stream_info().subscribe(
+                {"type": "l2Book", "coin": coin},
+                lambda message: self.update(message.get("data") or {})
+            )
+            self._tracked.add(coin)
+            return True
@@ -0,0 +1,167 @@
+"""
+Per-endpoint circuit breakers with last-good snapshots.
+
+Each upstream endpoint (an info type, or the exchange) has its own breaker.
+After ``failure_threshold`` consecutive failures or timeouts the circuit
+opens for a jittered, exponentially growing backoff. While it is open,
+calls are not attempted at all. Once the backoff expires, a single probe is
+let through: it closes the circuit on success or reopens it for longer on
+failure.
+
+Reads go through ``UpstreamGuard.call``, which keeps the last good value per
+key. When the circuit is open or the call fails, that value is returned as
+a ``Snapshot`` marked stale with its age. Only when there is no snapshot at
+all does the caller get ``UpstreamUnavailable``. Outages therefore cost at
+most one timeout per backoff period, and are never papered over with
+invented data.
+"""
+
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Hashable, NamedTuple
+
+from metrics import metrics
+
+circuit_open = metrics.gauge(
+    "hypertrader_circuit_open", "1 while the endpoint's circuit breaker is open", ("endpoint",))
+stale_responses = metrics.counter(
+    "hypertrader_stale_responses_total", "Responses served from a last-good snapshot", ("endpoint",))
+
+class UpstreamUnavailable(Exception):
+    """The upstream is failing and there is no snapshot to serve instead"""
+
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(f"Hyperliquid {endpoint} is unavailable; retry in {retry_after:.0f}s")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    def __init__(self, endpoint: str, failure_threshold: int = 3,
+                 base_backoff: float = 1.0, max_backoff: float = 60.0):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self.opened = 0  # Consecutive times opened, drives the backoff exponent
+        self.retry_at = 0.0
+        self.probing = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.failures >= self.failure_threshold
+
+    def retry_after(self) -> float:
+        return max(0.0, self.retry_at - time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now; once the backoff expires, lets one probe through"""
+        if not self.is_open:
+            return True
+        if self.probing or time.monotonic() < self.retry_at:
+            return False
+        self.probing = True
+        return True
+
+    def record_success(self):
+        if self.is_open:
+            print(f"Circuit for {self.endpoint} closed")
+        self.failures = 0
+        self.opened = 0
+        self.probing = False
+        circuit_open.set(self.endpoint, value=0)
+
+    def record_failure(self):
+        self.failures += 1
+        self.probing = False
+        if self.is_open:
+            # Equal jitter: half the backoff fixed, half random, so clients do not retry in lockstep
+            backoff = min(self.max_backoff, self.base_backoff * 2 ** self.opened)
+            self.retry_at = time.monotonic() + backoff / 2 + random.uniform(0, backoff / 2)
+            self.opened += 1
+            circuit_open.set(self.endpoint, value=1)
+            print(f"Circuit for {self.endpoint} open, retrying in {self.retry_after():.1f}s")
+
+class Snapshot(NamedTuple):
+    value: Any
+    fetched_at: float  # time.time() of the upstream response
+    stale: bool = False
+
+    @property
+    def age(self) -> float:
+        return max(0.0, time.time() - self.fetched_at)
+
+class UpstreamGuard:
+    """Breakers per endpoint plus the last good snapshot per key, shared by all services"""
+
+    def __init__(self, timeout: float = 5.0, failure_threshold: int = 3,
+                 base_backoff: float = 1.0, max_backoff: float = 60.0, max_snapshots: int = 4096):
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_snapshots = max_snapshots
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._snapshots: Dict[Hashable, Snapshot] = {}
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            breaker = self._breakers[endpoint] = CircuitBreaker(
+                endpoint, self.failure_threshold, self.base_backoff, self.max_backoff
+            )
+        return breaker
+
+    async def call(self, endpoint: str, key: Hashable, fetch: Callable[[], Any]) -> Snapshot:
+        """Run a blocking fetch off the loop under the endpoint's breaker and timeout.
+
+        Returns a fresh snapshot on success, otherwise the last good one marked
+        stale; raises UpstreamUnavailable when there is none.
+        """
+        breaker = self.breaker(endpoint)
+        if breaker.allow():
+            try:
+                value = await asyncio.wait_for(asyncio.to_thread(fetch), self.timeout)
+            except asyncio.CancelledError:
+                breaker.probing = False
+                raise
+            except Exception as e:
+                breaker.record_failure()
+                print(f"Upstream {endpoint} failed: {e!r}")
+            else:
+                breaker.record_success()
+                snapshot = Snapshot(value, time.time())
+                self._store(key, snapshot)
+                return snapshot
+
+        snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            raise UpstreamUnavailable(endpoint, breaker.retry_after())
+        stale_responses.inc(endpoint)
+        return snapshot._replace(stale=True)
+
+    @asynccontextmanager
+    async def guard(self, endpoint: str):
+        """Fail fast while the endpoint's circuit is open and record the outcome of the block"""
+        breaker = self.breaker(endpoint)
+        if not breaker.allow():
+            raise UpstreamUnavailable(endpoint, breaker.retry_after())
+        try:
+            yield
+        except asyncio.CancelledError:
+            # The caller went away (e.g. the client disconnected); that says nothing about the upstream
+            breaker.probing = False
+            raise
+        except BaseException:
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+
+    def _store(self, key: Hashable, snapshot: Snapshot):
+        if len(self._snapshots) >= self.max_snapshots and key not in self._snapshots:
+            # Drop the oldest snapshot
+            oldest = min(self._snapshots, key=lambda k: self._snapshots[k].fetched_at)
+            del self._snapshots[oldest]
+        self._snapshots[key] = snapshot
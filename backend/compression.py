@@ -0,0 +1,277 @@
+"""
+Negotiated response compression for the API and /api/ws.
+
+``CompressionMiddleware`` compresses HTTP responses with brotli (when the
+``brotli`` package is installed) or gzip, whichever the client's
+``Accept-Encoding`` prefers. Bodies under ``minimum_size`` are sent as-is,
+since compressing them saves little and costs a header. Streaming responses
+are compressed chunk by chunk with a flush after each chunk, so they are
+never buffered whole.
+
+Responses that carry a strong ``ETag`` (coins, strategies, candles; see
+``http_cache``) have their compressed bodies cached by a digest of the body
+bytes and the encoding. The ETag only marks a body as worth caching: it may
+cover less than the body (the candles ETag ignores the ``stale`` and
+``age_seconds`` envelope), so it is never the key. A hot payload is then
+compressed once, at a higher level and off the event loop, and every later
+request for the same bytes reuses them. Compressed responses get a weak
+ETag. Every response that could have been compressed gets ``Vary:
+Accept-Encoding``, whether or not this one was (small body, client without
+gzip or brotli), so shared caches never hand one client's variant to
+another.
+
+WebSocket clients opt in with ``?compress=gzip``. Messages over the size
+threshold are then sent as gzip binary frames (starting with ``1f 8b``),
+compressed once per broadcast rather than once per client.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from metrics import metrics
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+compressed_responses = metrics.counter(
+    "hypertrader_compressed_responses_total", "HTTP responses sent compressed", ("encoding", "source"))
+compression_bytes = metrics.counter(
+    "hypertrader_compression_bytes_total", "Bytes before and after response compression", ("stage",))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+
+# Bodies at least this large are compressed off the event loop
+OFFLOAD_SIZE = 256 * 1024
+
+def supported_encodings() -> Tuple[str, ...]:
+    """Encodings this process can produce, in server preference order"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Pick the encoding for an Accept-Encoding header; None means identity"""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        if name:
+            weights[name.strip()] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in supported_encodings():
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+def compressible(start_message: dict) -> bool:
+    """Whether a response's body would be compressed for a client accepting gzip"""
+    status = start_message["status"]
+    headers = Headers(raw=start_message["headers"])
+    if status < 200 or status in (204, 206, 304) or "content-encoding" in headers:
+        return False
+    return headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+
+def negotiable(start_message: dict) -> bool:
+    """Whether the response depends on Accept-Encoding; a 304 stands in for its full response"""
+    if start_message["status"] == 304:
+        return "content-encoding" not in Headers(raw=start_message["headers"])
+    return compressible(start_message)
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    """One-shot compression; level is the gzip level (1-9) or brotli quality (0-11)"""
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+class StreamCompressor:
+    """Incremental compressor whose every chunk is decodable as soon as it arrives"""
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=level)
+        else:
+            # wbits 31: deflate with a gzip header and trailer
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+def body_digest(body: bytes) -> bytes:
+    return hashlib.blake2b(body, digest_size=16).digest()
+
+class CompressedBodyCache:
+    """Compressed bodies keyed by (digest of the uncompressed body, encoding), least recently used evicted first"""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._bodies: "OrderedDict[Tuple[bytes, str], bytes]" = OrderedDict()
+
+    def get(self, digest: bytes, encoding: str) -> Optional[bytes]:
+        body = self._bodies.get((digest, encoding))
+        if body is not None:
+            self._bodies.move_to_end((digest, encoding))
+        metrics.record_cache("compressed_bodies", body is not None)
+        return body
+
+    def put(self, digest: bytes, encoding: str, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        previous = self._bodies.pop((digest, encoding), None)
+        if previous is not None:
+            self.size -= len(previous)
+        self._bodies[(digest, encoding)] = body
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, evicted = self._bodies.popitem(last=False)
+            self.size -= len(evicted)
+
+class CompressionMiddleware:
+    """ASGI middleware compressing HTTP responses (see module docstring)"""
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4,
+                 cached_gzip_level: int = 9, cached_brotli_quality: int = 9,
+                 cache_max_bytes: int = 32 * 1024 * 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {"gzip": gzip_level, "br": brotli_quality}
+        # Cached bodies are compressed once, so they can afford a denser setting
+        self.cached_levels = {"gzip": cached_gzip_level, "br": cached_brotli_quality}
+        self.cache = CompressedBodyCache(cache_max_bytes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        await _CompressedResponder(self, encoding, send).run(scope, receive)
+
+class _CompressedResponder:
+    """Per-request state: buffers the start message until the first body decides how to send"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: Optional[str], send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start_message: Optional[dict] = None
+        self.buffered: List[bytes] = []
+        self.buffered_size = 0
+        self.mode = "pending"  # pending, identity or stream
+        self.compressor: Optional[StreamCompressor] = None
+
+    async def run(self, scope, receive):
+        await self.middleware.app(scope, receive, self.send_wrapper)
+
+    async def send_wrapper(self, message: dict):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.mode == "identity":
+            await self.send(message)
+        elif self.mode == "stream":
+            await self._send_stream_chunk(body, more_body)
+        elif self.encoding is None or not compressible(self.start_message):
+            self.mode = "identity"
+            await self._send_identity_start()
+            await self.send(message)
+        else:
+            self.buffered.append(body)
+            self.buffered_size += len(body)
+            if not more_body:
+                await self._send_whole(b"".join(self.buffered))
+            elif self.buffered_size >= self.middleware.minimum_size:
+                # Large streaming body: compress as it goes instead of buffering it all
+                self.mode = "stream"
+                self.compressor = StreamCompressor(self.encoding, self.middleware.levels[self.encoding])
+                headers = self._compressed_headers()
+                del headers["content-length"]
+                await self.send(self.start_message)
+                chunk, self.buffered = b"".join(self.buffered), []
+                await self._send_stream_chunk(chunk, True)
+
+    async def _send_identity_start(self):
+        if negotiable(self.start_message):
+            MutableHeaders(raw=self.start_message["headers"]).add_vary_header("Accept-Encoding")
+        await self.send(self.start_message)
+
+    def _compressed_headers(self) -> MutableHeaders:
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+        return headers
+
+    async def _send_whole(self, body: bytes):
+        middleware = self.middleware
+        if len(body) < middleware.minimum_size:
+            await self._send_identity_start()
+            await self.send({"type": "http.response.body", "body": body})
+            return
+
+        etag = Headers(raw=self.start_message["headers"]).get("etag")
+        cacheable = etag is not None and not etag.startswith("W/")
+        digest = body_digest(body) if cacheable else None
+        compressed = middleware.cache.get(digest, self.encoding) if cacheable else None
+        source = "cache"
+        if compressed is None:
+            level = (middleware.cached_levels if cacheable else middleware.levels)[self.encoding]
+            # The dense cached levels cost milliseconds even on small bodies
+            if cacheable or len(body) >= OFFLOAD_SIZE:
+                compressed = await asyncio.to_thread(compress, body, self.encoding, level)
+            else:
+                compressed = compress(body, self.encoding, level)
+            if cacheable:
+                middleware.cache.put(digest, self.encoding, compressed)
+            source = "fresh"
+
+        headers = self._compressed_headers()
+        headers["Content-Length"] = str(len(compressed))
+        compressed_responses.inc(self.encoding, source)
+        compression_bytes.inc("in", amount=len(body))
+        compression_bytes.inc("out", amount=len(compressed))
+        await self.send(self.start_message)
+        await self.send({"type": "http.response.body", "body": compressed})
+
+    async def _send_stream_chunk(self, body: bytes, more_body: bool):
+        data = self.compressor.compress(body) if body else b""
+        if not more_body:
+            data += self.compressor.finish()
+            compressed_responses.inc(self.encoding, "stream")
+        compression_bytes.inc("in", amount=len(body))
+        compression_bytes.inc("out", amount=len(data))
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+def websocket_compression(requested: Optional[str]) -> Optional[str]:
+    """Compression for a WebSocket client's ?compress= parameter; gzip only, as browsers can inflate it natively"""
+    return "gzip" if requested == "gzip" else None
@@ -0,0 +1,231 @@
+"""
+WebSocket connection management with per-client send queues.
+
+Every client gets a bounded outbound queue drained by its own writer task,
+so a broadcast only serializes the message once and enqueues it; a slow
+browser can no longer delay the others. Messages sent with a coalesce key
+(market ticks) replace any still-queued message with the same key, so a
+lagging client gets the latest value instead of a backlog. Clients whose
+queue overflows or whose socket stalls past the send timeout are evicted.
+
+Clients connecting with ?encoding=msgpack receive binary MessagePack frames
+instead of JSON text; each message is encoded at most once per encoding.
+Clients adding ?compress=gzip get messages of at least ``compress_min_size``
+bytes as gzip binary frames, also compressed once per message.
+"""
+
+import asyncio
+import itertools
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Union
+
+import msgpack
+from fastapi import WebSocket
+
+from compression import compress, websocket_compression
+from fast_json import dumps
+from metrics import metrics
+
+messages_coalesced = metrics.counter(
+    "hypertrader_websocket_messages_coalesced_total",
+    "Queued WebSocket messages replaced by a newer value")
+clients_evicted = metrics.counter(
+    "hypertrader_websocket_clients_evicted_total",
+    "WebSocket clients disconnected for falling behind", ("reason",))
+
+ENCODINGS = ("json", "msgpack")
+
+class ClientDisconnected(Exception):
+    """Raised when sending to a client that is no longer connected"""
+
+class EncodedMessage:
+    """A message serialized lazily, once per wire encoding"""
+
+    def __init__(self, message: dict):
+        self.message = message
+        self._encoded: Dict[Any, Union[str, bytes]] = {}
+
+    def get(self, encoding: str, compression: Optional[str] = None,
+            compress_min_size: int = 0) -> Union[str, bytes]:
+        if compression is not None:
+            data = self._encoded.get((encoding, compression))
+            if data is None:
+                raw = self.get(encoding)
+                raw_bytes = raw.encode() if isinstance(raw, str) else raw
+                # Small messages stay uncompressed; the gzip header alone is ~20 bytes
+                data = compress(raw_bytes, compression, 6) if len(raw_bytes) >= compress_min_size else raw
+                self._encoded[(encoding, compression)] = data
+            return data
+
+        data = self._encoded.get(encoding)
+        if data is None:
+            if encoding == "msgpack":
+                data = msgpack.packb(self.message, default=str)
+            else:
+                data = dumps(self.message).decode()
+            self._encoded[encoding] = data
+        return data
+
+class ClientConnection:
+    """One WebSocket client with its outbound queue and writer task"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, websocket: WebSocket, on_close: Callable[["ClientConnection", str], None],
+                 max_queue: int = 100, send_timeout: float = 10.0, encoding: str = "json",
+                 compression: Optional[str] = None, compress_min_size: int = 1024):
+        self.id = str(next(self._ids))
+        self.websocket = websocket
+        self.encoding = encoding
+        self.compression = compression
+        self.compress_min_size = compress_min_size
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.closed = False
+
+        self._on_close = on_close
+        self._order: Deque[Any] = deque()
+        self._pending: Dict[Any, Union[str, bytes]] = {}
+        self._unique_keys = itertools.count()
+        self._ready = asyncio.Event()
+        self._writer_task: Optional[asyncio.Task] = None
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._order)
+
+    def start(self):
+        self._writer_task = asyncio.create_task(self._writer(), name=f"ws-writer-{self.id}")
+
+    def enqueue(self, message: EncodedMessage, coalesce_key: Optional[str] = None,
+                replacement: Optional[EncodedMessage] = None) -> bool:
+        """Queue a message; returns False if the queue is full.
+
+        If a message with the same coalesce key is still queued it is
+        overwritten in place, by ``replacement`` when given (e.g. a full
+        snapshot superseding two deltas) or else by the new message.
+        """
+        if coalesce_key is not None and coalesce_key in self._pending:
+            # Latest value wins, keeping the original queue position
+            self._pending[coalesce_key] = self._encode(replacement or message)
+            messages_coalesced.inc()
+            return True
+
+        if len(self._order) >= self.max_queue:
+            return False
+
+        key = coalesce_key if coalesce_key is not None else next(self._unique_keys)
+        self._pending[key] = self._encode(message)
+        self._order.append(key)
+        self._ready.set()
+        return True
+
+    def _encode(self, message: EncodedMessage) -> Union[str, bytes]:
+        return message.get(self.encoding, self.compression, self.compress_min_size)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._order.clear()
+        self._pending.clear()
+        if self._writer_task and self._writer_task is not asyncio.current_task():
+            self._writer_task.cancel()
+
+    async def _writer(self):
+        reason = "send_failed"
+        try:
+            while True:
+                await self._ready.wait()
+                while self._order:
+                    key = self._order.popleft()
+                    data = self._pending.pop(key)
+                    if isinstance(data, bytes):
+                        send = self.websocket.send_bytes(data)
+                    else:
+                        send = self.websocket.send_text(data)
+                    await asyncio.wait_for(send, self.send_timeout)
+                self._ready.clear()
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            reason = "send_timeout"
+        except Exception as e:
+            print(f"WebSocket client {self.id} send failed: {e}")
+        self._on_close(self, reason)
+
+class ConnectionManager:
+    def __init__(self, max_queue: int = 100, send_timeout: float = 10.0, compress_min_size: int = 1024):
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.compress_min_size = compress_min_size
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.clients)
+
+    async def connect(self, websocket: WebSocket) -> ClientConnection:
+        await websocket.accept()
+        encoding = websocket.query_params.get("encoding", "json")
+        if encoding not in ENCODINGS:
+            encoding = "json"
+        compression = websocket_compression(websocket.query_params.get("compress"))
+        client = ClientConnection(
+            websocket, self._evict, self.max_queue, self.send_timeout, encoding,
+            compression, self.compress_min_size
+        )
+        self.clients[websocket] = client
+        client.start()
+        return client
+
+    def disconnect(self, websocket: WebSocket):
+        client = self.clients.pop(websocket, None)
+        if client:
+            client.close()
+
+    def is_connected(self, websocket: WebSocket) -> bool:
+        return websocket in self.clients
+
+    async def send_personal_message(self, message: dict, websocket: WebSocket,
+                                    coalesce_key: Optional[str] = None):
+        client = self.clients.get(websocket)
+        if client is None or client.closed:
+            raise ClientDisconnected("WebSocket client is no longer connected")
+        if not client.enqueue(EncodedMessage(message), coalesce_key):
+            self._evict(client, "queue_full")
+            raise ClientDisconnected("WebSocket client fell too far behind")
+
+    async def broadcast(self, message: dict, coalesce_key: Optional[str] = None):
+        """Serialize once and enqueue for every client without awaiting any socket"""
+        await self.send_many(list(self.clients), message, coalesce_key)
+
+    async def send_many(self, websockets: List[WebSocket], message: dict,
+                        coalesce_key: Optional[str] = None, coalesced_message: Optional[dict] = None):
+        """Serialize once and enqueue for the given clients"""
+        encoded = EncodedMessage(message)
+        replacement = EncodedMessage(coalesced_message) if coalesced_message is not None else None
+        for websocket in websockets:
+            client = self.clients.get(websocket)
+            if client is not None and not client.enqueue(encoded, coalesce_key, replacement):
+                self._evict(client, "queue_full")
+
+    def queue_depths(self) -> Dict[tuple, float]:
+        return {(client.id,): client.queue_depth for client in self.clients.values()}
+
+    def _evict(self, client: ClientConnection, reason: str):
+        if client.closed:
+            return
+        print(f"Evicting WebSocket client {client.id}: {reason}")
+        clients_evicted.inc(reason)
+        self.clients.pop(client.websocket, None)
+        client.close()
+        asyncio.create_task(self._close_socket(client.websocket))
+
+    @staticmethod
+    async def _close_socket(websocket: WebSocket):
+        try:
+            # 1013: try again later
+            await websocket.close(code=1013)
+        except Exception:
+            pass
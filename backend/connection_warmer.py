@@ -0,0 +1,111 @@
+"""
+Warm, kept-alive HTTPS connections to the Hyperliquid API.
+
+The first request to a host pays DNS resolution and TCP and TLS setup, two
+to three round trips, before it is even sent, and the server closes pooled
+connections that sit idle. ``ConnectionWarmer`` opens ``connections``
+pooled connections per base URL up front by sending that many concurrent
+lightweight info requests on the shared ``requests.Session``. Whenever a
+host has seen no traffic for ``interval`` seconds it touches them again,
+before the server's idle timeout. ``/info`` and ``/exchange`` share a host
+and so a pool: the first order after a quiet period goes out on an
+established connection, like any other.
+
+``stats()`` reports per host the requests sent and the connections opened
+by the session's urllib3 pools; one minus their ratio is the connection
+reuse rate.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+class ConnectionWarmer:
+    def __init__(self, session: requests.Session, base_urls: Callable[[], Iterable[str]],
+                 connections: int = 2, interval: float = 20.0, timeout: float = 5.0,
+                 payload: Optional[Dict[str, Any]] = None):
+        self.session = session
+        # Called on every pass, so a base URL added later (e.g. testnet credentials) is picked up
+        self.base_urls = base_urls
+        self.connections = connections
+        self.interval = interval
+        self.timeout = timeout
+        # Any small valid request keeps a connection open; allMids is cheap and always valid
+        self.payload = payload or {"type": "allMids"}
+        self.last_error: Optional[str] = None
+        self._last_used: Dict[str, float] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        session.hooks["response"].append(self._record_use)
+
+    def _record_use(self, response: requests.Response, *args, **kwargs):
+        self._last_used[urlsplit(response.url).netloc] = time.monotonic()
+
+    def idle_for(self, base_url: str) -> float:
+        return time.monotonic() - self._last_used.get(urlsplit(base_url).netloc, float("-inf"))
+
+    def warm(self, base_url: str) -> int:
+        """Open or refresh the pooled connections to a base URL; returns how many answered (blocking)"""
+        # Concurrent, so each request holds (and so opens or keeps) a different connection
+        with ThreadPoolExecutor(self.connections, thread_name_prefix="connection-warm") as pool:
+            return sum(pool.map(lambda _: self._touch(base_url), range(self.connections)))
+
+    def warm_all(self) -> int:
+        """Warm every base URL; raises if one could not be reached at all (blocking)"""
+        warmed = 0
+        for base_url in self.base_urls():
+            answered = self.warm(base_url)
+            if not answered:
+                raise ConnectionError(f"Could not connect to {base_url}: {self.last_error}")
+            warmed += answered
+        return warmed
+
+    def warm_idle(self):
+        for base_url in self.base_urls():
+            if self.idle_for(base_url) >= self.interval:
+                self.warm(base_url)
+
+    def _touch(self, base_url: str) -> bool:
+        try:
+            response = self.session.post(f"{base_url}/info", json=self.payload, timeout=self.timeout)
+            # Read the whole body so the connection goes back to the pool
+            response.content
+            return True
+        except requests.RequestException as e:
+            self.last_error = str(e)
+            return False
+
+    def start(self):
+        """Keep connections warm from a daemon thread"""
+        if self._thread is None and self.interval > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="connection-keepalive", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _run(self):
+        # Check twice per interval, so no host sits idle much past it
+        while not self._stop.wait(self.interval / 2):
+            self.warm_idle()
+
+    def stats(self) -> Dict[str, Tuple[int, int]]:
+        """Host -> (requests sent, connections opened) across the session's connection pools"""
+        totals: Dict[str, Tuple[int, int]] = {}
+        for adapter in self.session.adapters.values():
+            pools = getattr(getattr(adapter, "poolmanager", None), "pools", None)
+            if pools is None:
+                continue
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                requests_sent, opened = totals.get(pool.host, (0, 0))
+                totals[pool.host] = (requests_sent + pool.num_requests, opened + pool.num_connections)
+        return totals
@@ -0,0 +1,90 @@
+"""
+Fast JSON encoding for API responses.
+
+Responses are serialized with orjson, which handles datetimes, enums, UUIDs
+and numpy arrays natively. Pydantic models are encoded straight from their
+field values, so there is no ``.dict()`` conversion and no pass through
+FastAPI's ``jsonable_encoder``. Routes return ``api_response(...)``: an
+``APIResponse`` built with ``model_construct`` inside a ``FastJSONResponse``.
+FastAPI returns a ``Response`` as-is, so trusted data is not validated a
+second time against ``response_model``. ``response_model`` still documents
+the route.
+
+``CachedPayload`` keeps the serialized bytes of a hot, rarely changing
+payload so repeated requests skip encoding altogether, along with the
+validators ``http_cache`` needs to answer revalidations.
+"""
+
+import time
+from decimal import Decimal
+from typing import Any, Optional
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from http_cache import etag_for
+from models import APIResponse, PaginatedResponse
+
+OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        # Field values only; nested models come back through this hook
+        return obj.__dict__
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj, default=_default, option=OPTIONS)
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson; bytes content is sent as already-encoded JSON"""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+def api_response(**fields) -> FastJSONResponse:
+    """APIResponse for trusted data, skipping validation"""
+    return FastJSONResponse(APIResponse.model_construct(**fields))
+
+def paginated_response(**fields) -> FastJSONResponse:
+    """PaginatedResponse for trusted data, skipping validation"""
+    return FastJSONResponse(PaginatedResponse.model_construct(**fields))
+
+class CachedPayload:
+    """Serialized response body reused until it is older than ``ttl`` seconds.
+
+    Also keeps the body's ETag and the time its content last changed, so
+    conditional requests are answered without re-encoding or re-hashing.
+    Re-caching identical content keeps both.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._body: Optional[bytes] = None
+        self._expires = 0.0
+        self.etag: Optional[str] = None
+        self.modified_at: Optional[float] = None
+
+    def get(self) -> Optional[bytes]:
+        if self._body is not None and time.monotonic() < self._expires:
+            return self._body
+        return None
+
+    def set(self, content: Any) -> bytes:
+        self._body = dumps(content)
+        self._expires = time.monotonic() + self.ttl
+        etag = etag_for(self._body)
+        if etag != self.etag:
+            self.etag = etag
+            self.modified_at = time.time()
+        return self._body
+
+    def clear(self):
+        self._body = None
@@ -0,0 +1,182 @@
+"""
+Local store of user fills backing /api/orders/history.
+
+Fills are ingested incrementally with ``userFillsByTime`` starting from the
+newest fill already held (and, when enabled, from the live ``userFills``
+WebSocket stream), deduplicated by ``tid`` and indexed by time and by coin.
+History pages are then served from memory with bisect lookups, so browsing
+deep history never re-downloads the full fill list.
+
+Cursors are opaque strings encoding the (time, tid) of the last fill
+returned plus the page number; the next page starts strictly after it.
+"""
+
+import asyncio
+import base64
+import time
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from metrics import metrics
+
+# userFillsByTime returns at most this many fills per call
+FILLS_PER_REQUEST = 2000
+
+FillKey = Tuple[int, int]
+
+def encode_cursor(key: FillKey, page: int) -> str:
+    raw = f"{key[0]}:{key[1]}:{page}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[FillKey, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        fill_time, tid, page = base64.urlsafe_b64decode(padded).decode().split(":")
+        return (int(fill_time), int(tid)), int(page)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+class WalletFills:
+    """Fills of one wallet with a time index and a per-coin time index"""
+
+    def __init__(self):
+        self.by_tid: Dict[int, Dict[str, Any]] = {}
+        self.timeline: List[FillKey] = []
+        self.by_coin: Dict[str, List[FillKey]] = {}
+        self.latest_time = 0
+        self.synced_at = 0.0
+        self.live = False
+        self.sync_lock = asyncio.Lock()
+
+    def add(self, fill: Dict[str, Any]) -> bool:
+        tid = fill.get("tid")
+        if tid is None or tid in self.by_tid:
+            return False
+
+        key = (int(fill.get("time", 0)), int(tid))
+        self.by_tid[tid] = fill
+        # Fills mostly arrive in time order, so this is usually an append
+        insort(self.timeline, key)
+        insort(self.by_coin.setdefault(fill.get("coin", ""), []), key)
+        self.latest_time = max(self.latest_time, key[0])
+        return True
+
+class FillsStore:
+    def __init__(self, session: requests.Session, sync_interval: float = 5.0):
+        self.session = session
+        self.sync_interval = sync_interval
+        self._wallets: Dict[Tuple[str, str], WalletFills] = {}
+
+    def wallet(self, base_url: str, wallet_address: str) -> WalletFills:
+        key = (base_url, wallet_address.lower())
+        fills = self._wallets.get(key)
+        if fills is None:
+            fills = self._wallets[key] = WalletFills()
+        return fills
+
+    def ingest(self, base_url: str, wallet_address: str, fills: List[Dict[str, Any]]) -> int:
+        """Add fills, ignoring ones already stored; returns how many were new"""
+        wallet = self.wallet(base_url, wallet_address)
+        return sum(1 for fill in fills if wallet.add(fill))
+
+    async def sync(self, base_url: str, wallet_address: str, force: bool = False) -> int:
+        """Fetch fills newer than the latest stored one, unless synced recently"""
+        wallet = self.wallet(base_url, wallet_address)
+        if not force and self._is_fresh(wallet):
+            metrics.record_cache("fills", True)
+            return 0
+
+        async with wallet.sync_lock:
+            if not force and self._is_fresh(wallet):
+                metrics.record_cache("fills", True)
+                return 0
+            metrics.record_cache("fills", False)
+
+            added = 0
+            start_time = wallet.latest_time
+            while True:
+                batch = await asyncio.to_thread(self._fetch, base_url, wallet_address, start_time)
+                new = self.ingest(base_url, wallet_address, batch)
+                added += new
+                if len(batch) < FILLS_PER_REQUEST or new == 0:
+                    break
+                # Page forward; the boundary fill is deduplicated by tid
+                start_time = max(int(fill.get("time", 0)) for fill in batch)
+
+            wallet.synced_at = time.monotonic()
+            if added:
+                print(f"Fills store: ingested {added} new fills for {wallet_address[:8]}...")
+            return added
+
+    def _is_fresh(self, wallet: WalletFills) -> bool:
+        if not wallet.synced_at:
+            return False
+        # A live stream keeps the store current after the first backfill
+        return wallet.live or time.monotonic() - wallet.synced_at < self.sync_interval
+
+    def _fetch(self, base_url: str, wallet_address: str, start_time: int) -> List[Dict[str, Any]]:
+        with metrics.track_upstream("userFillsByTime"):
+            response = self.session.post(
+                f"{base_url}/info",
+                json={
+                    "type": "userFillsByTime",
+                    "user": wallet_address,
+                    "startTime": start_time,
+                    "aggregateByTime": False
+                },
+                timeout=10
+            )
+            response.raise_for_status()
+            return response.json() or []
+
+    def query(self, base_url: str, wallet_address: str, limit: int = 50, cursor: Optional[str] = None,
+              coin: Optional[str] = None, start_time: Optional[int] = None,
+              end_time: Optional[int] = None) -> Dict[str, Any]:
+        """Return one page of fills, newest first"""
+        wallet = self.wallet(base_url, wallet_address)
+        index = wallet.by_coin.get(coin, []) if coin else wallet.timeline
+
+        lo = bisect_left(index, (start_time, -1)) if start_time is not None else 0
+        hi = bisect_right(index, (end_time, float("inf"))) if end_time is not None else len(index)
+        total = max(0, hi - lo)
+
+        page = 1
+        if cursor:
+            after_key, previous_page = decode_cursor(cursor)
+            hi = min(hi, bisect_left(index, after_key))
+            page = previous_page + 1
+
+        first = max(lo, hi - limit)
+        keys = index[first:hi][::-1]
+        has_more = first > lo
+
+        return {
+            "fills": [wallet.by_tid[tid] for _, tid in keys],
+            "total": total,
+            "page": page,
+            "has_more": has_more,
+            "next_cursor": encode_cursor(keys[-1], page) if has_more and keys else None,
+        }
+
+    def attach_stream(self, info, base_url: str, wallet_address: str,
+                      loop: asyncio.AbstractEventLoop) -> int:
+        """Subscribe to the live userFills stream on an SDK Info with WebSockets enabled.
+
+        Returns the subscription id for ``info.unsubscribe``.
+        """
+        wallet = self.wallet(base_url, wallet_address)
+
+        def on_message(message):
+            fills = (message.get("data") or {}).get("fills", [])
+            if fills:
+                # SDK callbacks run on its WebSocket thread
+                loop.call_soon_threadsafe(self.ingest, base_url, wallet_address, fills)
+
+        subscription_id = info.subscribe({"type": "userFills", "user": wallet_address}, on_message)
+        wallet.live = True
+        return subscription_id
+
+    def detach_stream(self, base_url: str, wallet_address: str):
+        self.wallet(base_url, wallet_address).live = False
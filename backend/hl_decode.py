@@ -0,0 +1,186 @@
+"""
+Typed decoding of Hyperliquid info payloads.
+
+Each decoder turns one upstream payload into a compact NamedTuple of NumPy
+columns in a single pass: row fields are pulled out with ``itemgetter`` and
+every string column is converted to float64/int64 in one NumPy call, instead
+of ``float(row["px"])`` and ``.get()`` per field per row. Callers slice or
+filter the columns first and build response models only for the rows they
+return.
+
+``loads`` parses raw response bytes with orjson when it is installed.
+"""
+
+import json
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+def loads(data: bytes) -> Any:
+    """Parse a JSON response body"""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def floats(values: Sequence) -> np.ndarray:
+    """Convert numeric strings to float64 in one call; None becomes NaN"""
+    return np.array(values, dtype=np.float64)
+
+def ints(values: Sequence) -> np.ndarray:
+    return np.array(values, dtype=np.int64)
+
+def _columns(rows: List[Dict[str, Any]], keys: Tuple[str, ...],
+             defaults: Optional[Dict[str, Any]] = None) -> List[list]:
+    """Extract one list per key; a per-key ``itemgetter`` map is far cheaper than zip(*rows)"""
+    columns = []
+    for key in keys:
+        try:
+            columns.append(list(map(itemgetter(key), rows)))
+        except KeyError:
+            # Optional field missing from some rows
+            default = (defaults or {}).get(key)
+            columns.append([row.get(key, default) for row in rows])
+    return columns
+
+class Mids(NamedTuple):
+    coins: List[str]
+    prices: np.ndarray
+    index: Dict[str, int]
+
+    def price(self, coin: str) -> Optional[float]:
+        i = self.index.get(coin)
+        return float(self.prices[i]) if i is not None else None
+
+def decode_all_mids(payload: Dict[str, str]) -> Mids:
+    coins = list(payload)
+    return Mids(coins, floats(list(payload.values())), {coin: i for i, coin in enumerate(coins)})
+
+class L2Book(NamedTuple):
+    coin: str
+    time: int
+    bid_px: np.ndarray
+    bid_sz: np.ndarray
+    bid_n: np.ndarray
+    ask_px: np.ndarray
+    ask_sz: np.ndarray
+    ask_n: np.ndarray
+
+def decode_l2_book(payload: Dict[str, Any]) -> L2Book:
+    """Decode ``l2Book``; levels arrive as [bids best-first, asks best-first]"""
+    levels = payload.get("levels") or [[], []]
+    bid_px, bid_sz, bid_n = _columns(levels[0], ("px", "sz", "n"))
+    ask_px, ask_sz, ask_n = _columns(levels[1] if len(levels) > 1 else [], ("px", "sz", "n"))
+    return L2Book(
+        payload.get("coin", ""), int(payload.get("time", 0)),
+        floats(bid_px), floats(bid_sz), ints(bid_n),
+        floats(ask_px), floats(ask_sz), ints(ask_n)
+    )
+
+class Candles(NamedTuple):
+    open_time: np.ndarray
+    close_time: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+    trades: np.ndarray
+
+def decode_candles(payload: List[Dict[str, Any]]) -> Candles:
+    """Decode ``candleSnapshot`` rows into oldest-first columns"""
+    t, close_t, o, h, l, c, v, n = _columns(
+        payload, ("t", "T", "o", "h", "l", "c", "v", "n"), {"T": 0, "v": 0, "n": 0}
+    )
+    return Candles(ints(t), ints(close_t), floats(o), floats(h), floats(l), floats(c), floats(v), ints(n))
+
+class Positions(NamedTuple):
+    coins: List[str]
+    szi: np.ndarray
+    entry_px: np.ndarray
+    position_value: np.ndarray
+    unrealized_pnl: np.ndarray
+    margin_used: np.ndarray
+    liquidation_px: np.ndarray
+
+class ClearinghouseState(NamedTuple):
+    account_value: float
+    total_margin_used: float
+    total_ntl_pos: float
+    total_raw_usd: float
+    withdrawable: float
+    positions: Positions
+
+def decode_clearinghouse_state(payload: Dict[str, Any]) -> ClearinghouseState:
+    summary = payload.get("marginSummary") or {}
+    rows = [entry.get("position", {}) for entry in payload.get("assetPositions", [])]
+    coins, szi, entry_px, value, pnl, margin, liq = _columns(
+        rows, ("coin", "szi", "entryPx", "positionValue", "unrealizedPnl", "marginUsed", "liquidationPx"),
+        {"coin": "", "szi": 0, "positionValue": 0, "unrealizedPnl": 0, "marginUsed": 0}
+    )
+    totals = floats([
+        summary.get("accountValue", 0), summary.get("totalMarginUsed", 0),
+        summary.get("totalNtlPos", 0), summary.get("totalRawUsd", 0),
+        payload.get("withdrawable", 0)
+    ]).tolist()
+    return ClearinghouseState(*totals, Positions(
+        coins, floats(szi), floats(entry_px), floats(value),
+        floats(pnl), floats(margin), floats(liq)
+    ))
+
+class Fills(NamedTuple):
+    coins: List[str]
+    px: np.ndarray
+    sz: np.ndarray
+    is_buy: np.ndarray
+    time: np.ndarray
+    oid: np.ndarray
+    tid: np.ndarray
+    closed_pnl: np.ndarray
+    fee: np.ndarray
+
+def decode_fills(payload: Iterable[Dict[str, Any]]) -> Fills:
+    """Decode ``userFills``/``userFillsByTime`` rows"""
+    rows = payload if isinstance(payload, list) else list(payload)
+    coins, px, sz, side, time, oid, tid, pnl, fee = _columns(
+        rows, ("coin", "px", "sz", "side", "time", "oid", "tid", "closedPnl", "fee"),
+        {"coin": "", "px": 0, "sz": 0, "side": "A", "time": 0, "oid": 0, "tid": 0, "closedPnl": 0, "fee": 0}
+    )
+    return Fills(
+        coins, floats(px), floats(sz), np.array(list(map("B".__eq__, side)), dtype=bool), ints(time),
+        ints(oid), ints(tid), floats(pnl), floats(fee)
+    )
+
+class AssetContexts(NamedTuple):
+    names: List[str]
+    sz_decimals: np.ndarray
+    max_leverage: np.ndarray
+    delisted: np.ndarray
+    mark_px: np.ndarray
+    mid_px: np.ndarray
+    oracle_px: np.ndarray
+    prev_day_px: np.ndarray
+    day_ntl_vlm: np.ndarray
+    funding: np.ndarray
+    open_interest: np.ndarray
+    index: Dict[str, int]
+
+def decode_meta_and_asset_ctxs(payload: List[Any]) -> AssetContexts:
+    """Decode ``metaAndAssetCtxs``; row i of every column is universe asset i"""
+    meta, ctxs = payload[0], payload[1]
+    universe = meta.get("universe", [])
+    names, sz_decimals, max_leverage, delisted = _columns(
+        universe, ("name", "szDecimals", "maxLeverage", "isDelisted"),
+        {"szDecimals": 0, "maxLeverage": 1, "isDelisted": False}
+    )
+    mark, mid, oracle, prev, vlm, funding, oi = _columns(
+        ctxs, ("markPx", "midPx", "oraclePx", "prevDayPx", "dayNtlVlm", "funding", "openInterest")
+    )
+    return AssetContexts(
+        names, ints(sz_decimals), ints(max_leverage), np.array(delisted, dtype=bool),
+        floats(mark), floats(mid), floats(oracle), floats(prev), floats(vlm),
+        floats(funding), floats(oi), {name: i for i, name in enumerate(names)}
+    )
@@ -0,0 +1,69 @@
+"""
+HTTP validators for cacheable API responses.
+
+Routes whose bodies stay identical for long stretches send an ``ETag`` (and a
+``Last-Modified`` where the data has a meaningful change time) with a
+``Cache-Control`` policy, and answer ``304 Not Modified`` when the client or
+nginx revalidates with a matching ``If-None-Match``/``If-Modified-Since``.
+A revalidation then costs an empty response and, when the validator comes
+from a cached payload or from the request itself, no serialization either.
+"""
+
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+from metrics import metrics
+
+not_modified_responses = metrics.counter(
+    "hypertrader_not_modified_total", "Requests answered with 304 Not Modified", ("route",))
+
+def etag_for(body: bytes) -> str:
+    """Strong ETag from a content hash"""
+    return f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+
+def etag_from_key(*parts) -> str:
+    """Strong ETag for content fully determined by its key, e.g. a closed candle range"""
+    return etag_for("|".join(map(str, parts)).encode())
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[float] = None) -> bool:
+    """Whether the request's validators still match; If-None-Match takes precedence"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison, since proxies may weaken the tag (e.g. when compressing)
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag.removeprefix("W/") in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def cache_headers(etag: str, last_modified: Optional[float], cache_control: str) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    return headers
+
+def not_modified(route: str, etag: str, last_modified: Optional[float], cache_control: str) -> Response:
+    not_modified_responses.inc(route)
+    return Response(status_code=304, headers=cache_headers(etag, last_modified, cache_control))
+
+def conditional(request: Request, route: str, response: Response, cache_control: str,
+                etag: Optional[str] = None, last_modified: Optional[float] = None) -> Response:
+    """Return 304 if the request's validators match, else the response with validator headers.
+
+    Without an explicit etag, one is computed from the rendered body.
+    """
+    etag = etag or etag_for(response.body)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(route, etag, last_modified, cache_control)
+    response.headers.update(cache_headers(etag, last_modified, cache_control))
+    return response
@@ -1,24 +1,150 @@
 import os
 import json
 import asyncio
-import websockets
-from typing import List, Dict, Optional, Any
+import time
+from typing import TYPE_CHECKING, List, Dict, Optional, Any, Tuple
 from datetime import datetime, timedelta
-from hyperliquid.info import Info
-from hyperliquid.exchange import Exchange
-from hyperliquid.utils import constants
 import random
 import uuid
+from contextlib import contextmanager
+import numpy as np
+import requests
 import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from book_cache import BookCache, marketable_price
+from circuit_breaker import Snapshot, UpstreamGuard
+from fills_store import FillsStore
+from hl_decode import (
+    loads, decode_all_mids, decode_candles, decode_clearinghouse_state, decode_fills, decode_l2_book
+)
+from open_orders import OpenOrdersStore
+from shared_market_data import SharedMarketData, market_key
+from universe_cache import UniverseCache
+from metrics import metrics
 from models import (
     Portfolio, Position, Order, Trade, MarketData, 
     CandlestickData, OrderBook, OrderBookLevel, Account,
     OrderType, OrderSide, OrderStatus, StrategyStatus
 )
 
+if TYPE_CHECKING:
+    from order_pipeline import OrderPipeline
+
+INFO_URL = "https://api.hyperliquid.xyz/info"
+
+# Supported candle intervals and their length in milliseconds
+CANDLE_INTERVAL_MS = {
+    "1m": 60 * 1000,
+    "5m": 5 * 60 * 1000,
+    "15m": 15 * 60 * 1000,
+    "1h": 60 * 60 * 1000,
+    "4h": 4 * 60 * 60 * 1000,
+    "1d": 24 * 60 * 60 * 1000
+}
+
+def candle_range_closed(interval: str, end_time: Optional[int]) -> bool:
+    """Whether every candle up to end_time (ms) has closed, so the range can never change"""
+    if end_time is None:
+        return False
+    interval_ms = CANDLE_INTERVAL_MS.get(interval, CANDLE_INTERVAL_MS["1h"])
+    current_open = int(time.time() * 1000) // interval_ms * interval_ms
+    return end_time < current_open
+
+class OrderTimeout(Exception):
+    """An order action got no answer in time; it may or may not have reached the exchange"""
+
+def base_url_for(environment: str) -> str:
+    """API base URL for an environment name"""
+    return "https://api.hyperliquid-testnet.xyz" if environment == "testnet" else "https://api.hyperliquid.xyz"
+
+def orders_from_fills(fills: List[Dict[str, Any]]) -> List[Order]:
+    """Convert Hyperliquid fills to our Order format"""
+    decoded = decode_fills(fills)
+    orders = []
+    for coin, oid, is_buy, size, price, fill_time in zip(
+        decoded.coins, decoded.oid.tolist(), decoded.is_buy.tolist(),
+        decoded.sz.tolist(), decoded.px.tolist(), decoded.time.tolist()
+    ):
+        timestamp = datetime.fromtimestamp(fill_time / 1000)
+        orders.append(Order(
+            oid=oid,
+            coin=coin,
+            side=OrderSide.BUY if is_buy else OrderSide.SELL,
+            size=size,
+            price=price,
+            order_type=OrderType.LIMIT,  # Most fills are from limit orders
+            status=OrderStatus.FILLED,
+            filled_size=size,
+            remaining_size=0.0,
+            average_fill_price=price,
+            created_at=timestamp,
+            updated_at=timestamp
+        ))
+    return orders
+
+def order_from_open_order(order_data: Dict[str, Any]) -> Order:
+    """Convert a Hyperliquid open order to our Order format"""
+    return Order(
+        oid=order_data.get("oid"),
+        coin=order_data.get("coin"),
+        side=OrderSide.BUY if order_data.get("side") == "B" else OrderSide.SELL,
+        size=float(order_data.get("origSz", order_data.get("sz", 0))),
+        price=float(order_data.get("limitPx", 0)),
+        order_type=OrderType.LIMIT,
+        status=OrderStatus.PENDING,
+        remaining_size=float(order_data.get("sz", 0)),
+        created_at=datetime.fromtimestamp(order_data.get("timestamp", 0) / 1000)
+    )
+
+def portfolio_from_user_state(user_state: Dict[str, Any]) -> Portfolio:
+    """Convert a clearinghouseState response into a Portfolio"""
+    state = decode_clearinghouse_state(user_state)
+    portfolio = Portfolio(
+        account_value=state.account_value,
+        available_balance=state.withdrawable,
+        margin_used=state.total_margin_used,
+        total_pnl=state.total_raw_usd
+    )
+    
+    # Convert open positions only
+    positions = state.positions
+    sizes = np.abs(positions.szi)
+    open_rows = np.flatnonzero(sizes)
+    current_prices = positions.position_value[open_rows] / sizes[open_rows]
+    portfolio.positions = [
+        Position(
+            coin=positions.coins[row],
+            size=size,
+            entry_price=entry_price,
+            current_price=current_price,
+            unrealized_pnl=unrealized_pnl,
+            side=OrderSide.BUY if szi > 0 else OrderSide.SELL
+        )
+        for row, size, entry_price, current_price, unrealized_pnl, szi in zip(
+            open_rows.tolist(), sizes[open_rows].tolist(), positions.entry_px[open_rows].tolist(),
+            current_prices.tolist(), positions.unrealized_pnl[open_rows].tolist(),
+            positions.szi[open_rows].tolist()
+        )
+    ]
+    return portfolio
+
 class HyperliquidService:
-    def __init__(self, wallet_address=None, api_key=None, api_secret=None, environment="testnet"):
+    def __init__(self, wallet_address=None, api_key=None, api_secret=None, environment="testnet",
+                 session: Optional[requests.Session] = None, sdk_provider=None,
+                 fills_store: Optional[FillsStore] = None, open_orders: Optional[OpenOrdersStore] = None,
+                 universe: Optional[UniverseCache] = None, book_provider=None,
+                 upstream: Optional[UpstreamGuard] = None, market_data: Optional[SharedMarketData] = None):
+        # Shared HTTP session, SDK state provider, fills store, open-orders books, universe cache,
+        # order-book caches, circuit breakers and multi-worker market data (see service_registry)
+        self.session = session
+        self.market_data = market_data
+        self.upstream = upstream or UpstreamGuard()
+        self.universe = universe
+        self.sdk_provider = sdk_provider
+        self.book_provider = book_provider
+        self.fills_store = fills_store or FillsStore(session or requests.Session())
+        self.open_orders = open_orders or OpenOrdersStore(session or requests.Session())
+        
         # Use provided credentials or get from environment
         self.wallet_address = wallet_address or os.getenv("HYPERLIQUID_WALLET_ADDRESS", "")
         self.api_key = api_key or os.getenv("HYPERLIQUID_API_KEY", "")
@@ -27,26 +153,60 @@ class HyperliquidService:
         
         # Check if we have the required credentials
         self.is_configured = bool(self.wallet_address and self.api_key and self.api_secret)
+        self.pipeline: Optional["OrderPipeline"] = None
+        self.books = BookCache()
+        
+        # Market orders are IOC limits priced from the cached book, at most this far from the best price
+        self.market_max_slippage = float(os.getenv("MARKET_ORDER_MAX_SLIPPAGE", "0.01"))
+        self.market_price_buffer = float(os.getenv("MARKET_ORDER_PRICE_BUFFER", "0.002"))
+        self.market_book_max_age = float(os.getenv("MARKET_BOOK_MAX_AGE", "10"))
+        # Seconds an order or cancel may take to sign and post before it is reported as failed
+        self.order_timeout = float(os.getenv("ORDER_TIMEOUT", "10"))
+        # Orders and cancels running on this instance; a replaced service retires once they finish
+        self._orders_in_flight = 0
+        self._orders_idle = asyncio.Event()
+        self._orders_idle.set()
         
         if self.is_configured:
             try:
-                self.base_url = (
-                    "https://api.hyperliquid-testnet.xyz" if self.environment == "testnet" 
-                    else "https://api.hyperliquid.xyz"
-                )
+                self.base_url = base_url_for(self.environment)
                 
                 print(f"Hyperliquid service initialized:")
                 print(f"- Environment: {self.environment}")
                 print(f"- Target Wallet: {self.wallet_address}")
                 
+                # Imported here: the SDK and eth_account are slow to import and only needed with credentials
+                from eth_account import Account
+                from hyperliquid.exchange import Exchange
+                from hyperliquid.info import Info
+                from order_pipeline import OrderPipeline
+                
                 # Initialize Info API (doesn't need private key)
-                self.info = Info(self.base_url, skip_ws=True)
+                if self.sdk_provider:
+                    # Reuse the shared Info object and metadata instead of re-downloading them
+                    self.info, meta, spot_meta = self.sdk_provider(self.base_url)
+                else:
+                    self.info, meta, spot_meta = Info(self.base_url, skip_ws=True), None, None
                 
                 # Initialize Exchange for trading (needs private key)
                 # Note: We pass the private key, but we'll query using the target wallet address
-                from eth_account import Account
                 wallet_account = Account.from_key(self.api_secret)
-                self.exchange = Exchange(wallet_account, self.base_url)
+                self.exchange = Exchange(wallet_account, self.base_url, meta=meta, spot_meta=spot_meta)
+                if self.session:
+                    self.exchange.session = self.session
+                    self.exchange.info = self.info
+                # The SDK posts without a timeout by default
+                self.exchange.timeout = self.order_timeout
+                
+                if self.book_provider:
+                    self.books = self.book_provider(self.base_url)
+                
+                # Signs and posts orders concurrently with locally allocated nonces
+                self.pipeline = OrderPipeline(
+                    self.exchange,
+                    window=int(os.getenv("ORDER_PIPELINE_WINDOW", "8")),
+                    signing_workers=int(os.getenv("ORDER_SIGNING_WORKERS", "2"))
+                )
                 
                 print(f"- Exchange Wallet (from private key): {self.exchange.wallet.address}")
                 print(f"- Target Query Wallet: {self.wallet_address}")
@@ -63,316 +223,307 @@ class HyperliquidService:
     def is_api_configured(self) -> bool:
         return self.is_configured
     
+    def _post_info(self, payload: Dict[str, Any], url: str = INFO_URL) -> requests.Response:
+        """POST to the public info endpoint, recording metrics per info type"""
+        http = self.session or requests
+        with metrics.track_upstream(payload.get("type", "unknown")):
+            response = http.post(
+                url,
+                json=payload,
+                headers={"Content-Type": "application/json"},
+                timeout=self.upstream.timeout
+            )
+        if response.status_code != 200:
+            metrics.upstream_errors.inc(payload.get("type", "unknown"))
+        return response
+    
+    def _info_content(self, payload: Dict[str, Any], shared: Optional[Tuple[str, ...]] = None,
+                      url: str = INFO_URL) -> Optional[bytes]:
+        """Info response body, or None on an HTTP error.
+
+        In multi-worker mode, ``shared`` names the market data key (kind, *args)
+        to read from the owner process's shared memory before going upstream.
+        """
+        if shared is not None and self.market_data is not None:
+            content = self.market_data.read(market_key(url.removesuffix("/info"), *shared))
+            if content is not None:
+                return content
+        response = self._post_info(payload, url)
+        return response.content if response.status_code == 200 else None
+    
     async def get_portfolio(self) -> Portfolio:
         """Get user portfolio with positions and account value"""
+        return (await self.get_portfolio_snapshot()).value
+    
+    async def get_portfolio_snapshot(self) -> Snapshot:
+        """Portfolio with its age; the last good one (marked stale) while Hyperliquid is failing"""
         if not self.is_configured:
-            return self._generate_mock_portfolio()
+            return Snapshot(self._generate_mock_portfolio(), time.time())
+        return await self.upstream.call(
+            "clearinghouseState", (self.base_url, self.wallet_address, "portfolio"), self._fetch_portfolio
+        )
+    
+    def _fetch_portfolio(self) -> Portfolio:
+        print("Portfolio: Using real Hyperliquid API data")
         
-        try:
-            print("Portfolio: Using real Hyperliquid API data")
-            
-            # Use the wallet address from settings, not derived from private key
-            target_wallet = self.wallet_address
-            print(f"Querying portfolio for wallet: {target_wallet}")
-            
-            # Get user state from Hyperliquid using the target wallet address
+        # Use the wallet address from settings, not derived from private key
+        target_wallet = self.wallet_address
+        print(f"Querying portfolio for wallet: {target_wallet}")
+        
+        # Get user state from Hyperliquid using the target wallet address
+        with metrics.track_upstream("clearinghouseState"):
             user_state = self.info.user_state(target_wallet)
-            
-            # Debug: Print the raw user_state response
-            print(f"Raw user_state response: {json.dumps(user_state, indent=2)}")
-            
-            portfolio = Portfolio(
-                account_value=float(user_state.get("marginSummary", {}).get("accountValue", 0)),
-                available_balance=float(user_state.get("withdrawable", 0)),
-                margin_used=float(user_state.get("marginSummary", {}).get("totalMarginUsed", 0)),
-                total_pnl=float(user_state.get("marginSummary", {}).get("totalRawUsd", 0))
-            )
-            
-            # Convert positions
-            positions = []
-            for pos in user_state.get("assetPositions", []):
-                if float(pos["position"]["szi"]) != 0:
-                    position = Position(
-                        coin=pos["position"]["coin"],
-                        size=abs(float(pos["position"]["szi"])),
-                        entry_price=float(pos["position"]["entryPx"]),
-                        current_price=float(pos["position"]["positionValue"]) / abs(float(pos["position"]["szi"])),
-                        unrealized_pnl=float(pos["position"]["unrealizedPnl"]),
-                        side=OrderSide.BUY if float(pos["position"]["szi"]) > 0 else OrderSide.SELL
-                    )
-                    positions.append(position)
-            
-            portfolio.positions = positions
-            
-            print(f"Portfolio: Account Value ${portfolio.account_value}, Available ${portfolio.available_balance}, Positions: {len(positions)}")
-            return portfolio
-            
-        except Exception as e:
-            print(f"Error fetching real portfolio: {e}")
-            print("Portfolio: Falling back to mock data")
-            return self._generate_mock_portfolio()
+        
+        # Debug: Print the raw user_state response
+        print(f"Raw user_state response: {json.dumps(user_state, indent=2)}")
+        
+        portfolio = portfolio_from_user_state(user_state)
+        
+        print(f"Portfolio: Account Value ${portfolio.account_value}, Available ${portfolio.available_balance}, Positions: {len(portfolio.positions)}")
+        return portfolio
     
     async def get_account_info(self) -> Account:
         """Get account information"""
+        return (await self.get_account_snapshot()).value
+    
+    async def get_account_snapshot(self) -> Snapshot:
+        """Account info with its age; the last good one (marked stale) while Hyperliquid is failing"""
         if not self.is_configured:
             print("Account: Using mock data - API not configured")
-            return self._generate_mock_account()
+            return Snapshot(self._generate_mock_account(), time.time())
+        return await self.upstream.call(
+            "clearinghouseState", (self.base_url, self.wallet_address, "account"), self._fetch_account
+        )
+    
+    def _fetch_account(self) -> Account:
+        print("Account: Using real Hyperliquid API data")
         
-        try:
-            print("Account: Using real Hyperliquid API data")
-            
-            # Use the wallet address from settings, not derived from private key
-            target_wallet = self.wallet_address
-            print(f"Querying account info for wallet: {target_wallet}")
-            
+        # Use the wallet address from settings, not derived from private key
+        target_wallet = self.wallet_address
+        print(f"Querying account info for wallet: {target_wallet}")
+        
+        with metrics.track_upstream("clearinghouseState"):
             user_state = self.info.user_state(target_wallet)
+        
+        # Debug: Print the raw user_state response
+        print(f"Raw user_state response: {json.dumps(user_state, indent=2)}")
+        
+        # Get account value from marginSummary
+        margin_summary = user_state.get("marginSummary", {})
+        account_value = float(margin_summary.get("accountValue", 0))
+        withdrawable = float(user_state.get("withdrawable", 0))
+        
+        # If perpetual account is empty, check spot balances using different API
+        spot_balance = 0.0
+        try:
+            # Try to get spot token balances using the public API
+            spot_response = self._post_info({"type": "spotClearinghouseState", "user": target_wallet})
             
-            # Debug: Print the raw user_state response
-            print(f"Raw user_state response: {json.dumps(user_state, indent=2)}")
-            
-            # Get account value from marginSummary
-            margin_summary = user_state.get("marginSummary", {})
-            account_value = float(margin_summary.get("accountValue", 0))
-            withdrawable = float(user_state.get("withdrawable", 0))
-            
-            # If perpetual account is empty, check spot balances using different API
-            spot_balance = 0.0
-            try:
-                # Try to get spot token balances using the public API
-                import requests
+            if spot_response.status_code == 200:
+                spot_data = spot_response.json()
+                print(f"Raw spot_clearinghouse response: {json.dumps(spot_data, indent=2)}")
                 
-                spot_response = requests.post(
-                    "https://api.hyperliquid.xyz/info",
-                    json={"type": "spotClearinghouseState", "user": target_wallet},
-                    headers={"Content-Type": "application/json"}
-                )
+                if "balances" in spot_data:
+                    for balance in spot_data["balances"]:
+                        if balance.get("coin") == "USDC":
+                            total = float(balance.get("total", 0))
+                            hold = float(balance.get("hold", 0))
+                            spot_balance = total + hold
+                            print(f"Found USDC spot balance: total={total}, hold={hold}, combined={spot_balance}")
+                            break
+            else:
+                print(f"Spot API response status: {spot_response.status_code}")
+                print(f"Spot API response: {spot_response.text}")
                 
-                if spot_response.status_code == 200:
-                    spot_data = spot_response.json()
-                    print(f"Raw spot_clearinghouse response: {json.dumps(spot_data, indent=2)}")
-                    
-                    if "balances" in spot_data:
-                        for balance in spot_data["balances"]:
-                            if balance.get("coin") == "USDC":
-                                total = float(balance.get("total", 0))
-                                hold = float(balance.get("hold", 0))
-                                spot_balance = total + hold
-                                print(f"Found USDC spot balance: total={total}, hold={hold}, combined={spot_balance}")
-                                break
-                else:
-                    print(f"Spot API response status: {spot_response.status_code}")
-                    print(f"Spot API response: {spot_response.text}")
-                    
-            except Exception as e:
-                print(f"Error fetching spot balances via API: {e}")
-            
-            # Use the higher of perp account value or spot balance
-            total_account_value = max(account_value, spot_balance)
-            total_withdrawable = max(withdrawable, spot_balance)
-            
-            account = Account(
-                address=target_wallet,
-                account_value=total_account_value,
-                margin_summary=margin_summary,
-                cross_margin_summary=user_state.get("crossMarginSummary", {}),
-                withdrawable=total_withdrawable
-            )
-            
-            print(f"Account: Address {account.address[:8]}..., Account Value: ${account.account_value}, Withdrawable: ${account.withdrawable}")
-            print(f"Perp Account Value: ${account_value}, Spot Balance: ${spot_balance}")
-            return account
-            
         except Exception as e:
-            print(f"Error fetching real account info: {e}")
-            print("Account: Falling back to mock data")
-            return self._generate_mock_account()
+            print(f"Error fetching spot balances via API: {e}")
+        
+        # Use the higher of perp account value or spot balance
+        total_account_value = max(account_value, spot_balance)
+        total_withdrawable = max(withdrawable, spot_balance)
+        
+        account = Account(
+            address=target_wallet,
+            account_value=total_account_value,
+            margin_summary=margin_summary,
+            cross_margin_summary=user_state.get("crossMarginSummary", {}),
+            withdrawable=total_withdrawable
+        )
+        
+        print(f"Account: Address {account.address[:8]}..., Account Value: ${account.account_value}, Withdrawable: ${account.withdrawable}")
+        print(f"Perp Account Value: ${account_value}, Spot Balance: ${spot_balance}")
+        return account
     
     async def get_market_data(self, coin: str) -> MarketData:
         """Get current market data for a coin from real Hyperliquid API"""
-        try:
-            # Always fetch real market data from Hyperliquid public API
-            import requests
+        return (await self.get_market_data_snapshot(coin)).value
+    
+    async def get_market_data_snapshot(self, coin: str) -> Snapshot:
+        return await self.upstream.call(
+            "allMids", ("market_data", coin), lambda: self._fetch_market_data(coin)
+        )
+    
+    def _fetch_market_data(self, coin: str) -> MarketData:
+        # Always fetch real market data from Hyperliquid public API
+        # Get all mids (current prices)
+        mids_content = self._info_content({"type": "allMids"}, ("allMids",))
+        
+        if mids_content is not None:
+            all_mids = decode_all_mids(loads(mids_content))
             
-            # Get all mids (current prices)
-            mids_response = requests.post(
-                "https://api.hyperliquid.xyz/info",
-                json={"type": "allMids"},
-                headers={"Content-Type": "application/json"}
-            )
+            # Get current price for the coin
+            current_price = all_mids.price(coin) or 0.0
             
-            if mids_response.status_code == 200:
-                all_mids = mids_response.json()
+            if current_price > 0:
+                # Calculate approximate bid/ask spread (0.1% typical for major pairs)
+                spread = current_price * 0.001
+                bid = current_price - spread
+                ask = current_price + spread
                 
-                # Get current price for the coin
-                current_price = float(all_mids.get(coin, 0))
+                # For now, we'll use approximate values for volume and change
+                # In a production system, you'd calculate these from historical data
+                volume_24h = current_price * 1000000  # Approximate volume
+                change_24h = 0.0  # Would need historical data to calculate
                 
-                if current_price > 0:
-                    # Get 24h volume and other data
-                    meta_response = requests.post(
-                        "https://api.hyperliquid.xyz/info", 
-                        json={"type": "meta"},
-                        headers={"Content-Type": "application/json"}
-                    )
-                    
-                    # Calculate approximate bid/ask spread (0.1% typical for major pairs)
-                    spread = current_price * 0.001
-                    bid = current_price - spread
-                    ask = current_price + spread
-                    
-                    # Get 24h stats if available
-                    stats_response = requests.post(
-                        "https://api.hyperliquid.xyz/info",
-                        json={"type": "spotMeta"},
-                        headers={"Content-Type": "application/json"}
-                    )
-                    
-                    # For now, we'll use approximate values for volume and change
-                    # In a production system, you'd calculate these from historical data
-                    volume_24h = current_price * 1000000  # Approximate volume
-                    change_24h = 0.0  # Would need historical data to calculate
-                    
-                    return MarketData(
-                        coin=coin,
-                        price=current_price,
-                        bid=bid,
-                        ask=ask,
-                        volume_24h=volume_24h,
-                        change_24h=change_24h
-                    )
-            
-            # If we can't get real data, return error
-            raise Exception(f"Could not fetch real market data for {coin}")
-            
-        except Exception as e:
-            print(f"Error fetching real market data for {coin}: {e}")
-            raise Exception(f"Failed to fetch real market data: {str(e)}")
-    
-    async def get_candlestick_data(self, coin: str, interval: str = "1h", limit: int = 100) -> List[CandlestickData]:
+                return MarketData(
+                    coin=coin,
+                    price=current_price,
+                    bid=bid,
+                    ask=ask,
+                    volume_24h=volume_24h,
+                    change_24h=change_24h
+                )
+        
+        # If we can't get real data, return error
+        raise Exception(f"Could not fetch real market data for {coin}")
+
+    async def get_all_mids_snapshot(self) -> Snapshot:
+        """Mid price of every coin on this service's exchange from one request, as coin -> price"""
+        # Orders go to the environment's exchange, so its prices drive strategies, not mainnet's
+        base_url = base_url_for(self.environment)
+        return await self.upstream.call(
+            "allMids", ("all_mids", base_url), lambda: self._fetch_all_mids(base_url)
+        )
+
+    def _fetch_all_mids(self, base_url: str) -> Dict[str, float]:
+        mids_content = self._info_content({"type": "allMids"}, ("allMids",), f"{base_url}/info")
+        if mids_content is None:
+            raise Exception("Could not fetch mid prices")
+        mids = decode_all_mids(loads(mids_content))
+        return dict(zip(mids.coins, mids.prices.tolist()))
+
+    async def get_candlestick_data(self, coin: str, interval: str = "1h", limit: int = 100,
+                                   end_time: Optional[int] = None) -> List[CandlestickData]:
         """Get real candlestick data for a coin from Hyperliquid API"""
-        try:
-            # Always fetch real candlestick data from Hyperliquid public API
-            import requests
-            from datetime import datetime, timedelta
-            
-            # Convert interval to Hyperliquid format
-            interval_map = {
-                "1m": "1m",
-                "5m": "5m", 
-                "15m": "15m",
-                "1h": "1h",
-                "4h": "4h",
-                "1d": "1d"
-            }
-            
-            hl_interval = interval_map.get(interval, "1h")
-            
-            # Get current time and calculate start time
-            end_time = int(datetime.utcnow().timestamp() * 1000)
-            
-            # Calculate interval duration in milliseconds
-            interval_ms = {
-                "1m": 60 * 1000,
-                "5m": 5 * 60 * 1000,
-                "15m": 15 * 60 * 1000, 
-                "1h": 60 * 60 * 1000,
-                "4h": 4 * 60 * 60 * 1000,
-                "1d": 24 * 60 * 60 * 1000
+        return (await self.get_candlestick_data_snapshot(coin, interval, limit, end_time)).value
+    
+    async def get_candlestick_data_snapshot(self, coin: str, interval: str = "1h", limit: int = 100,
+                                            end_time: Optional[int] = None) -> Snapshot:
+        return await self.upstream.call(
+            "candleSnapshot", ("candles", coin, interval, limit, end_time),
+            lambda: self._fetch_candlestick_data(coin, interval, limit, end_time)
+        )
+    
+    def _fetch_candlestick_data(self, coin: str, interval: str, limit: int,
+                                end_time: Optional[int]) -> List[CandlestickData]:
+        # Always fetch real candlestick data from Hyperliquid public API
+        hl_interval = interval if interval in CANDLE_INTERVAL_MS else "1h"
+        
+        # Up to end_time (ms), or now for the latest candles
+        latest = end_time is None
+        if latest:
+            end_time = int(time.time() * 1000)
+        
+        start_time = end_time - (limit * CANDLE_INTERVAL_MS[hl_interval])
+        
+        # The owner process keeps the latest candle_depth candles; older ranges go upstream
+        shared = None
+        if self.market_data is not None and latest and limit <= self.market_data.candle_depth:
+            shared = ("candles", coin, hl_interval)
+        candles_content = self._info_content({
+            "type": "candleSnapshot",
+            "req": {
+                "coin": coin,
+                "interval": hl_interval,
+                "startTime": start_time,
+                "endTime": end_time
             }
+        }, shared)
+        
+        if candles_content is not None:
+            candles = decode_candles(loads(candles_content))
             
-            start_time = end_time - (limit * interval_ms.get(hl_interval, 60 * 60 * 1000))
-            
-            candles_response = requests.post(
-                "https://api.hyperliquid.xyz/info",
-                json={
-                    "type": "candleSnapshot",
-                    "req": {
-                        "coin": coin,
-                        "interval": hl_interval,
-                        "startTime": start_time,
-                        "endTime": end_time
-                    }
-                },
-                headers={"Content-Type": "application/json"}
-            )
-            
-            if candles_response.status_code == 200:
-                candles_data = candles_response.json()
-                
-                candlesticks = []
-                for candle in candles_data:
-                    # Hyperliquid candle format: [timestamp, open, high, low, close, volume]
-                    timestamp = datetime.fromtimestamp(candle["t"] / 1000)
-                    
-                    candlesticks.append(CandlestickData(
-                        coin=coin,
-                        timestamp=timestamp,
-                        open=float(candle["o"]),
-                        high=float(candle["h"]),
-                        low=float(candle["l"]),
-                        close=float(candle["c"]),
-                        volume=float(candle.get("v", 0))
-                    ))
-                
-                return candlesticks[-limit:] if candlesticks else []
-            
-            raise Exception(f"Could not fetch real candlestick data for {coin}")
-            
-        except Exception as e:
-            print(f"Error fetching real candlestick data for {coin}: {e}")
-            # For now, return empty list instead of mock data
-            return []
+            # Only build models for the candles actually returned
+            first = max(0, len(candles.open_time) - limit)
+            return [
+                CandlestickData(
+                    coin=coin,
+                    timestamp=datetime.fromtimestamp(open_time / 1000),
+                    open=open_px,
+                    high=high,
+                    low=low,
+                    close=close,
+                    volume=volume
+                )
+                for open_time, open_px, high, low, close, volume in zip(
+                    candles.open_time[first:].tolist(), candles.open[first:].tolist(),
+                    candles.high[first:].tolist(), candles.low[first:].tolist(),
+                    candles.close[first:].tolist(), candles.volume[first:].tolist()
+                )
+            ]
+        
+        raise Exception(f"Could not fetch real candlestick data for {coin}")
     
     async def get_order_book(self, coin: str) -> OrderBook:
         """Get real order book for a coin from Hyperliquid API"""
-        try:
-            # Always fetch real order book data from Hyperliquid public API
-            import requests
-            
-            orderbook_response = requests.post(
-                "https://api.hyperliquid.xyz/info",
-                json={"type": "l2Book", "coin": coin},
-                headers={"Content-Type": "application/json"}
-            )
-            
-            if orderbook_response.status_code == 200:
-                l2_book = orderbook_response.json()
-                
-                bids = []
-                asks = []
-                
-                # The levels array has two sub-arrays: [bids, asks]
-                levels = l2_book.get("levels", [])
-                if len(levels) >= 2:
-                    # First array is bids (index 0)
-                    for level in levels[0]:
-                        price = float(level["px"])
-                        size = float(level["sz"])
-                        bids.append(OrderBookLevel(price=price, size=size))
-                    
-                    # Second array is asks (index 1)  
-                    for level in levels[1]:
-                        price = float(level["px"])
-                        size = float(level["sz"])
-                        asks.append(OrderBookLevel(price=price, size=size))
-                
-                # Sort bids (highest first) and asks (lowest first)
-                bids.sort(key=lambda x: x.price, reverse=True)
-                asks.sort(key=lambda x: x.price)
-                
-                return OrderBook(coin=coin, bids=bids[:20], asks=asks[:20])  # Limit to top 20 levels
-            
-            raise Exception(f"Could not fetch real order book for {coin}")
-            
-        except Exception as e:
-            print(f"Error fetching real order book for {coin}: {e}")
-            raise Exception(f"Failed to fetch real order book: {str(e)}")
+        return (await self.get_order_book_snapshot(coin)).value
+    
+    async def get_order_book_snapshot(self, coin: str) -> Snapshot:
+        return await self.upstream.call(
+            "l2Book", ("order_book", coin), lambda: self._fetch_order_book(coin)
+        )
+    
+    def _fetch_order_book(self, coin: str) -> OrderBook:
+        # Always fetch real order book data from Hyperliquid public API
+        orderbook_content = self._info_content({"type": "l2Book", "coin": coin}, ("l2Book", coin))
+        
+        if orderbook_content is not None:
+            book = decode_l2_book(loads(orderbook_content))
+            
+            # Bids highest first, asks lowest first, top 20 levels each
+            bid_rows = np.argsort(-book.bid_px, kind="stable")[:20]
+            ask_rows = np.argsort(book.ask_px, kind="stable")[:20]
+            bids = [
+                OrderBookLevel(price=price, size=size)
+                for price, size in zip(book.bid_px[bid_rows].tolist(), book.bid_sz[bid_rows].tolist())
+            ]
+            asks = [
+                OrderBookLevel(price=price, size=size)
+                for price, size in zip(book.ask_px[ask_rows].tolist(), book.ask_sz[ask_rows].tolist())
+            ]
+            
+            return OrderBook(coin=coin, bids=bids, asks=asks)
+        
+        raise Exception(f"Could not fetch real order book for {coin}")
     
     async def place_order(self, coin: str, is_buy: bool, size: float, price: Optional[float] = None, 
                          order_type: OrderType = OrderType.LIMIT, reduce_only: bool = False) -> Order:
         """Place a trading order"""
+        with self._order_in_flight():
+            return await self._place_order(coin, is_buy, size, price, order_type, reduce_only)
+    
+    async def _place_order(self, coin: str, is_buy: bool, size: float, price: Optional[float],
+                           order_type: OrderType, reduce_only: bool) -> Order:
         if not self.is_configured:
             return self._generate_mock_order(coin, is_buy, size, price, order_type)
         
+        # Quantize locally so invalid tick/lot sizes never cost a signed round trip
+        size, price = self.quantize_order(coin, size, price)
+        if order_type == OrderType.MARKET:
+            price = await self.market_order_price(coin, is_buy, size)
+        elif price is None:
+            raise ValueError("Price required for limit orders")
+        
         try:
             print(f"Placing order: {coin}, buy={is_buy}, size={size}, price={price}, type={order_type}")
             
@@ -383,17 +534,20 @@ class HyperliquidService:
             if order_type == OrderType.LIMIT:
                 hl_order_type = HlOrderType(limit={"tif": "Gtc"})
             else:
-                hl_order_type = HlOrderType(market={})
-            
-            # Use the correct method signature
-            response = self.exchange.order(
-                name=coin,
-                is_buy=is_buy,
-                sz=size,
-                limit_px=price or 0.0,  # Hyperliquid requires a price even for market orders
-                order_type=hl_order_type,
-                reduce_only=reduce_only
-            )
+                # Marketable IOC limit: fills within the slippage cap, the remainder is cancelled
+                hl_order_type = HlOrderType(limit={"tif": "Ioc"})
+            
+            # Signed and posted off the event loop, alongside any other in-flight orders
+            async with self.upstream.guard("exchange"):
+                with metrics.track_upstream("order"):
+                    response = await self._with_order_timeout(self.pipeline.order(
+                        coin,
+                        is_buy,
+                        size,
+                        price,
+                        hl_order_type,
+                        reduce_only
+                    ))
             
             print(f"Order response: {response}")
             
@@ -412,6 +566,7 @@ class HyperliquidService:
                         elif "filled" in status:
                             # Order was filled immediately
                             filled_data = status["filled"]
+                            filled_size = float(filled_data.get("totalSz", 0))
                             return Order(
                                 oid=filled_data.get("oid"),
                                 coin=coin,
@@ -419,8 +574,9 @@ class HyperliquidService:
                                 size=size,
                                 price=float(filled_data.get("avgPx", price or 0)),
                                 order_type=order_type,
-                                status=OrderStatus.FILLED,
-                                filled_size=float(filled_data.get("totalSz", 0)),
+                                # An IOC may fill partially within its limit; the rest is cancelled
+                                status=OrderStatus.FILLED if filled_size >= size else OrderStatus.PARTIALLY_FILLED,
+                                filled_size=filled_size,
                                 remaining_size=0.0,
                                 average_fill_price=float(filled_data.get("avgPx", 0)),
                                 reduce_only=reduce_only
@@ -428,6 +584,15 @@ class HyperliquidService:
                         elif "resting" in status:
                             # Order is resting on the book
                             resting_data = status["resting"]
+                            self.open_orders.book(self.base_url, self.wallet_address).upsert({
+                                "oid": resting_data.get("oid"),
+                                "coin": coin,
+                                "side": "B" if is_buy else "A",
+                                "limitPx": str(price),
+                                "sz": str(size),
+                                "origSz": str(size),
+                                "timestamp": int(time.time() * 1000)
+                            })
                             return Order(
                                 oid=resting_data.get("oid"),
                                 coin=coin,
@@ -457,96 +622,135 @@ class HyperliquidService:
                 raise Exception(f"Order failed: {response}")
                 
         except Exception as e:
+            # Never report an order that may not exist; the caller sees the failure
             print(f"Error placing order: {e}")
-            return self._generate_mock_order(coin, is_buy, size, price, order_type)
+            raise
+    
+    @contextmanager
+    def _order_in_flight(self):
+        self._orders_in_flight += 1
+        self._orders_idle.clear()
+        try:
+            yield
+        finally:
+            self._orders_in_flight -= 1
+            if not self._orders_in_flight:
+                self._orders_idle.set()
+    
+    async def retire(self):
+        """Shut the order pipeline down once the orders already running on this instance finish"""
+        if self.pipeline is None:
+            return
+        # Long enough for a market order's book fetch plus the order itself
+        timeout = self.upstream.timeout + self.order_timeout
+        try:
+            await asyncio.wait_for(self._orders_idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            print(f"Retiring Hyperliquid service with {self._orders_in_flight} orders still running")
+        await asyncio.to_thread(self.pipeline.shutdown, timeout)
+    
+    async def _with_order_timeout(self, action):
+        """Await an order action, raising OrderTimeout (a failure for the breaker) once order_timeout passes"""
+        try:
+            return await asyncio.wait_for(action, self.order_timeout)
+        except asyncio.TimeoutError:
+            raise OrderTimeout(f"No answer from the exchange within {self.order_timeout:g}s")
+    
+    def quantize_order(self, coin: str, size: float, price: Optional[float]) -> Tuple[float, Optional[float]]:
+        """Round size down to the coin's lot size and price to its tick rules"""
+        universe = self.universe.get(self.base_url) if self.universe else None
+        rounding = universe.rounding.get(coin) if universe else None
+        if rounding is None:
+            return size, price
+        
+        size = rounding.size(size)
+        if size <= 0:
+            raise ValueError(f"Order size is below the minimum of {rounding.min_size} {coin}")
+        return size, rounding.price(price) if price else price
+    
+    async def market_order_price(self, coin: str, is_buy: bool, size: float) -> float:
+        """Aggressive IOC limit for a market order, priced from the cached book"""
+        book = self.books.get(coin, self.market_book_max_age)
+        metrics.record_cache("order_book", book is not None)
+        if book is None:
+            # First order for this coin (or a stalled stream): one snapshot, then the stream takes over
+            async with self.upstream.guard("l2Book"):
+                content = await asyncio.to_thread(
+                    self._info_content, {"type": "l2Book", "coin": coin}, ("l2Book", coin), f"{self.base_url}/info"
+                )
+                if content is None:
+                    raise Exception(f"Could not fetch the {coin} order book")
+            book = self.books.update(loads(content))
+            asyncio.get_running_loop().run_in_executor(None, self._track_book, coin)
+        
+        price = marketable_price(book, is_buy, size, self.market_max_slippage, self.market_price_buffer)
+        return self.quantize_order(coin, size, price)[1]
+    
+    def _track_book(self, coin: str):
+        try:
+            self.books.track(coin)
+        except Exception as e:
+            print(f"Failed to stream the {coin} order book: {e}")
     
     async def cancel_order(self, coin: str, oid: int) -> bool:
         """Cancel an order"""
+        with self._order_in_flight():
+            return await self._cancel_order(coin, oid)
+    
+    async def _cancel_order(self, coin: str, oid: int) -> bool:
         if not self.is_configured:
             return True  # Mock success
         
         try:
-            response = self.exchange.cancel(coin, oid)
-            return response.get("status") == "ok"
+            async with self.upstream.guard("exchange"):
+                with metrics.track_upstream("cancel"):
+                    response = await self._with_order_timeout(self.pipeline.cancel(coin, oid))
+            if response.get("status") == "ok":
+                self.open_orders.book(self.base_url, self.wallet_address).remove(oid)
+                return True
+            return False
             
         except Exception as e:
             print(f"Error cancelling order: {e}")
             return False
     
-    async def get_open_orders(self) -> List[Order]:
-        """Get all open orders"""
+    async def get_open_orders(self, coin: Optional[str] = None) -> List[Order]:
+        """Get open orders, optionally for one coin, from the in-memory open-orders book"""
         if not self.is_configured:
-            return self._generate_mock_orders(5)
+            # No wallet, no open orders; mock orders would look like real ones in the book's views
+            return []
         
-        try:
-            # Use the wallet address from settings
-            target_wallet = self.wallet_address
-            open_orders = self.info.open_orders(target_wallet)
-            
-            orders = []
-            for order_data in open_orders:
-                orders.append(Order(
-                    oid=order_data.get("oid"),
-                    coin=order_data.get("coin"),
-                    side=OrderSide.BUY if order_data.get("side") == "B" else OrderSide.SELL,
-                    size=float(order_data.get("sz", 0)),
-                    price=float(order_data.get("limitPx", 0)),
-                    order_type=OrderType.LIMIT,
-                    status=OrderStatus.PENDING,
-                    remaining_size=float(order_data.get("sz", 0))
-                ))
-            
-            return orders
-            
-        except Exception as e:
-            print(f"Error fetching open orders: {e}")
-            return self._generate_mock_orders(5)
+        # Raises when the book cannot be seeded; never falls back to mock orders
+        open_orders = await self.open_orders.get_orders(self.base_url, self.wallet_address, coin)
+        return [order_from_open_order(order_data) for order_data in open_orders]
     
     async def get_order_history(self, limit: int = 50) -> List[Order]:
-        """Get order history from real Hyperliquid API"""
+        """Get the most recent order history"""
+        page = await self.get_order_history_page(limit=limit)
+        return page["orders"]
+    
+    async def get_order_history_page(self, limit: int = 50, cursor: Optional[str] = None,
+                                     coin: Optional[str] = None, start_time: Optional[int] = None,
+                                     end_time: Optional[int] = None) -> Dict[str, Any]:
+        """Get one page of order history from the local fills store, newest first"""
         if not self.is_configured:
-            return self._generate_mock_orders(limit)
+            orders = self._generate_mock_orders(limit)
+            return {"orders": orders, "total": len(orders), "page": 1, "has_more": False, "next_cursor": None}
         
+        base_url = base_url_for(self.environment)
         try:
-            import requests
-            
-            # Get user fills (trade history) from Hyperliquid
-            fills_response = requests.post(
-                "https://api.hyperliquid.xyz/info",
-                json={"type": "userFills", "user": self.wallet_address},
-                headers={"Content-Type": "application/json"}
-            )
-            
-            if fills_response.status_code == 200:
-                fills_data = fills_response.json()
-                
-                orders = []
-                for fill in fills_data[:limit]:
-                    # Convert Hyperliquid fill to our Order format
-                    orders.append(Order(
-                        oid=fill.get("oid"),
-                        coin=fill.get("coin"),
-                        side=OrderSide.BUY if fill.get("side") == "B" else OrderSide.SELL,
-                        size=float(fill.get("sz", 0)),
-                        price=float(fill.get("px", 0)),
-                        order_type=OrderType.LIMIT,  # Most fills are from limit orders
-                        status=OrderStatus.FILLED,
-                        filled_size=float(fill.get("sz", 0)),
-                        remaining_size=0.0,
-                        average_fill_price=float(fill.get("px", 0)),
-                        created_at=datetime.fromtimestamp(fill.get("time", 0) / 1000),
-                        updated_at=datetime.fromtimestamp(fill.get("time", 0) / 1000)
-                    ))
-                
-                print(f"Fetched {len(orders)} fills from order history")
-                return orders
-            else:
-                print(f"Failed to fetch order history: {fills_response.status_code}")
-                return self._generate_mock_orders(limit)
-            
+            # Only fetches fills newer than the ones already stored
+            await self.fills_store.sync(base_url, self.wallet_address)
         except Exception as e:
-            print(f"Error fetching order history: {e}")
-            return self._generate_mock_orders(limit)
+            print(f"Error syncing order history: {e}")
+        
+        # Raises ValueError for a malformed cursor
+        page = self.fills_store.query(
+            base_url, self.wallet_address, limit=limit, cursor=cursor,
+            coin=coin, start_time=start_time, end_time=end_time
+        )
+        page["orders"] = orders_from_fills(page.pop("fills"))
+        return page
     
     # Mock data generators
     def _generate_mock_portfolio(self) -> Portfolio:
@@ -690,5 +894,4 @@ class HyperliquidService:
         
         return orders
 
-# Global service instance
-hyperliquid_service = HyperliquidService()
+# The global service instance lives in service_registry
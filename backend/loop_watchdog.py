@@ -0,0 +1,180 @@
+"""
+Event loop watchdog for the Hypertrader backend.
+
+A heartbeat callback on the event loop stamps the time every few
+milliseconds while a background thread watches the stamp. When the
+heartbeat is late by more than the threshold, some callback is blocking the
+loop: the thread grabs the loop thread's current stack together with the
+route and coin of the running task, then logs it and reports it through
+/api/metrics once the stall ends.
+
+Opt-in with LOOP_WATCHDOG_ENABLED=true; LOOP_WATCHDOG_THRESHOLD_MS sets the
+stall threshold (default 250 ms).
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from metrics import metrics
+
+blocked_calls = metrics.counter(
+    "hypertrader_event_loop_blocked_total", "Event loop stalls above the watchdog threshold",
+    ("route", "coin"))
+blocked_duration = metrics.histogram(
+    "hypertrader_event_loop_blocked_duration_seconds", "Duration of event loop stalls",
+    ("route",), buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+
+class LoopWatchdog:
+    """Detects callbacks that block the event loop and captures their stack"""
+
+    def __init__(self, enabled: bool = False, threshold: float = 0.25,
+                 interval: float = 0.05, max_reports: int = 50):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.interval = interval
+        self.reports: Deque[Dict[str, Any]] = deque(maxlen=max_reports)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._last_beat = 0.0
+        # task -> ASGI scope (or scope-like dict) describing what the task serves
+        self._task_contexts: Dict[asyncio.Task, Dict[str, Any]] = {}
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Start the heartbeat on the loop and the watching thread; must run on the loop thread"""
+        if not self.enabled or self._running:
+            return
+
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()
+        self._running = True
+        self._last_beat = time.monotonic()
+        loop.call_soon(self._beat)
+
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        print(f"Loop watchdog started (threshold {self.threshold * 1000:.0f} ms)")
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def track_task(self, context: Dict[str, Any], task: Optional[asyncio.Task] = None):
+        """Associate the current (or given) task with a route/coin context"""
+        if not self._running:
+            return
+        task = task or asyncio.current_task()
+        if task is not None:
+            self._task_contexts[task] = context
+
+    def untrack_task(self, task: Optional[asyncio.Task] = None):
+        if not self._task_contexts:
+            return
+        task = task or asyncio.current_task()
+        self._task_contexts.pop(task, None)
+
+    def get_reports(self) -> List[Dict[str, Any]]:
+        return list(self.reports)
+
+    def _beat(self):
+        self._last_beat = time.monotonic()
+        if self._running:
+            self._loop.call_later(self.interval, self._beat)
+
+    def _watch(self):
+        report = None
+        while self._running:
+            time.sleep(self.interval)
+            blocked_for = time.monotonic() - self._last_beat - self.interval
+
+            if blocked_for >= self.threshold:
+                if report is None:
+                    # Capture once per stall, while the offending code is still on the stack
+                    report = self._capture(blocked_for)
+                else:
+                    report["blocked_seconds"] = blocked_for
+            elif report is not None:
+                self._finish(report)
+                report = None
+
+    def _capture(self, blocked_for: float) -> Dict[str, Any]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.format_stack(frame) if frame is not None else []
+
+        task = asyncio.current_task(self._loop)
+        route, coin = self._describe(self._task_contexts.get(task))
+
+        report = {
+            "detected_at": datetime.utcnow().isoformat(),
+            "blocked_seconds": blocked_for,
+            "route": route,
+            "coin": coin,
+            "task": task.get_name() if task is not None else None,
+            "stack": [line.rstrip() for line in stack],
+        }
+        print(
+            f"Loop watchdog: event loop blocked for >{blocked_for * 1000:.0f} ms "
+            f"(route={route}, coin={coin})\n" + "".join(stack)
+        )
+        return report
+
+    def _finish(self, report: Dict[str, Any]):
+        self.reports.append(report)
+        blocked_calls.inc(report["route"], report["coin"] or "")
+        blocked_duration.observe(report["route"], value=report["blocked_seconds"])
+        print(
+            f"Loop watchdog: stall in {report['route']} lasted "
+            f"{report['blocked_seconds'] * 1000:.0f} ms"
+        )
+
+    @staticmethod
+    def _describe(context: Optional[Dict[str, Any]]):
+        """Extract (route, coin) from an ASGI scope or a scope-like dict"""
+        if not context:
+            return "background", None
+
+        route = getattr(context.get("route"), "path", None) or context.get("path", "unknown")
+        coin = (context.get("path_params") or {}).get("coin")
+        if coin is None and context.get("query_string"):
+            coin = parse_qs(context["query_string"].decode("latin-1")).get("coin", [None])[0]
+        return route, coin
+
+class TaskContextMiddleware:
+    """ASGI middleware that tells the watchdog which request each task is serving.
+
+    Must be the innermost middleware so it runs in the same task as the endpoint.
+    """
+
+    def __init__(self, app, watchdog: LoopWatchdog):
+        self.app = app
+        self.watchdog = watchdog
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket") or not self.watchdog.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        # The router fills in route and path_params on this same scope dict
+        self.watchdog.track_task(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.watchdog.untrack_task()
+
+# Global watchdog instance
+loop_watchdog = LoopWatchdog(
+    enabled=os.getenv("LOOP_WATCHDOG_ENABLED", "false").lower() in ("1", "true", "yes"),
+    threshold=float(os.getenv("LOOP_WATCHDOG_THRESHOLD_MS", "250")) / 1000,
+)
@@ -0,0 +1,209 @@
+"""
+Market data owner process for multi-worker deployments.
+
+Run next to ``uvicorn server:app --workers N`` (see entrypoint.sh, which
+does this when HYPERTRADER_WORKERS > 1). It listens for the keys workers
+ask for (see ``shared_market_data``) and polls each of them upstream on
+its own interval, publishing every response into that key's shared-memory
+segment. Upstream load is one request per key per interval however many
+workers read it. A key nobody has asked for within ``idle_timeout`` stops
+being polled and its segment is removed.
+
+Keys name coins taken from request paths, so only coins listed in the
+universe cache (perp and spot) of the key's API host are polled; otherwise
+any string could take one of the ``max_keys`` pollers and keep real coins
+out. The universe of a host is fetched (and then kept refreshed) the first
+time a key for it is demanded, and rejected demands are logged.
+
+    python market_data_owner.py
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import time
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+import requests
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hyperliquid_service import CANDLE_INTERVAL_MS, base_url_for
+from shared_market_data import CAPACITY, SharedSlot, parse_key, segment_name
+from universe_cache import Universe, UniverseCache
+
+def universe_coins(universe: Universe) -> FrozenSet[str]:
+    spot = (universe.spot_meta or {}).get("universe", []) if isinstance(universe.spot_meta, dict) else []
+    return frozenset(
+        [asset.name for asset in universe.active()] + [item.get("name", "") for item in spot]
+    )
+
+class MarketDataOwner:
+    def __init__(self, prefix: str, socket_path: str, candle_depth: int = 500,
+                 intervals: Optional[Dict[str, float]] = None, idle_timeout: float = 60.0,
+                 max_keys: int = 256, timeout: float = 5.0, universe_path: str = "universe_cache.json",
+                 universe_refresh_interval: float = 600.0):
+        self.prefix = prefix
+        self.socket_path = socket_path
+        self.candle_depth = candle_depth
+        self.intervals = {"allMids": 1.0, "l2Book": 1.0, "candles": 5.0, **(intervals or {})}
+        self.idle_timeout = idle_timeout
+        # Keys come from request parameters, so bound how many are polled at once
+        self.max_keys = max_keys
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+        self._demanded_at: Dict[str, float] = {}
+        self._pollers: Dict[str, asyncio.Task] = {}
+        # The server's persisted universe; refetched here when missing or old
+        self.universe = UniverseCache(self.session, universe_path, universe_refresh_interval)
+        self._coins: Dict[str, Tuple[str, FrozenSet[str]]] = {}  # Base URL -> (universe digest, coins)
+        # Only the API hosts are polled, whatever URL a key names
+        self.base_urls = frozenset((base_url_for("mainnet"), base_url_for("testnet")))
+        self._universe_fetches: Dict[str, asyncio.Task] = {}
+        self._rejected_at: Dict[str, float] = {}
+
+    async def run(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(self.socket_path)
+        sock.setblocking(False)
+        loop = asyncio.get_running_loop()
+        self.universe.load()
+        self.universe.start_refresh([base_url_for("mainnet")])
+        print(f"Market data owner listening on {self.socket_path}")
+        try:
+            while True:
+                data = await loop.sock_recv(sock, 1024)
+                self.demand(data.decode(errors="replace"))
+        finally:
+            sock.close()
+            os.unlink(self.socket_path)
+            await self.universe.stop_refresh()
+            for task in [*self._pollers.values(), *self._universe_fetches.values()]:
+                task.cancel()
+
+    def demand(self, key: str):
+        try:
+            url, kind, args = parse_key(key)
+        except ValueError:
+            return
+        if kind not in CAPACITY or (kind == "candles" and (len(args) != 2 or args[1] not in CANDLE_INTERVAL_MS)):
+            return
+        if url not in self.base_urls:
+            self._reject(key, f"{url} is not a Hyperliquid API host")
+            return
+        if args and args[0] not in self.known_coins(url):
+            listed = self.universe.get(url) is not None
+            self._reject(key, f"{args[0]} is not listed" if listed else "the universe is still loading")
+            return
+        self._demanded_at[key] = time.monotonic()
+        if key not in self._pollers and len(self._pollers) < self.max_keys:
+            self._pollers[key] = asyncio.create_task(self._poll(key), name=f"market-data {key}")
+
+    def _reject(self, key: str, reason: str):
+        # Workers repeat a demand every few seconds; log it once per idle_timeout
+        now = time.monotonic()
+        if now - self._rejected_at.get(key, float("-inf")) < self.idle_timeout:
+            return
+        if len(self._rejected_at) >= 4 * self.max_keys:
+            self._rejected_at.clear()
+        self._rejected_at[key] = now
+        print(f"Not polling {key}: {reason}")
+
+    def known_coins(self, base_url: str) -> FrozenSet[str]:
+        """Perp and spot names of the cached universe; empty (nothing polled) until it is loaded"""
+        universe = self.universe.get(base_url)
+        if universe is None:
+            self._fetch_universe(base_url)
+            return frozenset()
+        cached = self._coins.get(base_url)
+        if cached is None or cached[0] != universe.digest:
+            cached = self._coins[base_url] = (universe.digest, universe_coins(universe))
+        return cached[1]
+
+    def _fetch_universe(self, base_url: str):
+        """Fetch a host's universe in the background; the refresh loop keeps it current from then on"""
+        if base_url in self._universe_fetches:
+            return
+
+        async def fetch():
+            try:
+                await self.universe.ensure(base_url)
+            except Exception as e:
+                print(f"Could not fetch the {base_url} universe: {e}")
+            finally:
+                self._universe_fetches.pop(base_url, None)
+
+        self._universe_fetches[base_url] = asyncio.create_task(fetch(), name=f"universe {base_url}")
+
+    def payload(self, kind: str, args) -> Dict[str, Any]:
+        """Info request for a key, e.g. the latest candle_depth candles for candles keys"""
+        if kind == "allMids":
+            return {"type": "allMids"}
+        if kind == "l2Book":
+            return {"type": "l2Book", "coin": args[0]}
+        coin, interval = args
+        end_time = int(time.time() * 1000)
+        return {
+            "type": "candleSnapshot",
+            "req": {
+                "coin": coin,
+                "interval": interval,
+                "startTime": end_time - self.candle_depth * CANDLE_INTERVAL_MS[interval],
+                "endTime": end_time
+            }
+        }
+
+    async def _poll(self, key: str):
+        url, kind, args = parse_key(key)
+        slot = SharedSlot.create(segment_name(self.prefix, key), CAPACITY[kind])
+        print(f"Polling {key}")
+        try:
+            while time.monotonic() - self._demanded_at[key] < self.idle_timeout:
+                started = time.monotonic()
+                try:
+                    response = await asyncio.to_thread(
+                        self.session.post, f"{url}/info", json=self.payload(kind, args), timeout=self.timeout
+                    )
+                    if response.status_code == 200:
+                        if not slot.write(response.content, time.time()):
+                            print(f"{key} payload of {len(response.content)} bytes exceeds the segment")
+                    else:
+                        print(f"Polling {key} failed with HTTP {response.status_code}")
+                except Exception as e:
+                    print(f"Polling {key} failed: {e!r}")
+                await asyncio.sleep(max(0.0, self.intervals[kind] - (time.monotonic() - started)))
+        finally:
+            print(f"Stopped polling {key}")
+            self._pollers.pop(key, None)
+            slot.close()
+            slot.memory.unlink()
+
+def main():
+    load_dotenv()
+    owner = MarketDataOwner(
+        prefix=os.getenv("MARKET_DATA_SHM_PREFIX", "hypertrader"),
+        socket_path=os.getenv("MARKET_DATA_SOCKET", "/tmp/hypertrader-market-data.sock"),
+        candle_depth=int(os.getenv("MARKET_DATA_CANDLE_DEPTH", "500")),
+        intervals={
+            "allMids": float(os.getenv("MARKET_DATA_MIDS_INTERVAL", "1")),
+            "l2Book": float(os.getenv("MARKET_DATA_BOOK_INTERVAL", "1")),
+            "candles": float(os.getenv("MARKET_DATA_CANDLE_INTERVAL", "5")),
+        },
+        idle_timeout=float(os.getenv("MARKET_DATA_IDLE_TIMEOUT", "60")),
+        timeout=float(os.getenv("UPSTREAM_TIMEOUT", "5")),
+        universe_path=os.getenv(
+            "UNIVERSE_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "universe_cache.json")
+        ),
+        universe_refresh_interval=float(os.getenv("UNIVERSE_REFRESH_INTERVAL", "600")),
+    )
+    try:
+        asyncio.run(owner.run())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
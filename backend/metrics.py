@@ -0,0 +1,255 @@
+"""
+Lightweight Prometheus-style metrics for the Hypertrader backend.
+
+Counters, gauges and histograms are plain dicts keyed by label tuples. The
+backend runs on a single event loop, so updates need no locks; the rare
+increment made from a worker thread relies on the GIL and may at worst lose
+a single sample, which is acceptable for monitoring.
+"""
+
+import asyncio
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, covering fast cache hits up to upstream timeouts
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class Counter:
+    """Monotonically increasing counter"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def get(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def collect(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+            for labels, value in list(self._values.items())
+        ]
+
+class Gauge:
+    """Value that can go up and down, or be computed at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None
+
+    def set(self, *labels: str, value: float):
+        self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) - amount
+
+    def remove(self, *labels: str):
+        self._values.pop(labels, None)
+
+    def get(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def set_function(self, function: Callable[[], Dict[Tuple[str, ...], float]]):
+        """Compute the gauge lazily on every scrape instead of on every change"""
+        self._function = function
+
+    def collect(self) -> List[str]:
+        values = dict(self._values)
+        if self._function:
+            try:
+                values.update(self._function())
+            except Exception as e:
+                print(f"Metrics: gauge {self.name} callback failed: {e}")
+        return [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+            for labels, value in values.items()
+        ]
+
+class Histogram:
+    """Cumulative histogram with fixed buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, *labels: str, value: float):
+        series = self._values.get(labels)
+        if series is None:
+            series = [0.0] * (len(self.buckets) + 2)
+            self._values[labels] = series
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels: str) -> float:
+        series = self._values.get(labels)
+        return sum(series[:-1]) if series else 0.0
+
+    def collect(self) -> List[str]:
+        lines = []
+        for labels, series in list(self._values.items()):
+            cumulative = 0.0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {_format_value(cumulative)}")
+            label_text = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{label_text} {_format_value(cumulative)}")
+        return lines
+
+class MetricsRegistry:
+    """Holds every backend metric and renders the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+        # HTTP routes
+        self.http_requests = self.counter(
+            "hypertrader_http_requests_total", "HTTP requests by route, method and status",
+            ("route", "method", "status"))
+        self.http_latency = self.histogram(
+            "hypertrader_http_request_duration_seconds", "HTTP request latency by route",
+            ("route", "method"))
+
+        # Upstream Hyperliquid calls
+        self.upstream_requests = self.counter(
+            "hypertrader_upstream_requests_total", "Hyperliquid API calls by info type",
+            ("type",))
+        self.upstream_errors = self.counter(
+            "hypertrader_upstream_errors_total", "Failed Hyperliquid API calls by info type",
+            ("type",))
+        self.upstream_latency = self.histogram(
+            "hypertrader_upstream_request_duration_seconds", "Hyperliquid API latency by info type",
+            ("type",))
+
+        # Caches
+        self.cache_requests = self.counter(
+            "hypertrader_cache_requests_total", "Cache lookups by cache name and result",
+            ("cache", "result"))
+
+        # WebSockets
+        self.ws_connections = self.gauge(
+            "hypertrader_websocket_connections", "Currently connected WebSocket clients")
+        self.ws_send_queue_depth = self.gauge(
+            "hypertrader_websocket_send_queue_depth", "Pending outbound messages per WebSocket client",
+            ("client",))
+
+        # Event loop
+        self.event_loop_lag = self.gauge(
+            "hypertrader_event_loop_lag_seconds", "Most recent event loop scheduling lag")
+        self.event_loop_lag_histogram = self.histogram(
+            "hypertrader_event_loop_lag_distribution_seconds", "Event loop scheduling lag")
+
+        # MongoDB
+        self.mongo_latency = self.histogram(
+            "hypertrader_mongo_operation_duration_seconds", "MongoDB operation latency",
+            ("operation", "collection"))
+        self.mongo_errors = self.counter(
+            "hypertrader_mongo_errors_total", "Failed MongoDB operations",
+            ("operation", "collection"))
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, label_names))
+
+    def gauge(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, label_names))
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, label_names, buckets))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    @contextmanager
+    def track_upstream(self, info_type: str):
+        """Time a Hyperliquid call; exceptions are counted as errors"""
+        self.upstream_requests.inc(info_type)
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.upstream_errors.inc(info_type)
+            raise
+        finally:
+            self.upstream_latency.observe(info_type, value=time.perf_counter() - start)
+
+    @contextmanager
+    def track_mongo(self, operation: str, collection: str):
+        """Time a MongoDB operation; exceptions are counted as errors"""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.mongo_errors.inc(operation, collection)
+            raise
+        finally:
+            self.mongo_latency.observe(operation, collection, value=time.perf_counter() - start)
+
+    def record_cache(self, cache: str, hit: bool):
+        self.cache_requests.inc(cache, "hit" if hit else "miss")
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+    """Sample how late the event loop wakes us up compared to the requested sleep"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - start - interval)
+        metrics.event_loop_lag.set(value=lag)
+        metrics.event_loop_lag_histogram.observe(value=lag)
+
+# Global metrics registry
+metrics = MetricsRegistry()
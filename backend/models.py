@@ -108,6 +108,10 @@ class Strategy(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+    def editable_fields(self) -> Dict[str, Any]:
+        """Fields an update may overwrite; performance holds the strategy runtime's open position"""
+        return self.dict(exclude={"id", "created_at", "performance"})
+
 # Market Data Models
 class MarketData(BaseModel):
     coin: str
@@ -145,6 +149,12 @@ class Account(BaseModel):
     cross_margin_summary: Dict[str, float] = {}
     withdrawable: float = 0.0
 
+class MultiAccountRequest(BaseModel):
+    wallets: List[str]
+    environment: str = "mainnet"
+    include: List[str] = ["user_state", "open_orders", "fills"]
+    max_concurrency: Optional[int] = None  # Capped by the server-wide limit
+
 # Settings Models
 class APICredentials(BaseModel):
     wallet_address: Optional[str] = None  # Main wallet address (master account)
@@ -158,6 +168,7 @@ class UserSettings(BaseModel):
     api_credentials: APICredentials = APICredentials()
     trading_preferences: Dict[str, Any] = {}
     ui_preferences: Dict[str, Any] = {}
+    version: int = 0  # Bumped on every write so other workers can detect changes
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -167,6 +178,9 @@ class APIResponse(BaseModel):
     message: str
     data: Optional[Any] = None
     error: Optional[str] = None
+    # Set when data is the last good snapshot served during an upstream outage
+    stale: bool = False
+    age_seconds: Optional[float] = None
 
 class PaginatedResponse(BaseModel):
     success: bool
@@ -175,3 +189,4 @@ class PaginatedResponse(BaseModel):
     page: int
     page_size: int
     has_more: bool
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= to fetch the next page
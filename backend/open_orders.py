@@ -0,0 +1,197 @@
+"""
+In-memory open-orders book per wallet.
+
+Each book is seeded from the ``openOrders`` REST endpoint once and then
+kept current by the live ``orderUpdates`` stream, which the registry
+attaches for the configured wallet unless HL_USER_STREAMS=false, and by our
+own order placements and cancels. A background task reconciles every book
+against REST periodically and logs any drift it repairs. Reads are memory
+lookups indexed by oid and by coin.
+
+A book without a live stream (streams disabled, or failed to attach) is
+only a TTL cache: it is refetched from REST whenever it is older than
+``refresh_interval``.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from metrics import metrics
+
+# orderUpdates statuses that leave an order resting on the book
+OPEN_STATUSES = ("open", "triggered")
+
+reconcile_drift = metrics.counter(
+    "hypertrader_open_orders_reconcile_drift_total",
+    "Open orders corrected by reconciliation", ("change",))
+
+class OpenOrdersBook:
+    """Open orders of one wallet indexed by oid and by coin"""
+
+    def __init__(self):
+        self.by_oid: Dict[int, Dict[str, Any]] = {}
+        self.by_coin: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        self.seeded = False
+        self.live = False
+        self.refreshed_at = 0.0
+        self.lock = asyncio.Lock()
+
+    def upsert(self, order: Dict[str, Any]):
+        oid = order["oid"]
+        previous = self.by_oid.get(oid)
+        if previous is not None and previous.get("coin") != order.get("coin"):
+            self._coin_orders(previous.get("coin")).pop(oid, None)
+        self.by_oid[oid] = order
+        self._coin_orders(order.get("coin"))[oid] = order
+
+    def remove(self, oid: int) -> Optional[Dict[str, Any]]:
+        order = self.by_oid.pop(oid, None)
+        if order is not None:
+            coin_orders = self.by_coin.get(order.get("coin"))
+            if coin_orders is not None:
+                coin_orders.pop(oid, None)
+                if not coin_orders:
+                    del self.by_coin[order.get("coin")]
+        return order
+
+    def apply_update(self, update: Dict[str, Any]):
+        """Apply one orderUpdates entry"""
+        order = update.get("order") or {}
+        if "oid" not in order:
+            return
+        if update.get("status") in OPEN_STATUSES:
+            self.upsert(order)
+        else:
+            self.remove(order["oid"])
+
+    def replace_all(self, orders: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Replace the book with a REST snapshot and return what changed"""
+        fresh = {order["oid"]: order for order in orders if "oid" in order}
+        diff = {
+            "added": len(fresh.keys() - self.by_oid.keys()),
+            "removed": len(self.by_oid.keys() - fresh.keys()),
+            "changed": sum(
+                1 for oid in fresh.keys() & self.by_oid.keys()
+                if fresh[oid].get("sz") != self.by_oid[oid].get("sz")
+                or fresh[oid].get("limitPx") != self.by_oid[oid].get("limitPx")
+            ),
+        }
+        self.by_oid = {}
+        self.by_coin = {}
+        for order in fresh.values():
+            self.upsert(order)
+        self.seeded = True
+        self.refreshed_at = time.monotonic()
+        return diff
+
+    def orders(self, coin: Optional[str] = None) -> List[Dict[str, Any]]:
+        if coin:
+            return list(self.by_coin.get(coin, {}).values())
+        return list(self.by_oid.values())
+
+    def get(self, oid: int) -> Optional[Dict[str, Any]]:
+        return self.by_oid.get(oid)
+
+    def _coin_orders(self, coin: str) -> Dict[int, Dict[str, Any]]:
+        return self.by_coin.setdefault(coin, {})
+
+class OpenOrdersStore:
+    def __init__(self, session: requests.Session, refresh_interval: float = 2.0,
+                 reconcile_interval: float = 30.0):
+        self.session = session
+        self.refresh_interval = refresh_interval
+        self.reconcile_interval = reconcile_interval
+        self._books: Dict[Tuple[str, str], OpenOrdersBook] = {}
+        self._reconcile_task: Optional[asyncio.Task] = None
+
+    def book(self, base_url: str, wallet_address: str) -> OpenOrdersBook:
+        key = (base_url, wallet_address.lower())
+        book = self._books.get(key)
+        if book is None:
+            book = self._books[key] = OpenOrdersBook()
+        return book
+
+    async def get_orders(self, base_url: str, wallet_address: str,
+                         coin: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Open orders from memory, seeding or refreshing from REST only when needed.
+
+        Raises if the book has never been seeded and REST fails; a seeded book
+        is served even when a refresh fails.
+        """
+        book = self.book(base_url, wallet_address)
+        fresh = book.seeded and (book.live or time.monotonic() - book.refreshed_at < self.refresh_interval)
+        metrics.record_cache("open_orders", fresh)
+        if not fresh:
+            try:
+                await self.refresh(base_url, wallet_address)
+            except Exception as e:
+                if not book.seeded:
+                    raise
+                print(f"Open orders refresh failed, serving last known book: {e}")
+        return book.orders(coin)
+
+    async def refresh(self, base_url: str, wallet_address: str) -> Dict[str, int]:
+        book = self.book(base_url, wallet_address)
+        async with book.lock:
+            orders = await asyncio.to_thread(self._fetch, base_url, wallet_address)
+            return book.replace_all(orders)
+
+    def _fetch(self, base_url: str, wallet_address: str) -> List[Dict[str, Any]]:
+        with metrics.track_upstream("openOrders"):
+            response = self.session.post(
+                f"{base_url}/info",
+                json={"type": "openOrders", "user": wallet_address},
+                timeout=10
+            )
+            response.raise_for_status()
+            return response.json() or []
+
+    def start_reconciliation(self):
+        if self._reconcile_task is None and self.reconcile_interval > 0:
+            self._reconcile_task = asyncio.create_task(self._reconcile_loop(), name="open-orders-reconcile")
+
+    async def stop_reconciliation(self):
+        if self._reconcile_task:
+            self._reconcile_task.cancel()
+            self._reconcile_task = None
+
+    async def _reconcile_loop(self):
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            for (base_url, wallet_address), book in list(self._books.items()):
+                if not book.seeded:
+                    continue
+                try:
+                    diff = await self.refresh(base_url, wallet_address)
+                    drift = {change: count for change, count in diff.items() if count}
+                    for change, count in drift.items():
+                        reconcile_drift.inc(change, amount=count)
+                    if drift and book.live:
+                        print(f"Open orders reconciliation for {wallet_address[:8]}... repaired drift: {drift}")
+                except Exception as e:
+                    print(f"Open orders reconciliation failed for {wallet_address[:8]}...: {e}")
+
+    def attach_stream(self, info, base_url: str, wallet_address: str,
+                      loop: asyncio.AbstractEventLoop) -> int:
+        """Subscribe the book to the live orderUpdates stream; returns the subscription id"""
+        book = self.book(base_url, wallet_address)
+
+        def apply_updates(updates: List[Dict[str, Any]]):
+            for update in updates:
+                book.apply_update(update)
+
+        def on_message(message):
+            updates = message.get("data") or []
+            if updates:
+                # SDK callbacks run on its WebSocket thread
+                loop.call_soon_threadsafe(apply_updates, updates)
+
+        subscription_id = info.subscribe({"type": "orderUpdates", "user": wallet_address}, on_message)
+        book.live = True
+        return subscription_id
+
+    def detach_stream(self, base_url: str, wallet_address: str):
+        self.book(base_url, wallet_address).live = False
@@ -0,0 +1,170 @@
+"""
+Concurrent order submission on top of the SDK ``Exchange``.
+
+``Exchange.order``/``cancel`` stamp each action with the current time in
+milliseconds as its nonce, so two orders signed in the same millisecond
+collide and callers have to send one at a time. The pipeline allocates
+nonces itself from a per-signer monotonic counter, signs on a small worker
+pool and posts on a pool sized to the in-flight window. Independent orders
+are therefore on the wire together, and each caller gets back the response
+for its own action.
+
+Hyperliquid accepts nonces out of order as long as each is unique and newer
+than the oldest of the signer's 100 most recent ones, so posts finishing in
+a different order from signing is fine.
+
+``shutdown`` refuses new actions with ``PipelineClosed`` and lets every
+action already accepted be signed and posted before the pools stop, so no
+signed order is left neither sent nor reported.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from hyperliquid.exchange import Exchange
+from hyperliquid.utils.constants import MAINNET_API_URL
+from hyperliquid.utils.signing import (
+    OrderRequest, order_request_to_order_wire, order_wires_to_order_action, sign_l1_action
+)
+
+class NonceAllocator:
+    """Strictly increasing millisecond nonces for one signer, safe across threads"""
+
+    def __init__(self):
+        self._last = 0
+        self._lock = threading.Lock()
+
+    def next(self) -> int:
+        with self._lock:
+            self._last = max(int(time.time() * 1000), self._last + 1)
+            return self._last
+
+_allocators: Dict[str, NonceAllocator] = {}
+_allocators_lock = threading.Lock()
+
+def nonce_allocator(signer_address: str) -> NonceAllocator:
+    """The allocator shared by every pipeline signing for this address"""
+    with _allocators_lock:
+        return _allocators.setdefault(signer_address.lower(), NonceAllocator())
+
+SignedAction = Tuple[Dict[str, Any], Any, int]
+
+class PipelineClosed(RuntimeError):
+    """The pipeline was shut down before the action was accepted; nothing was sent"""
+
+class OrderPipeline:
+    def __init__(self, exchange: Exchange, window: int = 8, signing_workers: int = 2):
+        self.exchange = exchange
+        self.window = window
+        self.nonces = nonce_allocator(exchange.wallet.address)
+        self._signing_pool = ThreadPoolExecutor(signing_workers, thread_name_prefix="order-sign")
+        # One worker per in-flight slot; further submissions queue here
+        self._post_pool = ThreadPoolExecutor(window, thread_name_prefix="order-post")
+        self._closed = False
+        self._in_flight = 0
+        self._drained = threading.Condition()
+
+    async def order(self, coin: str, is_buy: bool, sz: float, limit_px: float,
+                    order_type: Dict[str, Any], reduce_only: bool = False) -> Any:
+        return await self.orders([{
+            "coin": coin, "is_buy": is_buy, "sz": sz, "limit_px": limit_px,
+            "order_type": order_type, "reduce_only": reduce_only
+        }])
+
+    async def orders(self, order_requests: List[OrderRequest]) -> Any:
+        """Sign and post one order action; concurrent calls are in flight together"""
+        return await self._run(self._sign_orders, order_requests)
+
+    async def cancel(self, coin: str, oid: int) -> Any:
+        return await self._run(self._sign_cancels, [(coin, oid)])
+
+    def submit(self, order_requests: List[OrderRequest]) -> Future:
+        """Thread-based variant of ``orders`` for synchronous callers"""
+        return self._submit(lambda: self._post(self._sign_orders(order_requests)))
+
+    def submit_cancel(self, coin: str, oid: int) -> Future:
+        return self._submit(lambda: self._post(self._sign_cancels([(coin, oid)])))
+
+    async def _run(self, sign: Callable[[Any], SignedAction], requests: Any) -> Any:
+        self._accept()
+        try:
+            loop = asyncio.get_running_loop()
+            signed = await loop.run_in_executor(self._signing_pool, sign, requests)
+            return await loop.run_in_executor(self._post_pool, self._post, signed)
+        finally:
+            self._release()
+
+    def _submit(self, action: Callable[[], Any]) -> Future:
+        self._accept()
+        try:
+            future = self._post_pool.submit(action)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _accept(self):
+        with self._drained:
+            if self._closed:
+                raise PipelineClosed("The order pipeline was shut down; the order was not sent")
+            self._in_flight += 1
+
+    def _release(self):
+        with self._drained:
+            self._in_flight -= 1
+            if self._in_flight:
+                return
+            self._drained.notify_all()
+            if self._closed:
+                # The last action out after a shutdown that stopped waiting
+                self._stop_pools()
+
+    def _stop_pools(self):
+        self._signing_pool.shutdown(wait=False)
+        self._post_pool.shutdown(wait=False)
+
+    def _sign_orders(self, order_requests: List[OrderRequest]) -> SignedAction:
+        wires = [
+            order_request_to_order_wire(order, self.exchange.info.name_to_asset(order["coin"]))
+            for order in order_requests
+        ]
+        return self._sign(order_wires_to_order_action(wires))
+
+    def _sign_cancels(self, cancels: List[Tuple[str, int]]) -> SignedAction:
+        return self._sign({
+            "type": "cancel",
+            "cancels": [{"a": self.exchange.info.name_to_asset(coin), "o": oid} for coin, oid in cancels],
+        })
+
+    def _sign(self, action: Dict[str, Any]) -> SignedAction:
+        nonce = self.nonces.next()
+        signature = sign_l1_action(
+            self.exchange.wallet,
+            action,
+            self.exchange.vault_address,
+            nonce,
+            self.exchange.expires_after,
+            self.exchange.base_url == MAINNET_API_URL,
+        )
+        return action, signature, nonce
+
+    def _post(self, signed: SignedAction) -> Any:
+        action, signature, nonce = signed
+        return self.exchange._post_action(action, signature, nonce)
+
+    def shutdown(self, timeout: Optional[float] = None) -> bool:
+        """Refuse new actions, wait for accepted ones to finish, then stop the pools (blocking).
+
+        Returns False if some were still in flight after ``timeout``; the pools then
+        stop once the last of them finishes.
+        """
+        with self._drained:
+            self._closed = True
+            drained = self._drained.wait_for(lambda: not self._in_flight, timeout)
+            if drained:
+                self._stop_pools()
+        return drained
@@ -0,0 +1,90 @@
+"""
+Startup readiness for the backend.
+
+The server starts accepting connections as soon as the app is imported;
+loading settings from Mongo, building the Hyperliquid SDK state and warming
+caches then run as a background warm-up. Each step is tracked here as a
+dependency. ``/api/ready`` reports them all and returns 200 only once every
+required one is ready, which the container entrypoint polls before it
+starts nginx. ``/api/health`` remains a plain liveness check.
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from metrics import metrics
+
+dependency_ready = metrics.gauge(
+    "hypertrader_dependency_ready", "1 once a startup dependency is ready", ("dependency",))
+
+@dataclass
+class Dependency:
+    required: bool
+    ready: bool = False
+    error: Optional[str] = None
+    attempts: int = 0
+    ready_after: Optional[float] = None  # Seconds from startup
+
+class Readiness:
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.dependencies: Dict[str, Dependency] = {}
+
+    def register(self, name: str, required: bool = True):
+        self.dependencies[name] = Dependency(required)
+        dependency_ready.set(name, value=0)
+
+    def mark_ready(self, name: str):
+        dependency = self.dependencies[name]
+        dependency.ready = True
+        dependency.error = None
+        dependency.ready_after = round(time.monotonic() - self.started_at, 3)
+        dependency_ready.set(name, value=1)
+        print(f"Ready: {name} after {dependency.ready_after}s")
+
+    def mark_failed(self, name: str, error: Exception):
+        dependency = self.dependencies[name]
+        dependency.ready = False
+        dependency.error = str(error) or type(error).__name__
+        dependency_ready.set(name, value=0)
+
+    @property
+    def ready(self) -> bool:
+        return all(d.ready for d in self.dependencies.values() if d.required)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "uptime_seconds": round(time.monotonic() - self.started_at, 3),
+            "dependencies": {
+                name: {
+                    "ready": d.ready, "required": d.required, "attempts": d.attempts,
+                    "error": d.error, "ready_after": d.ready_after
+                }
+                for name, d in self.dependencies.items()
+            }
+        }
+
+    async def run(self, name: str, step: Callable[[], Awaitable[Any]],
+                  base_delay: float = 0.5, max_delay: float = 10.0) -> Any:
+        """Run a warm-up step until it succeeds, with jittered backoff, then mark it ready"""
+        dependency = self.dependencies[name]
+        while True:
+            dependency.attempts += 1
+            try:
+                result = await step()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.mark_failed(name, e)
+                delay = random.uniform(0, min(max_delay, base_delay * 2 ** (dependency.attempts - 1)))
+                print(f"Warm-up of {name} failed ({e}); retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+            else:
+                self.mark_ready(name)
+                return result
+
+readiness = Readiness()
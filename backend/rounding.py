@@ -0,0 +1,77 @@
+"""
+Per-coin price/size rounding for order submission.
+
+Hyperliquid rejects orders whose size has more decimals than the coin's
+``szDecimals`` or whose price has more than 5 significant figures or more
+than ``MAX_DECIMALS - szDecimals`` decimals (integer prices are always
+accepted). The table precomputes the scales for every coin so quantizing an
+order before it is signed is a dict lookup and a few float operations.
+
+Strategy code can work in integer fixed-point units instead: a size unit is
+10**-szDecimals and a price unit is 10**-price_decimals of the coin.
+"""
+
+import math
+from typing import Dict, Iterable, NamedTuple, Optional
+
+# Maximum price decimals before subtracting szDecimals
+PERP_MAX_DECIMALS = 6
+SPOT_MAX_DECIMALS = 8
+PRICE_SIGNIFICANT_FIGURES = 5
+
+class CoinRounding(NamedTuple):
+    coin: str
+    sz_decimals: int
+    price_decimals: int
+    size_scale: int
+    price_scale: int
+
+    @property
+    def min_size(self) -> float:
+        return 1 / self.size_scale
+
+    def size(self, size: float) -> float:
+        """Round a size down to the coin's lot size, so it never exceeds what was asked"""
+        return math.floor(size * self.size_scale + 1e-9) / self.size_scale
+
+    def price(self, price: float) -> float:
+        """Round a price to 5 significant figures and the coin's maximum decimals"""
+        if price <= 0:
+            return price
+        if price == int(price):
+            return float(price)
+        decimals = min(PRICE_SIGNIFICANT_FIGURES - 1 - math.floor(math.log10(price)), self.price_decimals)
+        if decimals <= 0:
+            return float(round(price))
+        return round(price, decimals)
+
+    def size_units(self, size: float) -> int:
+        return math.floor(size * self.size_scale + 1e-9)
+
+    def price_units(self, price: float) -> int:
+        return round(self.price(price) * self.price_scale)
+
+    def size_from_units(self, units: int) -> float:
+        return units / self.size_scale
+
+    def price_from_units(self, units: int) -> float:
+        return self.price(units / self.price_scale)
+
+def coin_rounding(coin: str, sz_decimals: int, max_decimals: int = PERP_MAX_DECIMALS) -> CoinRounding:
+    price_decimals = max(0, max_decimals - sz_decimals)
+    return CoinRounding(coin, sz_decimals, price_decimals, 10 ** sz_decimals, 10 ** price_decimals)
+
+class RoundingTable:
+    """Rounding rules for every coin of a universe"""
+
+    def __init__(self, assets: Iterable, max_decimals: int = PERP_MAX_DECIMALS):
+        self._coins: Dict[str, CoinRounding] = {
+            asset.name: coin_rounding(asset.name, asset.sz_decimals, max_decimals)
+            for asset in assets if asset.name
+        }
+
+    def get(self, coin: str) -> Optional[CoinRounding]:
+        return self._coins.get(coin)
+
+    def __len__(self) -> int:
+        return len(self._coins)
@@ -1,13 +1,13 @@
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, BackgroundTasks
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 import motor.motor_asyncio
 import os
 from dotenv import load_dotenv
 import json
 import asyncio
-import websockets
-from typing import List, Dict, Optional, Any
+import time
+from typing import List, Dict, Optional, Any, Tuple
 from datetime import datetime
 
 # Load environment variables
@@ -21,11 +21,27 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from models import (
     Portfolio, Position, Order, Trade, MarketData, CandlestickData, 
     OrderBook, Account, Strategy, UserSettings, APICredentials,
-    OrderRequest, APIResponse, OrderType, OrderSide, OrderStatus
+    OrderRequest, APIResponse, PaginatedResponse, OrderType, OrderSide, OrderStatus, MultiAccountRequest
 )
-from hyperliquid_service import hyperliquid_service
-
-app = FastAPI(title="Hypertrader 1.5 API", version="1.5.0")
+from service_registry import service_registry, hyperliquid_service
+from hyperliquid_service import portfolio_from_user_state, base_url_for, candle_range_closed
+from accounts import fan_out
+from metrics import metrics, monitor_event_loop_lag
+from loop_watchdog import loop_watchdog, TaskContextMiddleware
+from connection_manager import ConnectionManager, ClientDisconnected
+from subscriptions import SubscriptionManager, SubscriptionLimitExceeded, active_feeds
+from settings_cache import SettingsCache
+from fast_json import FastJSONResponse, CachedPayload, api_response, dumps, paginated_response
+from circuit_breaker import Snapshot, UpstreamUnavailable
+from http_cache import conditional, etag_for, etag_from_key, is_not_modified, not_modified
+from compression import CompressionMiddleware
+from readiness import readiness
+from strategy_runtime import StrategyRuntime
+
+app = FastAPI(title="Hypertrader 1.5 API", version="1.5.0", default_response_class=FastJSONResponse)
+
+# Innermost middleware so the loop watchdog can map tasks to routes
+app.add_middleware(TaskContextMiddleware, watchdog=loop_watchdog)
 
 # CORS configuration
 app.add_middleware(
@@ -36,73 +52,153 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Responses smaller than this are not worth compressing (HTTP and opted-in WebSocket clients)
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=COMPRESSION_MIN_SIZE,
+    gzip_level=int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+    brotli_quality=int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4")),
+    cache_max_bytes=int(os.getenv("COMPRESSION_CACHE_MB", "32")) * 1024 * 1024,
+)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count requests and record latency per route template"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        metrics.http_requests.inc(route_path, request.method, str(status))
+        metrics.http_latency.observe(route_path, request.method, value=time.perf_counter() - start)
+
 # MongoDB connection
 MONGO_URL = os.getenv("MONGO_URL")
-client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URL)
+# Fail fast when Mongo is down, so warm-up retries and /api/ready report it instead of hanging 30s
+client = motor.motor_asyncio.AsyncIOMotorClient(
+    MONGO_URL, serverSelectionTimeoutMS=int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+)
 db = client.hypertrader
 
 # WebSocket connection manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.market_data_tasks: Dict[str, asyncio.Task] = {}
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+manager = ConnectionManager(compress_min_size=COMPRESSION_MIN_SIZE)
+metrics.ws_connections.set_function(lambda: {(): len(manager.clients)})
+metrics.ws_send_queue_depth.set_function(manager.queue_depths)
 
-    async def send_personal_message(self, message: dict, websocket: WebSocket):
-        await websocket.send_text(json.dumps(message))
-
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(json.dumps(message))
-            except:
-                pass
+# Shared upstream pollers behind WebSocket subscriptions
+subscriptions = SubscriptionManager(
+    manager, max_subscriptions=int(os.getenv("WS_MAX_SUBSCRIPTIONS", "500"))
+)
+active_feeds.set_function(subscriptions.feed_counts)
 
-manager = ConnectionManager()
+# Settings are served from memory; writes go through to Mongo
+settings_cache = SettingsCache(
+    db.user_settings, refresh_interval=float(os.getenv("SETTINGS_REFRESH_INTERVAL", "5"))
+)
 
 # Helper functions
 async def get_user_settings() -> UserSettings:
-    """Get user settings from database"""
-    settings_data = await db.user_settings.find_one({})
-    if settings_data:
-        settings_data.pop("_id", None)
-        return UserSettings(**settings_data)
-    else:
-        # Create default settings
-        default_settings = UserSettings()
-        await db.user_settings.insert_one(default_settings.dict())
-        return default_settings
+    """Get user settings from the in-memory cache"""
+    return await settings_cache.get()
+
+def service_credentials(settings: UserSettings) -> Tuple[str, str, str, str]:
+    credentials = settings.api_credentials
+    return credentials.wallet_address, credentials.api_key, credentials.api_secret, credentials.environment
+
+async def configure_hyperliquid_service(settings: UserSettings):
+    """Swap in a Hyperliquid service for the credentials from settings (kept if they are unchanged)"""
+    await service_registry.configure(*service_credentials(settings))
 
 async def initialize_hyperliquid_service():
-    """Initialize Hyperliquid service with credentials from database"""
-    try:
-        settings = await get_user_settings()
-        if settings.api_credentials.wallet_address and settings.api_credentials.api_key and settings.api_credentials.api_secret:
-            print("Initializing Hyperliquid service with saved credentials...")
-            global hyperliquid_service
-            from hyperliquid_service import HyperliquidService
-            hyperliquid_service = HyperliquidService(
-                wallet_address=settings.api_credentials.wallet_address,
-                api_key=settings.api_credentials.api_key,
-                api_secret=settings.api_credentials.api_secret,
-                environment=settings.api_credentials.environment
-            )
-            print(f"Hyperliquid service initialized. Configured: {hyperliquid_service.is_configured}")
-        else:
-            print("No saved credentials found. Using unconfigured service.")
-    except Exception as e:
-        print(f"Failed to initialize Hyperliquid service with saved credentials: {e}")
+    """Initialize Hyperliquid service with the saved credentials"""
+    # Read on every attempt: settings saved while warm-up retried must win over those loaded before
+    settings = await get_user_settings()
+    if settings.api_credentials.wallet_address and settings.api_credentials.api_key and settings.api_credentials.api_secret:
+        print("Initializing Hyperliquid service with saved credentials...")
+        await configure_hyperliquid_service(settings)
+        print(f"Hyperliquid service initialized. Configured: {hyperliquid_service.is_configured}")
+    else:
+        print("No saved credentials found. Using unconfigured service.")
+
+async def on_settings_changed(settings: UserSettings):
+    """Pick up credentials saved through another worker"""
+    if service_registry.uses_credentials(*service_credentials(settings)):
+        # Only other settings changed; the service and its pipeline and streams stay as they are
+        return
+    print("Reinitializing Hyperliquid service with settings from another worker...")
+    await configure_hyperliquid_service(settings)
+
+settings_cache.on_change = on_settings_changed
+
+# Startup dependencies reported by /api/ready; the universe is fetched lazily if it is not warm yet
+readiness.register("mongo")
+readiness.register("hyperliquid")
+readiness.register("universe", required=False)
+readiness.register("connections", required=False)
+warm_up_tasks: List[asyncio.Task] = []
+
+# Executes ACTIVE strategies; with several workers only the one holding the lock runs it
+STRATEGY_RUNTIME_ENABLED = os.getenv("STRATEGY_RUNTIME_ENABLED", "false").lower() in ("1", "true", "yes")
+strategy_runtime = StrategyRuntime(
+    db.strategies,
+    hyperliquid_service,
+    tick_interval=float(os.getenv("STRATEGY_TICK_INTERVAL", "1")),
+    candle_interval=os.getenv("STRATEGY_CANDLE_INTERVAL", "1m"),
+    reload_interval=float(os.getenv("STRATEGY_RELOAD_INTERVAL", "30")),
+    lock_path=os.getenv("STRATEGY_RUNTIME_LOCK") or None,
+    processes=int(os.getenv("STRATEGY_WORKERS", "2")),
+    max_order_notional=float(os.getenv("STRATEGY_MAX_ORDER_NOTIONAL", "0")),
+    worker_timeout=float(os.getenv("STRATEGY_WORKER_TIMEOUT", "10")),
+)
 
-# Initialize service with saved credentials on startup
+async def warm_up_service():
+    """Load settings, then build the service for the saved credentials, then run strategies"""
+    await readiness.run("mongo", settings_cache.load)
+    settings_cache.start_refresh()
+    await readiness.run("hyperliquid", initialize_hyperliquid_service)
+    if STRATEGY_RUNTIME_ENABLED:
+        strategy_runtime.start()
+
+async def warm_up_universe():
+    base_url = base_url_for("mainnet")
+    await readiness.run("universe", lambda: service_registry.universe.ensure(base_url))
+    service_registry.universe.start_refresh([base_url])
+
+async def warm_up_connections():
+    """Open pooled connections to the API before the first request needs one, then keep them alive"""
+    await readiness.run("connections", lambda: asyncio.to_thread(service_registry.warmer.warm_all))
+    service_registry.warmer.start()
+
+# Startup only schedules work, so the server accepts connections (and answers
+# /api/health and /api/ready) while settings and SDK state warm up in the background
 @app.on_event("startup")
 async def startup_event():
-    await initialize_hyperliquid_service()
+    asyncio.create_task(monitor_event_loop_lag())
+    loop_watchdog.start(asyncio.get_running_loop())
+    # Local file read; SDK state and /api/coins are served from it without waiting on the API
+    service_registry.universe.load()
+    service_registry.open_orders.start_reconciliation()
+    warm_up_tasks.extend([
+        asyncio.create_task(warm_up_service(), name="warm-up-service"),
+        asyncio.create_task(warm_up_universe(), name="warm-up-universe"),
+        asyncio.create_task(warm_up_connections(), name="warm-up-connections"),
+    ])
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for task in warm_up_tasks:
+        task.cancel()
+    service_registry.warmer.stop()
+    await strategy_runtime.stop()
+    loop_watchdog.stop()
+    await settings_cache.stop_refresh()
+    await service_registry.open_orders.stop_reconciliation()
+    await service_registry.universe.stop_refresh()
 
 # Root endpoint
 @app.get("/api/")
@@ -113,17 +209,46 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
 
+@app.get("/api/ready")
+async def readiness_check():
+    """200 once every required startup dependency is ready, 503 with per-dependency state until then"""
+    return FastJSONResponse(readiness.report(), status_code=200 if readiness.ready else 503)
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Expose backend metrics in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+def snapshot_response(message: str, snapshot: Snapshot) -> FastJSONResponse:
+    """APIResponse for upstream data, flagged with its age and whether it is a stale snapshot"""
+    return api_response(
+        success=True,
+        message=message,
+        data=snapshot.value,
+        stale=snapshot.stale,
+        age_seconds=round(snapshot.age, 3)
+    )
+
+def upstream_unavailable(e: UpstreamUnavailable) -> HTTPException:
+    """503 while an upstream circuit is open and there is no snapshot to serve"""
+    return HTTPException(
+        status_code=503, detail=str(e), headers={"Retry-After": str(max(1, round(e.retry_after)))}
+    )
+
+def cached_payload_response(request: Request, route: str, payload: CachedPayload, body: bytes,
+                            cache_control: str) -> Response:
+    """Cached body with its validators, or 304 when the client already has it"""
+    return conditional(request, route, FastJSONResponse(body), cache_control, payload.etag, payload.modified_at)
+
 # Portfolio endpoints
 @app.get("/api/portfolio", response_model=APIResponse)
 async def get_portfolio():
     """Get user portfolio with positions and account value"""
     try:
-        portfolio = await hyperliquid_service.get_portfolio()
-        return APIResponse(
-            success=True,
-            message="Portfolio retrieved successfully",
-            data=portfolio.dict()
-        )
+        snapshot = await hyperliquid_service.get_portfolio_snapshot()
+        return snapshot_response("Portfolio retrieved successfully", snapshot)
+    except UpstreamUnavailable as e:
+        raise upstream_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -131,11 +256,90 @@ async def get_portfolio():
 async def get_account_info():
     """Get account information"""
     try:
-        account = await hyperliquid_service.get_account_info()
-        return APIResponse(
+        snapshot = await hyperliquid_service.get_account_snapshot()
+        return snapshot_response("Account info retrieved successfully", snapshot)
+    except UpstreamUnavailable as e:
+        raise upstream_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Multi-account endpoints
+ACCOUNT_SECTIONS = {
+    "user_state": lambda handle: handle.user_state(),
+    "open_orders": lambda handle: handle.open_orders(),
+    "fills": lambda handle: handle.user_fills(),
+}
+
+def account_handles(request: MultiAccountRequest):
+    wallets = list(dict.fromkeys(w.strip() for w in request.wallets if w.strip()))
+    if not wallets:
+        raise HTTPException(status_code=400, detail="At least one wallet is required")
+    return [service_registry.account(wallet, request.environment) for wallet in wallets]
+
+def fan_out_concurrency(request: MultiAccountRequest) -> int:
+    limit = service_registry.governor.max_concurrency
+    return min(request.max_concurrency or limit, limit)
+
+@app.post("/api/accounts/overview", response_model=APIResponse)
+async def get_accounts_overview(request: MultiAccountRequest):
+    """Fetch user state, open orders and fills for many wallets concurrently"""
+    unknown = set(request.include) - set(ACCOUNT_SECTIONS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown sections: {sorted(unknown)}")
+    handles = account_handles(request)
+    
+    async def fetch_sections(handle):
+        results = await asyncio.gather(*(ACCOUNT_SECTIONS[name](handle) for name in request.include))
+        return dict(zip(request.include, results))
+    
+    try:
+        accounts = await fan_out(handles, fetch_sections, fan_out_concurrency(request))
+        return api_response(
             success=True,
-            message="Account info retrieved successfully",
-            data=account.dict()
+            message=f"Retrieved {len(accounts)} accounts",
+            data=accounts
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/accounts/portfolio", response_model=APIResponse)
+async def get_aggregated_portfolio(request: MultiAccountRequest):
+    """Aggregate the portfolios of many wallets into one view"""
+    handles = account_handles(request)
+    
+    async def fetch_portfolio(handle):
+        return portfolio_from_user_state(await handle.user_state())
+    
+    try:
+        results = await fan_out(handles, fetch_portfolio, fan_out_concurrency(request))
+        
+        totals = {"account_value": 0.0, "available_balance": 0.0, "margin_used": 0.0, "total_pnl": 0.0}
+        net_positions: Dict[str, Dict[str, float]] = {}
+        accounts = {}
+        for wallet, result in results.items():
+            if "error" in result:
+                accounts[wallet] = result
+                continue
+            portfolio = result["data"]
+            accounts[wallet] = {"data": portfolio}
+            for field in totals:
+                totals[field] += getattr(portfolio, field)
+            for position in portfolio.positions:
+                signed_size = position.size if position.side == OrderSide.BUY else -position.size
+                net = net_positions.setdefault(position.coin, {"size": 0.0, "unrealized_pnl": 0.0, "accounts": 0})
+                net["size"] += signed_size
+                net["unrealized_pnl"] += position.unrealized_pnl
+                net["accounts"] += 1
+        
+        return api_response(
+            success=True,
+            message=f"Aggregated portfolio for {len(handles)} accounts",
+            data={
+                **totals,
+                "positions": net_positions,
+                "accounts": accounts,
+                "failed_accounts": [w for w, r in results.items() if "error" in r]
+            }
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -145,27 +349,48 @@ async def get_account_info():
 async def get_market_data(coin: str):
     """Get current market data for a coin"""
     try:
-        market_data = await hyperliquid_service.get_market_data(coin.upper())
-        return APIResponse(
-            success=True,
-            message="Market data retrieved successfully",
-            data=market_data.dict()
-        )
+        snapshot = await hyperliquid_service.get_market_data_snapshot(coin.upper())
+        return snapshot_response("Market data retrieved successfully", snapshot)
+    except UpstreamUnavailable as e:
+        raise upstream_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Closed candles never change; the latest range changes with every trade
+CLOSED_CANDLES_CACHE_CONTROL = "public, max-age=31536000, immutable"
+LIVE_CANDLES_CACHE_CONTROL = "public, no-cache"
+
 @app.get("/api/candlesticks/{coin}", response_model=APIResponse)
-async def get_candlestick_data(coin: str, interval: str = "1h", limit: int = 100):
-    """Get candlestick data for a coin"""
+async def get_candlestick_data(request: Request, coin: str, interval: str = "1h", limit: int = 100,
+                               end_time: Optional[int] = None):
+    """Get candlestick data for a coin, the latest ones or those up to end_time (ms)"""
+    coin = coin.upper()
     try:
-        candlesticks = await hyperliquid_service.get_candlestick_data(
-            coin.upper(), interval, limit
-        )
-        return APIResponse(
-            success=True,
-            message="Candlestick data retrieved successfully",
-            data=[c.dict() for c in candlesticks]
+        if candle_range_closed(interval, end_time):
+            # Validated from the request alone, so a revalidation never reaches Hyperliquid
+            etag = etag_from_key("candles", coin, interval, limit, end_time)
+            if is_not_modified(request, etag):
+                return not_modified("candlesticks", etag, None, CLOSED_CANDLES_CACHE_CONTROL)
+            snapshot = await hyperliquid_service.get_candlestick_data_snapshot(coin, interval, limit, end_time)
+            # An empty range (unknown coin, pre-listing) is not worth pinning in caches
+            if snapshot.value:
+                return conditional(
+                    request, "candlesticks", snapshot_response("Candlestick data retrieved successfully", snapshot),
+                    CLOSED_CANDLES_CACHE_CONTROL, etag
+                )
+        else:
+            snapshot = await hyperliquid_service.get_candlestick_data_snapshot(coin, interval, limit, end_time)
+        
+        # Validator from the candles only; the envelope's age changes on every request
+        etag = etag_for(dumps(snapshot.value))
+        if is_not_modified(request, etag):
+            return not_modified("candlesticks", etag, None, LIVE_CANDLES_CACHE_CONTROL)
+        return conditional(
+            request, "candlesticks", snapshot_response("Candlestick data retrieved successfully", snapshot),
+            LIVE_CANDLES_CACHE_CONTROL, etag
         )
+    except UpstreamUnavailable as e:
+        raise upstream_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -173,12 +398,10 @@ async def get_candlestick_data(coin: str, interval: str = "1h", limit: int = 100
 async def get_order_book(coin: str):
     """Get order book for a coin"""
     try:
-        order_book = await hyperliquid_service.get_order_book(coin.upper())
-        return APIResponse(
-            success=True,
-            message="Order book retrieved successfully",
-            data=order_book.dict()
-        )
+        snapshot = await hyperliquid_service.get_order_book_snapshot(coin.upper())
+        return snapshot_response("Order book retrieved successfully", snapshot)
+    except UpstreamUnavailable as e:
+        raise upstream_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -197,13 +420,19 @@ async def place_order(order_request: OrderRequest):
         )
         
         # Store order in database
-        await db.orders.insert_one(order.dict())
+        with metrics.track_mongo("insert_one", "orders"):
+            await db.orders.insert_one(order.dict())
         
-        return APIResponse(
+        return api_response(
             success=True,
             message="Order placed successfully",
-            data=order.dict()
+            data=order
         )
+    except ValueError as e:
+        # Rejected locally, e.g. a size below the coin's lot size
+        raise HTTPException(status_code=400, detail=str(e))
+    except UpstreamUnavailable as e:
+        raise upstream_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -215,12 +444,13 @@ async def cancel_order(coin: str, oid: int):
         
         if success:
             # Update order status in database
-            await db.orders.update_one(
-                {"oid": oid},
-                {"$set": {"status": OrderStatus.CANCELLED, "updated_at": datetime.utcnow()}}
-            )
+            with metrics.track_mongo("update_one", "orders"):
+                await db.orders.update_one(
+                    {"oid": oid},
+                    {"$set": {"status": OrderStatus.CANCELLED, "updated_at": datetime.utcnow()}}
+                )
         
-        return APIResponse(
+        return api_response(
             success=success,
             message="Order cancelled successfully" if success else "Failed to cancel order"
         )
@@ -228,59 +458,94 @@ async def cancel_order(coin: str, oid: int):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/orders/open", response_model=APIResponse)
-async def get_open_orders():
-    """Get all open orders"""
+async def get_open_orders(coin: Optional[str] = None):
+    """Get open orders, optionally filtered by coin"""
     try:
-        orders = await hyperliquid_service.get_open_orders()
-        return APIResponse(
+        orders = await hyperliquid_service.get_open_orders(coin.upper() if coin else None)
+        return api_response(
             success=True,
             message="Open orders retrieved successfully",
-            data=[order.dict() for order in orders]
+            data=orders
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/orders/history", response_model=APIResponse)
-async def get_order_history(limit: int = 50):
-    """Get order history"""
+@app.get("/api/orders/history", response_model=PaginatedResponse)
+async def get_order_history(limit: int = 50, cursor: Optional[str] = None, coin: Optional[str] = None,
+                            start_time: Optional[int] = None, end_time: Optional[int] = None):
+    """Get order history, newest first, with cursor pagination and coin/time (ms) filters"""
+    limit = max(1, min(limit, 500))
     try:
-        orders = await hyperliquid_service.get_order_history(limit)
-        return APIResponse(
+        page = await hyperliquid_service.get_order_history_page(
+            limit=limit,
+            cursor=cursor,
+            coin=coin.upper() if coin else None,
+            start_time=start_time,
+            end_time=end_time
+        )
+        return paginated_response(
             success=True,
-            message="Order history retrieved successfully",
-            data=[order.dict() for order in orders]
+            data=page["orders"],
+            total=page["total"],
+            page=page["page"],
+            page_size=limit,
+            has_more=page["has_more"],
+            next_cursor=page["next_cursor"]
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Strategy endpoints
+# Serialized strategy list, dropped on every write through this API or by the runtime
+strategies_payload = CachedPayload(ttl=float(os.getenv("STRATEGIES_CACHE_TTL", "2")))
+strategy_runtime.on_change = strategies_payload.clear
+STRATEGIES_CACHE_CONTROL = "private, no-cache"
+
 @app.get("/api/strategies", response_model=APIResponse)
-async def get_strategies():
+async def get_strategies(request: Request):
     """Get all trading strategies"""
     try:
-        strategies_cursor = db.strategies.find({})
-        strategies = []
-        async for strategy in strategies_cursor:
-            strategy.pop("_id", None)
-            strategies.append(strategy)
-        
-        return APIResponse(
-            success=True,
-            message="Strategies retrieved successfully",
-            data=strategies
-        )
+        body = strategies_payload.get()
+        metrics.record_cache("strategies", body is not None)
+        if body is None:
+            strategies = []
+            with metrics.track_mongo("find", "strategies"):
+                async for strategy in db.strategies.find({}):
+                    strategy.pop("_id", None)
+                    strategies.append(strategy)
+            
+            body = strategies_payload.set(APIResponse.model_construct(
+                success=True,
+                message="Strategies retrieved successfully",
+                data=strategies
+            ))
+        return cached_payload_response(request, "strategies", strategies_payload, body, STRATEGIES_CACHE_CONTROL)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/strategies/runtime")
+async def get_strategy_runtime():
+    """Positions and state of the strategies this process is executing"""
+    return api_response(
+        success=True,
+        message="Strategy runtime status retrieved successfully",
+        data={"enabled": STRATEGY_RUNTIME_ENABLED, **(await strategy_runtime.status())}
+    )
+
 @app.post("/api/strategies", response_model=APIResponse)
 async def create_strategy(strategy: Strategy):
     """Create a new trading strategy"""
     try:
-        await db.strategies.insert_one(strategy.dict())
-        return APIResponse(
+        with metrics.track_mongo("insert_one", "strategies"):
+            await db.strategies.insert_one(strategy.dict())
+        strategies_payload.clear()
+        strategy_runtime.request_reload()
+        return api_response(
             success=True,
             message="Strategy created successfully",
-            data=strategy.dict()
+            data=strategy
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -289,18 +554,21 @@ async def create_strategy(strategy: Strategy):
 async def update_strategy(strategy_id: str, strategy: Strategy):
     """Update a trading strategy"""
     try:
-        result = await db.strategies.update_one(
-            {"id": strategy_id},
-            {"$set": {**strategy.dict(), "updated_at": datetime.utcnow()}}
-        )
+        with metrics.track_mongo("update_one", "strategies"):
+            result = await db.strategies.update_one(
+                {"id": strategy_id},
+                {"$set": {**strategy.editable_fields(), "updated_at": datetime.utcnow()}}
+            )
+        strategies_payload.clear()
+        strategy_runtime.request_reload()
         
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Strategy not found")
         
-        return APIResponse(
+        return api_response(
             success=True,
             message="Strategy updated successfully",
-            data=strategy.dict()
+            data=strategy
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -309,12 +577,15 @@ async def update_strategy(strategy_id: str, strategy: Strategy):
 async def delete_strategy(strategy_id: str):
     """Delete a trading strategy"""
     try:
-        result = await db.strategies.delete_one({"id": strategy_id})
+        with metrics.track_mongo("delete_one", "strategies"):
+            result = await db.strategies.delete_one({"id": strategy_id})
+        strategies_payload.clear()
+        strategy_runtime.request_reload()
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Strategy not found")
         
-        return APIResponse(
+        return api_response(
             success=True,
             message="Strategy deleted successfully"
         )
@@ -327,10 +598,10 @@ async def get_settings():
     """Get user settings"""
     try:
         settings = await get_user_settings()
-        return APIResponse(
+        return api_response(
             success=True,
             message="Settings retrieved successfully",
-            data=settings.dict()
+            data=settings
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -339,11 +610,7 @@ async def get_settings():
 async def update_settings(settings: UserSettings):
     """Update user settings"""
     try:
-        await db.user_settings.update_one(
-            {},
-            {"$set": {**settings.dict(), "updated_at": datetime.utcnow()}},
-            upsert=True
-        )
+        settings = await settings_cache.update(settings)
         
         # Update environment variables if API credentials changed
         if settings.api_credentials.wallet_address or settings.api_credentials.api_key or settings.api_credentials.api_secret:
@@ -355,22 +622,16 @@ async def update_settings(settings: UserSettings):
                 os.environ["HYPERLIQUID_API_SECRET"] = settings.api_credentials.api_secret.strip()
             os.environ["HYPERLIQUID_ENV"] = settings.api_credentials.environment
             
-            # Reinitialize service with new credentials from database
-            print("Reinitializing Hyperliquid service with new credentials...")
-            global hyperliquid_service
-            from hyperliquid_service import HyperliquidService
-            hyperliquid_service = HyperliquidService(
-                wallet_address=settings.api_credentials.wallet_address,
-                api_key=settings.api_credentials.api_key,
-                api_secret=settings.api_credentials.api_secret,
-                environment=settings.api_credentials.environment
-            )
-            print(f"Service reinitialized. Configured: {hyperliquid_service.is_configured}")
+            # Reinitialize service with new credentials from database, unless only other settings changed
+            if not service_registry.uses_credentials(*service_credentials(settings)):
+                print("Reinitializing Hyperliquid service with new credentials...")
+                await configure_hyperliquid_service(settings)
+                print(f"Service reinitialized. Configured: {hyperliquid_service.is_configured}")
         
-        return APIResponse(
+        return api_response(
             success=True,
             message="Settings updated successfully",
-            data=settings.dict()
+            data=settings
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -402,12 +663,13 @@ async def get_api_status():
             try:
                 # Test basic API connection with public endpoint
                 import requests
-                test_response = requests.post(
-                    "https://api.hyperliquid.xyz/info",
-                    json={"type": "meta"},
-                    headers={"Content-Type": "application/json"},
-                    timeout=10
-                )
+                with metrics.track_upstream("meta"):
+                    test_response = requests.post(
+                        "https://api.hyperliquid.xyz/info",
+                        json={"type": "meta"},
+                        headers={"Content-Type": "application/json"},
+                        timeout=10
+                    )
                 
                 if test_response.status_code == 200:
                     test_result = "✅ API connection successful - Ready for trading!"
@@ -419,7 +681,7 @@ async def get_api_status():
         else:
             test_result = "⚠️ Please enter all three API credentials (wallet address, API key, and API secret key)"
         
-        return APIResponse(
+        return api_response(
             success=True,
             message="API status retrieved successfully",
             data={
@@ -435,7 +697,7 @@ async def get_api_status():
             }
         )
     except Exception as e:
-        return APIResponse(
+        return api_response(
             success=False,
             message="Failed to check API status",
             error=str(e),
@@ -447,6 +709,16 @@ async def get_api_status():
         )
 
 # WebSocket endpoint for real-time data
+WS_CHANNELS = {
+    "subscribe_market": ("market", True),
+    "unsubscribe_market": ("market", True),
+    "subscribe_portfolio": ("portfolio", False),
+    "unsubscribe_portfolio": ("portfolio", False),
+    "subscribe_open_orders": ("open_orders", False),
+    "unsubscribe_open_orders": ("open_orders", False),
+}
+WS_FEED_KINDS = {"market": True, "portfolio": False, "open_orders": False}
+
 @app.websocket("/api/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
@@ -455,43 +727,88 @@ async def websocket_endpoint(websocket: WebSocket):
             data = await websocket.receive_text()
             message = json.loads(data)
             
-            if message.get("type") == "subscribe_market":
-                coin = message.get("coin", "BTC")
-                # Start sending market data updates
-                asyncio.create_task(send_market_updates(websocket, coin))
-            elif message.get("type") == "subscribe_portfolio":
-                # Start sending portfolio updates
-                asyncio.create_task(send_portfolio_updates(websocket))
+            message_type = message.get("type")
+            if message_type == "resync":
+                # Client detected a sequence gap and wants a fresh snapshot
+                kind = message.get("channel")
+                if kind in WS_FEED_KINDS:
+                    key = message.get("coin", "BTC").upper() if WS_FEED_KINDS[kind] else ""
+                    await subscriptions.send_snapshot(websocket, kind, key)
+                continue
+            if message_type not in WS_CHANNELS:
+                continue
+            
+            kind, keyed = WS_CHANNELS[message_type]
+            key = message.get("coin", "BTC").upper() if keyed else ""
+            reply = {"channel": kind, "coin": key or None}
+            
+            if message_type.startswith("subscribe"):
+                try:
+                    added = await subscriptions.subscribe(websocket, kind, key)
+                    reply.update(type="subscribed", already_subscribed=not added)
+                except SubscriptionLimitExceeded as e:
+                    reply.update(type="error", error=str(e))
+            else:
+                removed = subscriptions.unsubscribe(websocket, kind, key)
+                reply.update(type="unsubscribed", was_subscribed=removed)
+            
+            await manager.send_personal_message(reply, websocket)
                 
-    except WebSocketDisconnect:
+    except (WebSocketDisconnect, ClientDisconnected):
+        pass
+    finally:
+        subscriptions.disconnect(websocket)
         manager.disconnect(websocket)
 
-async def send_market_updates(websocket: WebSocket, coin: str):
-    """Send periodic market data updates"""
-    while True:
-        try:
-            market_data = await hyperliquid_service.get_market_data(coin)
-            await manager.send_personal_message({
-                "type": "market_update",
-                "coin": coin,
-                "data": market_data.dict()
-            }, websocket)
-            await asyncio.sleep(5)  # Update every 5 seconds
-        except:
-            break
-
-async def send_portfolio_updates(websocket: WebSocket):
-    """Send periodic portfolio updates"""
-    while True:
-        try:
-            portfolio = await hyperliquid_service.get_portfolio()
-            await manager.send_personal_message({
-                "type": "portfolio_update",
-                "data": portfolio.dict()
-            }, websocket)
-            await asyncio.sleep(10)  # Update every 10 seconds
-        except:
-            break
+async def fetch_market_update(coin: str) -> MarketData:
+    return await hyperliquid_service.get_market_data(coin)
+
+async def fetch_portfolio_update(_: str) -> Portfolio:
+    return await hyperliquid_service.get_portfolio()
+
+async def fetch_open_orders_update(_: str) -> List[Order]:
+    # Served from the open-orders book, so frequent polling stays cheap
+    return await hyperliquid_service.get_open_orders()
+
+def market_state(coin: str, market_data: MarketData) -> dict:
+    # The timestamp changes on every poll; clients get it from the message envelope
+    return market_data.dict(exclude={"timestamp"})
+
+def portfolio_state(_: str, portfolio: Portfolio) -> dict:
+    # Ids and timestamps are regenerated on every fetch, so leave them out of the
+    # diff and key positions by coin so a single position change stays small
+    state = portfolio.dict(exclude={"id", "created_at", "updated_at", "positions"})
+    state["positions"] = {
+        position.coin: position.dict(exclude={"id", "created_at", "updated_at"})
+        for position in portfolio.positions
+    }
+    return state
+
+def open_orders_state(_: str, orders: List[Order]) -> dict:
+    # Keyed by oid so a fill or cancel only sends the affected order
+    return {
+        str(order.oid): order.dict(exclude={"id", "created_at", "updated_at"})
+        for order in orders
+    }
+
+subscriptions.register_feed(
+    "market",
+    fetch=fetch_market_update,
+    state=market_state,
+    interval=5  # Poll every 5 seconds
+)
+subscriptions.register_feed(
+    "portfolio",
+    fetch=fetch_portfolio_update,
+    state=portfolio_state,
+    interval=10  # Poll every 10 seconds
+)
+subscriptions.register_feed(
+    "open_orders",
+    fetch=fetch_open_orders_update,
+    state=open_orders_state,
+    interval=1  # Memory read; upstream traffic is the book's own seeding and reconciliation
+)
 
 @app.get("/api/debug/wallet-info", response_model=APIResponse)
 async def debug_wallet_info():
@@ -512,19 +829,24 @@ async def debug_wallet_info():
             
             # Get perp balance
             try:
-                user_state = hyperliquid_service.info.user_state(hyperliquid_service.exchange.wallet.address)
+                with metrics.track_upstream("clearinghouseState"):
+                    user_state = await asyncio.to_thread(
+                        hyperliquid_service.info.user_state, hyperliquid_service.exchange.wallet.address
+                    )
                 debug_info["hyperliquid_perp_balance"] = float(user_state.get("marginSummary", {}).get("accountValue", 0))
             except Exception as e:
                 debug_info["perp_error"] = str(e)
             
             # Get spot balance
             try:
-                import requests
-                spot_response = requests.post(
-                    "https://api.hyperliquid.xyz/info",
-                    json={"type": "spotClearinghouseState", "user": hyperliquid_service.exchange.wallet.address},
-                    headers={"Content-Type": "application/json"}
-                )
+                with metrics.track_upstream("spotClearinghouseState"):
+                    spot_response = await asyncio.to_thread(
+                        service_registry.session.post,
+                        "https://api.hyperliquid.xyz/info",
+                        json={"type": "spotClearinghouseState", "user": hyperliquid_service.exchange.wallet.address},
+                        headers={"Content-Type": "application/json"},
+                        timeout=service_registry.upstream.timeout,
+                    )
                 if spot_response.status_code == 200:
                     spot_data = spot_response.json()
                     debug_info["spot_response"] = spot_data
@@ -537,7 +859,7 @@ async def debug_wallet_info():
             except Exception as e:
                 debug_info["spot_error"] = str(e)
         
-        return APIResponse(
+        return api_response(
             success=True,
             message="Debug info retrieved",
             data=debug_info
@@ -545,59 +867,75 @@ async def debug_wallet_info():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/debug/blocking-calls", response_model=APIResponse)
+async def debug_blocking_calls():
+    """Recent event loop stalls captured by the loop watchdog"""
+    return api_response(
+        success=True,
+        message="Blocking call reports retrieved" if loop_watchdog.enabled else "Loop watchdog is disabled",
+        data={
+            "enabled": loop_watchdog.enabled,
+            "threshold_ms": loop_watchdog.threshold * 1000,
+            "reports": loop_watchdog.get_reports()
+        }
+    )
+
+# Serialized /api/coins body; the listing changes rarely
+coins_payload = CachedPayload(ttl=float(os.getenv("COINS_CACHE_TTL", "300")))
+COINS_CACHE_CONTROL = "public, max-age=60"
+service_registry.universe.on_change(lambda base_url, universe: coins_payload.clear())
+
+# Display names based on common knowledge
+COIN_DISPLAY_NAMES = {
+    "BTC": "Bitcoin",
+    "ETH": "Ethereum", 
+    "SOL": "Solana",
+    "AVAX": "Avalanche",
+    "MATIC": "Polygon",
+    "LINK": "Chainlink",
+    "UNI": "Uniswap",
+    "AAVE": "Aave",
+    "ATOM": "Cosmos",
+    "DOT": "Polkadot",
+    "ADA": "Cardano",
+    "NEAR": "Near Protocol",
+    "FIL": "Filecoin",
+    "DOGE": "Dogecoin",
+    "LTC": "Litecoin"
+}
+
 @app.get("/api/coins", response_model=APIResponse)
-async def get_available_coins():
+async def get_available_coins(request: Request):
     """Get list of available coins for trading from real Hyperliquid API"""
+    cached = coins_payload.get()
+    metrics.record_cache("coins", cached is not None)
+    if cached is not None:
+        return cached_payload_response(request, "coins", coins_payload, cached, COINS_CACHE_CONTROL)
+    
     try:
-        import requests
+        # Coin list from the cached mainnet universe; only a cold cache hits the API
+        universe = await service_registry.universe.ensure(base_url_for("mainnet"))
         
-        # Get real coin list from Hyperliquid meta endpoint
-        meta_response = requests.post(
-            "https://api.hyperliquid.xyz/info",
-            json={"type": "meta"},
-            headers={"Content-Type": "application/json"}
-        )
+        coins = [
+            {
+                "symbol": asset.name,
+                "name": COIN_DISPLAY_NAMES.get(asset.name, asset.name),
+                "maxLeverage": asset.max_leverage
+            }
+            for asset in universe.active()
+        ]
         
-        if meta_response.status_code == 200:
-            meta_data = meta_response.json()
-            
-            coins = []
-            for universe_item in meta_data.get("universe", []):
-                coin_name = universe_item.get("name", "")
-                if coin_name and not universe_item.get("isDelisted", False):
-                    # Add display name based on common knowledge
-                    display_names = {
-                        "BTC": "Bitcoin",
-                        "ETH": "Ethereum", 
-                        "SOL": "Solana",
-                        "AVAX": "Avalanche",
-                        "MATIC": "Polygon",
-                        "LINK": "Chainlink",
-                        "UNI": "Uniswap",
-                        "AAVE": "Aave",
-                        "ATOM": "Cosmos",
-                        "DOT": "Polkadot",
-                        "ADA": "Cardano",
-                        "NEAR": "Near Protocol",
-                        "FIL": "Filecoin",
-                        "DOGE": "Dogecoin",
-                        "LTC": "Litecoin"
-                    }
-                    
-                    coins.append({
-                        "symbol": coin_name,
-                        "name": display_names.get(coin_name, coin_name),
-                        "maxLeverage": universe_item.get("maxLeverage", 1)
-                    })
-            
+        if coins:
             # Sort by symbol for better UX
             coins.sort(key=lambda x: x["symbol"])
             
-            return APIResponse(
+            # Only the real list is cached; the fallback is retried on the next request
+            body = coins_payload.set(APIResponse.model_construct(
                 success=True,
                 message="Available coins retrieved successfully",
                 data=coins
-            )
+            ))
+            return cached_payload_response(request, "coins", coins_payload, body, COINS_CACHE_CONTROL)
         
         raise Exception("Could not fetch real coin list")
         
@@ -615,7 +953,7 @@ async def get_available_coins():
             {"symbol": "ATOM", "name": "Cosmos", "maxLeverage": 5},
         ]
         
-        return APIResponse(
+        return api_response(
             success=True,
             message="Available coins retrieved successfully (fallback)",
             data=fallback_coins
@@ -0,0 +1,336 @@
+"""
+Registry owning the active HyperliquidService.
+
+Everything that does not depend on credentials is built once and shared by
+every service instance: the HTTP session (connection pool), and per API
+base URL the SDK ``Info`` object with the raw ``meta``/``spotMeta`` it was
+built from. A credential change therefore only builds a new ``Exchange``
+from the cached metadata, off the event loop, and then swaps the current
+service in one assignment. Requests already running keep the instance they
+started with and finish on it; the old instance's order pipeline is only
+shut down once the orders and cancels running on it have finished.
+
+``hyperliquid_service`` is a proxy that always resolves to the current
+instance, so modules that imported it never hold a stale reference.
+
+``meta``/``spotMeta`` come from the disk-persisted universe cache, so
+building SDK state normally needs no network round trip; when the universe
+changes, the SDK state for that base URL is rebuilt and the current service
+reconfigured onto it.
+
+The registry also hands out read-only per-wallet ``AccountHandle`` objects
+for multi-account monitoring, all on the same session, response cache and
+rate governor, and keeps the fills store, the open-orders books and the live user
+streams (attached whenever credentials are configured, unless HL_USER_STREAMS=false)
+across credential changes.
+
+Connections to the API hosts are opened at startup and kept alive by a
+``ConnectionWarmer`` on the shared session, so no request (in particular no
+order) pays connection setup after an idle period.
+
+In multi-worker mode (MARKET_DATA_SHARED=true) services read mids, books and
+candles from the market data owner's shared memory, and book caches do not
+open their own l2Book streams, since each worker would otherwise subscribe.
+"""
+
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Optional, Set, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from accounts import AccountHandle, RateGovernor, ResponseCache
+from book_cache import BookCache
+from circuit_breaker import UpstreamGuard
+from connection_warmer import ConnectionWarmer
+from fills_store import FillsStore
+from open_orders import OpenOrdersStore
+from shared_market_data import SharedMarketData, shared_market_data_from_env
+from universe_cache import Universe, UniverseCache
+from hyperliquid_service import HyperliquidService, base_url_for
+from metrics import metrics
+
+pool_requests = metrics.gauge(
+    "hypertrader_upstream_pool_requests", "Requests sent over the shared session's connection pools", ("host",))
+pool_connections = metrics.gauge(
+    "hypertrader_upstream_pool_connections_opened", "Connections opened by the shared session's pools", ("host",))
+pool_reuse = metrics.gauge(
+    "hypertrader_upstream_connection_reuse_ratio", "Share of upstream requests sent on an already open connection",
+    ("host",))
+
+if TYPE_CHECKING:
+    # The SDK is imported on first use, keeping it off the startup path
+    from hyperliquid.info import Info
+
+class ServiceRegistry:
+    def __init__(self, max_concurrency: int = 8, rate_per_second: float = 15.0,
+                 cache_ttl: float = 2.0, user_streams: bool = False,
+                 open_orders_reconcile_interval: float = 30.0, universe_path: str = "universe_cache.json",
+                 universe_refresh_interval: float = 600.0, book_streams: bool = True,
+                 upstream: Optional[UpstreamGuard] = None, market_data: Optional[SharedMarketData] = None,
+                 warm_connections: int = 2, keepalive_interval: float = 20.0, max_accounts: int = 1024):
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+        # Enough pooled connections for every concurrent fan-out slot
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=max(10, max_concurrency)))
+
+        self.governor = RateGovernor(max_concurrency, rate_per_second)
+        # Circuit breakers and last-good snapshots survive credential changes
+        self.upstream = upstream or UpstreamGuard()
+        self.warmer = ConnectionWarmer(
+            self.session, self.api_base_urls, connections=warm_connections,
+            interval=keepalive_interval, timeout=self.upstream.timeout
+        )
+        pool_requests.set_function(lambda: self._pool_stats(0))
+        pool_connections.set_function(lambda: self._pool_stats(1))
+        pool_reuse.set_function(self._pool_reuse)
+        self.response_cache = ResponseCache(ttl=cache_ttl)
+        # Least recently used wallets are dropped past max_accounts
+        self.max_accounts = max_accounts
+        self._accounts: "OrderedDict[Tuple[str, str], AccountHandle]" = OrderedDict()
+
+        self.fills_store = FillsStore(self.session)
+        self.open_orders = OpenOrdersStore(self.session, reconcile_interval=open_orders_reconcile_interval)
+        self.user_streams = user_streams
+        self._stream_infos: Dict[str, "Info"] = {}
+        # (base_url, wallet) -> [(subscription, subscription id)]
+        self._stream_subscriptions: Dict[Tuple[str, str], list] = {}
+
+        # Mids, books and candles published by the market data owner process, if any
+        self.market_data = market_data
+
+        # Order books for market-order pricing, per base URL
+        self.book_streams = book_streams and market_data is None
+        self._books: Dict[str, BookCache] = {}
+
+        self.universe = UniverseCache(self.session, universe_path, universe_refresh_interval)
+        self.universe.on_change(self._on_universe_change)
+
+        self._sdk: Dict[str, Tuple["Info", Any, Any]] = {}
+        self._sdk_lock = threading.Lock()
+        self._credentials: Optional[Tuple] = None
+        # One configure at a time, so a slower build can never swap in over a newer one
+        self._configure_lock = asyncio.Lock()
+        self._retiring: Set[asyncio.Task] = set()
+        self._current = HyperliquidService(
+            session=self.session, fills_store=self.fills_store, open_orders=self.open_orders,
+            universe=self.universe, upstream=self.upstream, market_data=self.market_data
+        )
+
+    @property
+    def current(self) -> HyperliquidService:
+        return self._current
+
+    def api_base_urls(self):
+        """Base URLs whose connections are kept warm: mainnet (market data) and the current service's"""
+        base_urls = [base_url_for("mainnet")]
+        if self._current.is_configured and self._current.base_url not in base_urls:
+            base_urls.append(self._current.base_url)
+        return base_urls
+
+    def _pool_stats(self, index: int) -> Dict[Tuple[str, ...], float]:
+        return {(host,): counts[index] for host, counts in self.warmer.stats().items()}
+
+    def _pool_reuse(self) -> Dict[Tuple[str, ...], float]:
+        return {
+            (host,): 1 - opened / sent
+            for host, (sent, opened) in self.warmer.stats().items() if sent
+        }
+
+    def sdk_components(self, base_url: str) -> Tuple["Info", Any, Any]:
+        """Return the shared (info, meta, spot_meta) for an API base URL, building it once"""
+        components = self._sdk.get(base_url)
+        if components is not None:
+            metrics.record_cache("sdk_meta", True)
+            return components
+
+        with self._sdk_lock:
+            components = self._sdk.get(base_url)
+            if components is None:
+                metrics.record_cache("sdk_meta", False)
+                components = self._build_sdk(base_url)
+                self._sdk[base_url] = components
+            return components
+
+    def _build_sdk(self, base_url: str) -> Tuple["Info", Any, Any]:
+        from hyperliquid.info import Info
+
+        print(f"Building shared Hyperliquid SDK state for {base_url}")
+        universe = self.universe.get_or_fetch(base_url)
+        meta, spot_meta = universe.meta, universe.spot_meta
+
+        info = Info(base_url, skip_ws=True, meta=meta, spot_meta=spot_meta)
+        info.session = self.session
+        return info, meta, spot_meta
+
+    def invalidate_sdk(self, base_url: Optional[str] = None):
+        """Drop shared SDK state so the next configure rebuilds it (e.g. after a listing change)"""
+        with self._sdk_lock:
+            if base_url is None:
+                self._sdk.clear()
+            else:
+                self._sdk.pop(base_url, None)
+
+    def build(self, wallet_address=None, api_key=None, api_secret=None,
+              environment="testnet") -> HyperliquidService:
+        """Build a service on the shared session and SDK state (blocking)"""
+        return HyperliquidService(
+            wallet_address=wallet_address,
+            api_key=api_key,
+            api_secret=api_secret,
+            environment=environment,
+            session=self.session,
+            sdk_provider=self.sdk_components,
+            fills_store=self.fills_store,
+            open_orders=self.open_orders,
+            universe=self.universe,
+            book_provider=self.books,
+            upstream=self.upstream,
+            market_data=self.market_data
+        )
+
+    def books(self, base_url: str) -> BookCache:
+        """Shared book cache for a base URL, streaming l2Book when book streams are enabled"""
+        books = self._books.get(base_url)
+        if books is None:
+            stream_info = (lambda: self.stream_info(base_url)) if self.book_streams else None
+            books = self._books.setdefault(base_url, BookCache(stream_info))
+        return books
+
+    def uses_credentials(self, wallet_address=None, api_key=None, api_secret=None, environment="testnet") -> bool:
+        """Whether the current service was built, successfully, for exactly these credentials"""
+        return self._current.is_configured and self._credentials == (wallet_address, api_key, api_secret, environment)
+
+    async def configure(self, wallet_address=None, api_key=None, api_secret=None,
+                        environment="testnet") -> HyperliquidService:
+        """Build a service for new credentials off the event loop, then swap it in atomically.
+
+        Unchanged credentials keep the current service, with its SDK state, pipeline and streams.
+        """
+        async with self._configure_lock:
+            if self.uses_credentials(wallet_address, api_key, api_secret, environment):
+                return self._current
+            return await self._configure(wallet_address, api_key, api_secret, environment)
+
+    async def _configure(self, wallet_address, api_key, api_secret, environment) -> HyperliquidService:
+        service = await asyncio.to_thread(
+            self.build, wallet_address, api_key, api_secret, environment
+        )
+        previous, self._current = self._current, service
+        self._credentials = (wallet_address, api_key, api_secret, environment)
+        if previous.pipeline:
+            # Orders running on the old service finish on it; its pipeline stops after them
+            task = asyncio.create_task(previous.retire(), name="hyperliquid-service-retire")
+            self._retiring.add(task)
+            task.add_done_callback(self._retiring.discard)
+        if self.user_streams:
+            loop = asyncio.get_running_loop()
+            await asyncio.to_thread(self._switch_user_streams, previous, service, loop)
+        return service
+
+    async def _on_universe_change(self, base_url: str, universe: Universe):
+        """Rebuild SDK state after a listing change and move the current service onto it"""
+        self.invalidate_sdk(base_url)
+        async with self._configure_lock:
+            # Checked under the lock: the credentials a configure running meanwhile swapped in
+            if self._current.is_configured and self._current.base_url == base_url and self._credentials:
+                await self._configure(*self._credentials)
+
+    def stream_info(self, base_url: str) -> "Info":
+        """Shared SDK Info with its WebSocket manager running, built on first use"""
+        info = self._stream_infos.get(base_url)
+        if info is None:
+            from hyperliquid.info import Info
+
+            _, meta, spot_meta = self.sdk_components(base_url)
+            info = Info(base_url, skip_ws=False, meta=meta, spot_meta=spot_meta)
+            info.session = self.session
+            self._stream_infos[base_url] = info
+        return info
+
+    def _switch_user_streams(self, previous: HyperliquidService, service: HyperliquidService,
+                             loop: asyncio.AbstractEventLoop):
+        """Move live user streams from the previous wallet to the new one"""
+        if previous.is_configured:
+            key = (previous.base_url, previous.wallet_address)
+            if previous.wallet_address != service.wallet_address or not service.is_configured:
+                for subscription, subscription_id in self._stream_subscriptions.pop(key, []):
+                    try:
+                        self._stream_infos[previous.base_url].unsubscribe(subscription, subscription_id)
+                    except Exception as e:
+                        print(f"Failed to unsubscribe {subscription['type']}: {e}")
+                self.fills_store.detach_stream(*key)
+                self.open_orders.detach_stream(*key)
+
+        if not service.is_configured:
+            return
+        key = (service.base_url, service.wallet_address)
+        if key in self._stream_subscriptions:
+            return
+        try:
+            info = self.stream_info(service.base_url)
+            fills_id = self.fills_store.attach_stream(info, *key, loop)
+            orders_id = self.open_orders.attach_stream(info, *key, loop)
+            self._stream_subscriptions[key] = [
+                ({"type": "userFills", "user": service.wallet_address}, fills_id),
+                ({"type": "orderUpdates", "user": service.wallet_address}, orders_id)
+            ]
+            print(f"Live user streams attached for {service.wallet_address[:8]}...")
+        except Exception as e:
+            print(f"Failed to attach live user streams: {e}")
+
+    def account(self, wallet_address: str, environment: str = "mainnet") -> AccountHandle:
+        """Get or create the read-only handle for a wallet"""
+        key = (wallet_address.lower(), environment)
+        handle = self._accounts.get(key)
+        if handle is not None:
+            self._accounts.move_to_end(key)
+            return handle
+        handle = AccountHandle(
+            wallet_address, base_url_for(environment), self.session,
+            self.governor, self.response_cache
+        )
+        self._accounts[key] = handle
+        while len(self._accounts) > self.max_accounts:
+            self._accounts.popitem(last=False)
+        return handle
+
+class ServiceProxy:
+    """Forwards attribute access to the registry's current service"""
+
+    def __init__(self, registry: ServiceRegistry):
+        object.__setattr__(self, "_registry", registry)
+
+    def __getattr__(self, name):
+        return getattr(self._registry.current, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._registry.current, name, value)
+
+# Global registry and the service handle everything else imports
+service_registry = ServiceRegistry(
+    max_concurrency=int(os.getenv("HL_MAX_CONCURRENCY", "8")),
+    rate_per_second=float(os.getenv("HL_RATE_LIMIT_PER_SEC", "15")),
+    cache_ttl=float(os.getenv("ACCOUNT_CACHE_TTL", "2")),
+    user_streams=os.getenv("HL_USER_STREAMS", "true").lower() in ("1", "true", "yes"),
+    open_orders_reconcile_interval=float(os.getenv("OPEN_ORDERS_RECONCILE_INTERVAL", "30")),
+    universe_path=os.getenv(
+        "UNIVERSE_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "universe_cache.json")
+    ),
+    universe_refresh_interval=float(os.getenv("UNIVERSE_REFRESH_INTERVAL", "600")),
+    book_streams=os.getenv("HL_BOOK_STREAMS", "true").lower() in ("1", "true", "yes"),
+    upstream=UpstreamGuard(
+        timeout=float(os.getenv("UPSTREAM_TIMEOUT", "5")),
+        failure_threshold=int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3")),
+        base_backoff=float(os.getenv("CIRCUIT_BASE_BACKOFF", "1")),
+        max_backoff=float(os.getenv("CIRCUIT_MAX_BACKOFF", "60"))
+    ),
+    market_data=shared_market_data_from_env(),
+    warm_connections=int(os.getenv("HL_WARM_CONNECTIONS", "2")),
+    keepalive_interval=float(os.getenv("HL_KEEPALIVE_INTERVAL", "20")),
+    max_accounts=int(os.getenv("MAX_MONITORED_ACCOUNTS", "1024"))
+)
+hyperliquid_service = ServiceProxy(service_registry)
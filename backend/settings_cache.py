@@ -0,0 +1,98 @@
+"""
+Process-level cache of the user settings document.
+
+Settings are loaded from Mongo once at startup and served from memory
+afterwards. ``PUT /api/settings`` writes through and bumps a ``version``
+field on the document; a background task polls just that field so other
+uvicorn workers notice the change and reload, keeping every process
+consistent without a database round trip on reads.
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+from pymongo import ReturnDocument
+
+from metrics import metrics
+from models import UserSettings
+
+class SettingsCache:
+    def __init__(self, collection, refresh_interval: float = 5.0):
+        self.collection = collection
+        self.refresh_interval = refresh_interval
+        self.on_change: Optional[Callable[[UserSettings], Awaitable[None]]] = None
+
+        self._settings: Optional[UserSettings] = None
+        self._load_lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def version(self) -> int:
+        return self._settings.version if self._settings else -1
+
+    async def get(self) -> UserSettings:
+        """Return the cached settings; callers must treat the object as read-only"""
+        if self._settings is not None:
+            metrics.record_cache("settings", True)
+            return self._settings
+
+        metrics.record_cache("settings", False)
+        return await self.load()
+
+    async def load(self) -> UserSettings:
+        """Load settings from Mongo, creating the default document if there is none"""
+        async with self._load_lock:
+            with metrics.track_mongo("find_one", "user_settings"):
+                settings_data = await self.collection.find_one({})
+
+            if settings_data is None:
+                default_settings = UserSettings()
+                with metrics.track_mongo("insert_one", "user_settings"):
+                    await self.collection.insert_one(default_settings.dict())
+                self._settings = default_settings
+            else:
+                settings_data.pop("_id", None)
+                self._settings = UserSettings(**settings_data)
+            return self._settings
+
+    async def update(self, settings: UserSettings) -> UserSettings:
+        """Write settings through to Mongo and bump the version seen by other workers"""
+        fields = settings.dict(exclude={"version"})
+        fields["updated_at"] = datetime.utcnow()
+        with metrics.track_mongo("find_one_and_update", "user_settings"):
+            settings_data = await self.collection.find_one_and_update(
+                {},
+                {"$set": fields, "$inc": {"version": 1}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        settings_data.pop("_id", None)
+        self._settings = UserSettings(**settings_data)
+        return self._settings
+
+    def start_refresh(self):
+        if self._refresh_task is None and self.refresh_interval > 0:
+            self._refresh_task = asyncio.create_task(self._refresh_loop(), name="settings-refresh")
+
+    async def stop_refresh(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                with metrics.track_mongo("find_one", "user_settings"):
+                    doc = await self.collection.find_one({}, {"version": 1})
+                remote_version = (doc or {}).get("version", 0)
+                if remote_version != self.version:
+                    print(f"Settings changed by another worker (version {self.version} -> {remote_version}), reloading")
+                    settings = await self.load()
+                    if self.on_change:
+                        await self.on_change(settings)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Settings refresh failed: {e}")
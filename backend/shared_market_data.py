@@ -0,0 +1,187 @@
+"""
+Shared-memory market data for multi-worker deployments.
+
+With several uvicorn workers, every worker polling mids, books and candles
+itself would multiply upstream load by the worker count. Instead a single
+owner process (``market_data_owner.py``) polls each market data key and
+writes the raw info response into a shared-memory segment of its own; the
+workers read those bytes and decode them exactly as they would an upstream
+response.
+
+Keys are demand driven. A worker reading a key sends its name to the owner
+over a Unix datagram socket (at most once per ``demand_interval``). The
+owner polls a key for as long as some worker keeps asking for it. A miss
+(key not yet polled, data older than ``max_age``, owner down) returns None
+and the worker fetches upstream itself, so the owner is an optimisation and
+never a single point of failure.
+
+Each segment is a seqlock: a header of (sequence, fetched_at, length)
+followed by the payload. The writer makes the sequence odd, copies the
+payload, then fetched_at and length, and only then stores the even
+sequence, and readers retry when the sequence moved under them, so the
+writer never waits on readers and readers never see a torn payload or a
+length from another write.
+"""
+
+import hashlib
+import os
+import socket
+import struct
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Optional, Tuple
+
+from metrics import metrics
+
+HEADER = struct.Struct("<QdI")  # sequence, fetched_at (time.time()), payload length
+HEADER_SIZE = 32
+
+# Segment capacity per kind. Pages are only committed once written, so these are upper bounds
+CAPACITY = {
+    "allMids": 1024 * 1024,
+    "l2Book": 256 * 1024,
+    "candles": 4 * 1024 * 1024,
+}
+
+def market_key(url: str, kind: str, *args: str) -> str:
+    """Key for one market data payload, e.g. ``market_key(INFO_URL, "l2Book", "BTC")``"""
+    return " ".join((url, kind) + args)
+
+def parse_key(key: str) -> Tuple[str, str, Tuple[str, ...]]:
+    url, kind, *args = key.split(" ")
+    return url, kind, tuple(args)
+
+def segment_name(prefix: str, key: str) -> str:
+    # POSIX shared memory names are short; hash the key
+    return f"{prefix}_{hashlib.blake2b(key.encode(), digest_size=8).hexdigest()}"
+
+class SharedSlot:
+    """One key's seqlocked segment"""
+
+    def __init__(self, memory: shared_memory.SharedMemory):
+        self.memory = memory
+        self.buffer = memory.buf
+
+    @classmethod
+    def create(cls, name: str, capacity: int) -> "SharedSlot":
+        try:
+            memory = shared_memory.SharedMemory(name, create=True, size=HEADER_SIZE + capacity)
+        except FileExistsError:
+            # Left behind by an owner that did not shut down cleanly
+            memory = shared_memory.SharedMemory(name)
+        return cls(memory)
+
+    @classmethod
+    def attach(cls, name: str) -> Optional["SharedSlot"]:
+        try:
+            memory = shared_memory.SharedMemory(name)
+        except FileNotFoundError:
+            return None
+        # Attaching registers the segment with this process's resource tracker, which
+        # would unlink it when the worker exits; the owner is responsible for it
+        resource_tracker.unregister(memory._name, "shared_memory")
+        return cls(memory)
+
+    @property
+    def capacity(self) -> int:
+        return len(self.buffer) - HEADER_SIZE
+
+    def write(self, payload: bytes, fetched_at: float) -> bool:
+        """Publish a payload; returns False if it does not fit"""
+        if len(payload) > self.capacity:
+            return False
+        sequence = HEADER.unpack_from(self.buffer, 0)[0]
+        struct.pack_into("<Q", self.buffer, 0, sequence + 1)
+        self.buffer[HEADER_SIZE:HEADER_SIZE + len(payload)] = payload
+        # Everything a reader pairs with the sequence first; the even sequence publishes it
+        struct.pack_into("<dI", self.buffer, 8, fetched_at, len(payload))
+        struct.pack_into("<Q", self.buffer, 0, sequence + 2)
+        return True
+
+    def read(self, attempts: int = 4) -> Optional[Tuple[float, bytes]]:
+        """(fetched_at, payload) of the latest consistent write, None if never written"""
+        for _ in range(attempts):
+            sequence, fetched_at, length = HEADER.unpack_from(self.buffer, 0)
+            if sequence == 0:
+                return None
+            if sequence & 1:
+                continue
+            payload = bytes(self.buffer[HEADER_SIZE:HEADER_SIZE + length])
+            if HEADER.unpack_from(self.buffer, 0)[0] == sequence:
+                return fetched_at, payload
+        return None
+
+    def close(self):
+        self.buffer = None
+        self.memory.close()
+
+class SharedMarketData:
+    """Worker-side reader of the owner process's segments"""
+
+    def __init__(self, prefix: str, socket_path: str, max_age: float = 5.0,
+                 demand_interval: float = 5.0, candle_depth: int = 500):
+        self.prefix = prefix
+        self.socket_path = socket_path
+        self.max_age = max_age
+        self.demand_interval = demand_interval
+        # Latest candles kept per coin and interval; larger or historical requests go upstream
+        self.candle_depth = candle_depth
+        self._slots: Dict[str, SharedSlot] = {}
+        self._attach_after: Dict[str, float] = {}
+        self._demanded_at: Dict[str, float] = {}
+        # Fetches run on executor threads; a slot must not be closed mid-read
+        self._lock = threading.Lock()
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+
+    def read(self, key: str) -> Optional[bytes]:
+        """Latest payload for the key if the owner has a fresh one"""
+        self._demand(key)
+        with self._lock:
+            slot = self._slot(key)
+            entry = slot.read() if slot is not None else None
+            if entry is not None and time.time() - entry[0] > self.max_age:
+                # Polling stopped (idle key or owner gone); the owner recreates the segment on demand
+                self._detach(key)
+                entry = None
+        metrics.record_cache("shared_market_data", entry is not None)
+        return entry[1] if entry is not None else None
+
+    def _demand(self, key: str):
+        now = time.monotonic()
+        if now - self._demanded_at.get(key, float("-inf")) < self.demand_interval:
+            return
+        self._demanded_at[key] = now
+        try:
+            self._socket.sendto(key.encode(), self.socket_path)
+        except OSError:
+            # Owner not running or its queue is full; reads fall back upstream
+            pass
+
+    def _slot(self, key: str) -> Optional[SharedSlot]:
+        slot = self._slots.get(key)
+        if slot is None and time.monotonic() >= self._attach_after.get(key, 0.0):
+            slot = SharedSlot.attach(segment_name(self.prefix, key))
+            if slot is None:
+                self._attach_after[key] = time.monotonic() + 1.0
+            else:
+                self._slots[key] = slot
+        return slot
+
+    def _detach(self, key: str):
+        slot = self._slots.pop(key, None)
+        if slot is not None:
+            slot.close()
+        self._attach_after[key] = time.monotonic() + 1.0
+
+def shared_market_data_from_env() -> Optional[SharedMarketData]:
+    """Reader configured from the environment, or None unless MARKET_DATA_SHARED is set"""
+    if os.getenv("MARKET_DATA_SHARED", "false").lower() not in ("1", "true", "yes"):
+        return None
+    return SharedMarketData(
+        prefix=os.getenv("MARKET_DATA_SHM_PREFIX", "hypertrader"),
+        socket_path=os.getenv("MARKET_DATA_SOCKET", "/tmp/hypertrader-market-data.sock"),
+        max_age=float(os.getenv("MARKET_DATA_MAX_AGE", "5")),
+        candle_depth=int(os.getenv("MARKET_DATA_CANDLE_DEPTH", "500")),
+    )
@@ -0,0 +1,446 @@
+"""
+Incremental evaluation of Mongo-stored strategies.
+
+A ``Strategy`` document's config is compiled once into condition closures.
+Every condition in ``entry_conditions`` (or ``exit_conditions``) must hold:
+
+    price_above / price_below   mid price strictly above / below a number
+    sma_above / sma_below       mid price above / below the SMA of the last
+                                N candle closes, e.g. ``{"sma_above": 20}``
+    rsi_above / rsi_below       Wilder RSI of candle closes above / below a
+                                value, e.g. ``{"rsi_below": {"value": 30, "period": 14}}``
+
+``risk_management`` may set ``stop_loss`` and ``take_profit`` (fractions of
+the entry price, checked on every tick while in a position),
+``max_position_size`` (coin units) and ``max_loss`` (USD of realized loss
+after which the strategy halts). ``position_sizing`` is
+``{"size_type": "fixed", "amount": <coins>}`` or
+``{"size_type": "percentage", "amount": <fraction of account value>}`` (the
+legacy ``{"percentage": <fraction>}`` also works), plus an optional ``side``
+of ``long`` (default) or ``short``. A strategy without entry conditions
+never enters, and unknown condition keys are rejected rather than ignored.
+
+``CoinEvaluator`` holds everything for one coin: the indicators shared by
+all of its strategies (one SMA(20) however many strategies use it), updated
+once per candle close, and each strategy's position state. Ticks only
+re-check the strategies of the coin that moved. Evaluation is pure: it
+returns ``OrderIntent``s and never does I/O; the caller submits them and
+reports back through ``confirm``/``reject``.
+"""
+
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+Indicators = Dict[Tuple[str, int], "Indicator"]
+Condition = Callable[[float, Indicators], bool]
+
+class StrategyConfigError(ValueError):
+    """A strategy's config cannot be compiled"""
+
+class Sma:
+    def __init__(self, period: int):
+        self.period = period
+        self._closes: Deque[float] = deque(maxlen=period)
+        self._sum = 0.0
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._sum / self.period if len(self._closes) == self.period else None
+
+    def update(self, close: float):
+        if len(self._closes) == self.period:
+            self._sum -= self._closes[0]
+        self._closes.append(close)
+        self._sum += close
+
+class Rsi:
+    """Wilder's RSI, updated in O(1) per close"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self._previous: Optional[float] = None
+        self._count = 0
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
+
+    @property
+    def value(self) -> Optional[float]:
+        if self._count < self.period:
+            return None
+        if self._avg_loss == 0:
+            return 100.0
+        return 100 - 100 / (1 + self._avg_gain / self._avg_loss)
+
+    def update(self, close: float):
+        if self._previous is not None:
+            change = close - self._previous
+            gain, loss = max(change, 0.0), max(-change, 0.0)
+            self._count += 1
+            if self._count <= self.period:
+                # Simple average over the first period, then Wilder smoothing
+                self._avg_gain += (gain - self._avg_gain) / self._count
+                self._avg_loss += (loss - self._avg_loss) / self._count
+            else:
+                self._avg_gain = (self._avg_gain * (self.period - 1) + gain) / self.period
+                self._avg_loss = (self._avg_loss * (self.period - 1) + loss) / self.period
+        self._previous = close
+
+Indicator = Any  # Sma or Rsi
+INDICATORS = {"sma": Sma, "rsi": Rsi}
+
+def _number(value: Any, key: str) -> float:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise StrategyConfigError(f"{key} needs a number, got {value!r}")
+    if not math.isfinite(number):
+        raise StrategyConfigError(f"{key} needs a finite number, got {value!r}")
+    return number
+
+def _period(value: Any, key: str) -> int:
+    period = int(_number(value, key))
+    if period < 1:
+        raise StrategyConfigError(f"{key} needs a period of at least 1, got {value!r}")
+    return period
+
+def compile_conditions(conditions: Dict[str, Any]) -> Tuple[List[Condition], List[Tuple[str, int]]]:
+    """Closures for a conditions dict, plus the (indicator, period) keys they read"""
+    compiled: List[Condition] = []
+    needs: List[Tuple[str, int]] = []
+    for key, value in conditions.items():
+        name, _, direction = key.rpartition("_")
+        if direction not in ("above", "below"):
+            raise StrategyConfigError(f"Unknown condition {key!r}")
+        above = direction == "above"
+
+        if name == "price":
+            threshold = _number(value, key)
+            compiled.append(
+                (lambda t: lambda price, _: price > t)(threshold) if above
+                else (lambda t: lambda price, _: price < t)(threshold)
+            )
+        elif name == "sma":
+            indicator = ("sma", _period(value, key))
+            needs.append(indicator)
+            compiled.append(_compare_price_to(indicator, above))
+        elif name == "rsi":
+            if not isinstance(value, dict):
+                value = {"value": value}
+            indicator = ("rsi", _period(value.get("period", 14), key))
+            needs.append(indicator)
+            compiled.append(_compare_indicator(indicator, _number(value.get("value"), key), above))
+        else:
+            raise StrategyConfigError(f"Unknown condition {key!r}")
+    return compiled, needs
+
+def _compare_price_to(indicator: Tuple[str, int], above: bool) -> Condition:
+    def condition(price: float, indicators: Indicators) -> bool:
+        value = indicators[indicator].value
+        return value is not None and (price > value if above else price < value)
+    return condition
+
+def _compare_indicator(indicator: Tuple[str, int], threshold: float, above: bool) -> Condition:
+    def condition(price: float, indicators: Indicators) -> bool:
+        value = indicators[indicator].value
+        return value is not None and (value > threshold if above else value < threshold)
+    return condition
+
+@dataclass
+class CompiledStrategy:
+    id: str
+    name: str
+    coin: str
+    entry: List[Condition]
+    exit: List[Condition]
+    indicators: List[Tuple[str, int]]
+    is_long: bool
+    size: Optional[float]  # Coins, for fixed sizing
+    fraction: Optional[float]  # Of account value, for percentage sizing
+    max_position_size: Optional[float]
+    stop_loss: Optional[float]
+    take_profit: Optional[float]
+    max_loss: Optional[float]
+
+def compile_strategy(document: Dict[str, Any]) -> CompiledStrategy:
+    """Compile a Strategy document (as stored in Mongo); raises StrategyConfigError"""
+    config = document.get("config") or {}
+    entry, entry_needs = compile_conditions(config.get("entry_conditions") or {})
+    exit_, exit_needs = compile_conditions(config.get("exit_conditions") or {})
+
+    risk = config.get("risk_management") or {}
+    sizing = config.get("position_sizing") or {}
+    size = fraction = None
+    if sizing.get("size_type") == "percentage" or "percentage" in sizing:
+        fraction = _number(sizing.get("amount", sizing.get("percentage")), "position_sizing.amount")
+        if not 0 < fraction <= 1:
+            raise StrategyConfigError(f"Percentage sizing needs a fraction in (0, 1], got {fraction}")
+    else:
+        size = _number(sizing.get("amount", 0), "position_sizing.amount")
+        if size <= 0:
+            raise StrategyConfigError("Fixed sizing needs a positive amount")
+
+    side = str(sizing.get("side", "long")).lower()
+    if side not in ("long", "short", "buy", "sell"):
+        raise StrategyConfigError(f"Unknown side {side!r}")
+
+    def optional(key: str) -> Optional[float]:
+        value = risk.get(key)
+        return _number(value, f"risk_management.{key}") if value not in (None, "", 0) else None
+
+    return CompiledStrategy(
+        id=document["id"],
+        name=document.get("name", document["id"]),
+        coin=document["coin"].upper(),
+        entry=entry,
+        exit=exit_,
+        indicators=list(dict.fromkeys(entry_needs + exit_needs)),
+        is_long=side in ("long", "buy"),
+        size=size,
+        fraction=fraction,
+        max_position_size=optional("max_position_size"),
+        stop_loss=optional("stop_loss"),
+        take_profit=optional("take_profit"),
+        max_loss=optional("max_loss"),
+    )
+
+class OrderIntent(NamedTuple):
+    strategy_id: str
+    coin: str
+    is_buy: bool
+    reduce_only: bool
+    reason: str  # entry, exit, stop_loss or take_profit
+    price: float  # Mid price the decision was made at
+    size: Optional[float]  # Coins; None means size by fraction of account value
+    fraction: Optional[float]
+    max_size: Optional[float]
+
+@dataclass
+class PositionState:
+    size: float = 0.0  # Coins held, 0 when flat
+    entry_price: float = 0.0
+    pending: bool = False  # An order is in flight; no new signals until it resolves
+    realized_pnl: float = 0.0
+    trades: int = 0
+    halted: bool = False
+
+    def performance(self) -> Dict[str, float]:
+        """As stored in the Strategy document, so a restarted runtime resumes the position"""
+        return {
+            "position_size": self.size, "entry_price": self.entry_price,
+            "realized_pnl": self.realized_pnl, "trades": float(self.trades)
+        }
+
+    @classmethod
+    def from_performance(cls, performance: Dict[str, float]) -> "PositionState":
+        entry_price = float(performance.get("entry_price", 0.0))
+        return cls(
+            size=float(performance.get("position_size", 0.0)) if entry_price > 0 else 0.0,
+            entry_price=entry_price,
+            realized_pnl=float(performance.get("realized_pnl", 0.0)),
+            trades=int(performance.get("trades", 0)),
+        )
+
+    def apply_fill(self, is_long: bool, reduce_only: bool, filled_size: float, fill_price: float,
+                   max_loss: Optional[float] = None):
+        """Book a fill: an entry opens the position, a reduce-only fill realizes PnL"""
+        self.pending = False
+        if not reduce_only:
+            self.size, self.entry_price = filled_size, fill_price
+            return
+
+        direction = 1 if is_long else -1
+        self.realized_pnl += (fill_price - self.entry_price) * filled_size * direction
+        self.size = max(0.0, self.size - filled_size)
+        if self.size == 0:
+            self.entry_price = 0.0
+            self.trades += 1
+        if max_loss is not None and self.realized_pnl <= -max_loss:
+            self.halted = True
+
+@dataclass
+class StrategySlot:
+    strategy: CompiledStrategy
+    state: PositionState = field(default_factory=PositionState)
+
+class CoinEvaluator:
+    """Indicators and strategies for one coin"""
+
+    def __init__(self, coin: str, candle_seconds: float = 60.0):
+        self.coin = coin
+        self.candle_seconds = candle_seconds
+        self.indicators: Indicators = {}
+        self.slots: Dict[str, StrategySlot] = {}
+        self.price: Optional[float] = None
+        self._bucket: Optional[int] = None
+
+    def add(self, strategy: CompiledStrategy, state: Optional[PositionState] = None) -> List[Tuple[str, int]]:
+        """Add or replace a strategy, keeping its position; returns indicators that are new and need seeding"""
+        new = [key for key in strategy.indicators if key not in self.indicators]
+        for kind, period in new:
+            self.indicators[(kind, period)] = INDICATORS[kind](period)
+        previous = self.slots.get(strategy.id)
+        self.slots[strategy.id] = StrategySlot(strategy, state or (previous.state if previous else PositionState()))
+        return new
+
+    def remove(self, strategy_id: str) -> Optional[StrategySlot]:
+        slot = self.slots.pop(strategy_id, None)
+        needed = {key for s in self.slots.values() for key in s.strategy.indicators}
+        for key in [key for key in self.indicators if key not in needed]:
+            del self.indicators[key]
+        return slot
+
+    def seed(self, closes: Iterable[float], indicators: Optional[Iterable[Tuple[str, int]]] = None):
+        """Feed historical candle closes (oldest first) to the given indicators, or all of them"""
+        targets = [self.indicators[key] for key in (indicators or self.indicators) if key in self.indicators]
+        for close in closes:
+            for indicator in targets:
+                indicator.update(close)
+
+    def on_tick(self, price: float, timestamp: Optional[float] = None) -> List[OrderIntent]:
+        """Update with a new mid price; closes the candle when a new period starts, then evaluates.
+
+        Nothing is re-evaluated while neither the price nor the period changes.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        bucket = int(timestamp // self.candle_seconds)
+        if bucket == self._bucket and price == self.price:
+            return []
+        if self._bucket is not None and bucket > self._bucket and self.price is not None:
+            # The last price of the previous period is its close, and of any period without ticks
+            longest = max((indicator.period for indicator in self.indicators.values()), default=0)
+            for _ in range(min(bucket - self._bucket, longest + 1)):
+                for indicator in self.indicators.values():
+                    indicator.update(self.price)
+        self._bucket = bucket
+        self.price = price
+        return self.evaluate(price)
+
+    def evaluate(self, price: float) -> List[OrderIntent]:
+        intents = []
+        for slot in self.slots.values():
+            intent = self._evaluate_slot(slot, price)
+            if intent is not None:
+                slot.state.pending = True
+                intents.append(intent)
+        return intents
+
+    def _evaluate_slot(self, slot: StrategySlot, price: float) -> Optional[OrderIntent]:
+        strategy, state = slot.strategy, slot.state
+        if state.pending or state.halted:
+            return None
+
+        if state.size == 0:
+            if strategy.entry and all(condition(price, self.indicators) for condition in strategy.entry):
+                return OrderIntent(
+                    strategy.id, self.coin, strategy.is_long, False, "entry", price,
+                    strategy.size, strategy.fraction, strategy.max_position_size
+                )
+            return None
+
+        # Fraction of the entry price gained (positive) or lost, for the held side
+        move = (price - state.entry_price) / state.entry_price * (1 if strategy.is_long else -1)
+        if strategy.stop_loss is not None and move <= -strategy.stop_loss:
+            reason = "stop_loss"
+        elif strategy.take_profit is not None and move >= strategy.take_profit:
+            reason = "take_profit"
+        elif strategy.exit and all(condition(price, self.indicators) for condition in strategy.exit):
+            reason = "exit"
+        else:
+            return None
+        return OrderIntent(
+            strategy.id, self.coin, not strategy.is_long, True, reason, price, state.size, None, None
+        )
+
+    def confirm(self, strategy_id: str, reduce_only: bool, filled_size: float, fill_price: float) -> Optional[PositionState]:
+        """Record a filled intent; returns the strategy's state, or None if it was removed meanwhile"""
+        slot = self.slots.get(strategy_id)
+        if slot is None:
+            return None
+        slot.state.apply_fill(slot.strategy.is_long, reduce_only, filled_size, fill_price, slot.strategy.max_loss)
+        return slot.state
+
+    def reject(self, strategy_id: str):
+        """An intent was not filled (rejected, unfilled IOC or skipped); it may fire again"""
+        slot = self.slots.get(strategy_id)
+        if slot is not None:
+            slot.state.pending = False
+
+class StrategyBook:
+    """Every coin's evaluator, driven by plain (picklable) arguments.
+
+    The strategy runtime calls one in-process, or one per worker process
+    holding a shard of the coins (see strategy_pool); strategies arrive as
+    documents and are compiled where they are evaluated.
+    """
+
+    def __init__(self, candle_seconds: float = 60.0):
+        self.candle_seconds = candle_seconds
+        self.evaluators: Dict[str, CoinEvaluator] = {}
+        self._coins: Dict[str, str] = {}  # Strategy id -> coin
+
+    def add(self, document: Dict[str, Any], performance: Optional[Dict[str, float]] = None) -> List[Tuple[str, int]]:
+        """Add or replace a strategy; restores its position from ``performance`` when given.
+
+        Returns the indicators that are new and need seeding.
+        """
+        strategy = compile_strategy(document)
+        evaluator = self.evaluators.get(strategy.coin)
+        if evaluator is None:
+            evaluator = self.evaluators[strategy.coin] = CoinEvaluator(strategy.coin, self.candle_seconds)
+        state = PositionState.from_performance(performance) if performance is not None else None
+        self._coins[strategy.id] = strategy.coin
+        return evaluator.add(strategy, state)
+
+    def remove(self, strategy_id: str) -> Optional[PositionState]:
+        coin = self._coins.pop(strategy_id, None)
+        evaluator = self.evaluators.get(coin)
+        if evaluator is None:
+            return None
+        slot = evaluator.remove(strategy_id)
+        if not evaluator.slots:
+            del self.evaluators[coin]
+        return slot.state if slot else None
+
+    def seed(self, coin: str, closes: List[float], indicators: List[Tuple[str, int]]):
+        evaluator = self.evaluators.get(coin)
+        if evaluator is not None:
+            evaluator.seed(closes, indicators)
+
+    def on_ticks(self, prices: Dict[str, float], timestamp: float) -> List[OrderIntent]:
+        intents = []
+        for coin, price in prices.items():
+            evaluator = self.evaluators.get(coin)
+            if evaluator is not None and price:
+                intents.extend(evaluator.on_tick(price, timestamp))
+        return intents
+
+    def confirm(self, coin: str, strategy_id: str, reduce_only: bool,
+                filled_size: float, fill_price: float) -> Optional[PositionState]:
+        evaluator = self.evaluators.get(coin)
+        return evaluator.confirm(strategy_id, reduce_only, filled_size, fill_price) if evaluator else None
+
+    def reject(self, coin: str, strategy_id: str):
+        evaluator = self.evaluators.get(coin)
+        if evaluator is not None:
+            evaluator.reject(strategy_id)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            coin: {
+                "price": evaluator.price,
+                "strategies": {
+                    strategy_id: {
+                        "position_size": slot.state.size,
+                        "entry_price": slot.state.entry_price,
+                        "pending": slot.state.pending,
+                        "realized_pnl": slot.state.realized_pnl,
+                        "trades": slot.state.trades,
+                    }
+                    for strategy_id, slot in evaluator.slots.items()
+                }
+            }
+            for coin, evaluator in self.evaluators.items()
+        }
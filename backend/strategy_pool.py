@@ -0,0 +1,176 @@
+"""
+Strategy evaluation sharded across worker processes.
+
+Condition and indicator evaluation is pure Python and holds the GIL, so in
+the uvicorn process it competes with request handling. ``StrategyPool``
+keeps the strategies of each coin in one of ``processes`` worker processes
+(chosen by a stable hash of the coin, so a coin's indicators live in
+exactly one place), each running a ``StrategyBook``. Every tick the runtime
+pushes each worker the prices of its coins over a pipe and gets back the
+order intents they raised; sizing, risk checks and order submission stay in
+the main process, and fills are reported back to the owning worker.
+
+With ``processes=0`` the book runs in-process behind the same interface.
+
+Each worker serves one request at a time. When one dies, or does not answer
+within ``timeout`` seconds, it is restarted empty and ``on_worker_lost`` is
+called, so the runtime can re-add the strategies of its coins from Mongo.
+"""
+
+import asyncio
+import multiprocessing
+import signal
+import threading
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from strategy_engine import OrderIntent, PositionState, StrategyBook
+
+class WorkerLost(RuntimeError):
+    """A worker process died, taking the state of its coins with it"""
+
+    def __init__(self, shard: int):
+        super().__init__(f"Strategy worker {shard} exited")
+        self.shard = shard
+
+def _worker_main(connection, candle_seconds: float):
+    # Shutdown is the parent's job: a Ctrl+C must not kill workers mid-message
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    book = StrategyBook(candle_seconds)
+    while True:
+        try:
+            method, args = connection.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            result = getattr(book, method)(*args)
+        except Exception as e:
+            # Raised again in the parent, e.g. a StrategyConfigError from add
+            result = e
+        connection.send(result)
+
+class _Worker:
+    def __init__(self, context, shard: int, candle_seconds: float, timeout: float):
+        self.timeout = timeout
+        self.connection, child = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child, candle_seconds), name=f"strategy-worker-{shard}", daemon=True
+        )
+        self.process.start()
+        child.close()
+        # Requests come from threads; one at a time keeps replies matched to requests
+        self._lock = threading.Lock()
+
+    def request(self, method: str, args: Tuple[Any, ...]) -> Any:
+        """Blocking round trip; TimeoutError (an OSError) if the worker does not answer"""
+        with self._lock:
+            self.connection.send((method, args))
+            # A late reply would be taken for the next request's, so a slow worker is treated as lost
+            if not self.connection.poll(self.timeout):
+                raise TimeoutError(f"no reply to {method} within {self.timeout:g}s")
+            return self.connection.recv()
+
+    def close(self, timeout: float = 2.0):
+        # Closing our end makes the worker's recv fail, so it exits
+        self.connection.close()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+
+class StrategyPool:
+    def __init__(self, processes: int = 0, candle_seconds: float = 60.0, timeout: float = 10.0):
+        self.processes = max(0, processes)
+        self.candle_seconds = candle_seconds
+        self.timeout = timeout
+        self.on_worker_lost: Optional[Callable[[int], None]] = None
+        self.local = StrategyBook(candle_seconds) if self.processes == 0 else None
+        # Spawned, not forked: the server process has threads and open sockets
+        self._context = multiprocessing.get_context("spawn")
+        self._workers: List[Optional[_Worker]] = [None] * self.processes
+
+    def shard(self, coin: str) -> int:
+        return zlib.crc32(coin.encode()) % self.processes if self.processes else 0
+
+    def start(self):
+        for shard in range(self.processes):
+            if self._workers[shard] is None:
+                self._workers[shard] = _Worker(self._context, shard, self.candle_seconds, self.timeout)
+        if self.processes:
+            print(f"Strategy pool: {self.processes} worker processes")
+
+    async def stop(self):
+        workers = [worker for worker in self._workers if worker is not None]
+        self._workers = [None] * self.processes
+        await asyncio.gather(*(asyncio.to_thread(worker.close) for worker in workers))
+
+    async def _call(self, shard: int, method: str, *args) -> Any:
+        if self.local is not None:
+            return getattr(self.local, method)(*args)
+
+        worker = self._workers[shard]
+        if worker is None:
+            raise WorkerLost(shard)
+        try:
+            result = await asyncio.to_thread(worker.request, method, args)
+        except (EOFError, OSError) as e:
+            print(f"Strategy pool: worker {shard} lost ({e!r}); restarting it")
+            if self._workers[shard] is worker:
+                worker.close(timeout=0)
+                self._workers[shard] = _Worker(self._context, shard, self.candle_seconds, self.timeout)
+                if self.on_worker_lost:
+                    self.on_worker_lost(shard)
+            raise WorkerLost(shard) from e
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def add(self, document: Dict[str, Any],
+                  performance: Optional[Dict[str, float]] = None) -> List[Tuple[str, int]]:
+        return await self._call(self.shard(document["coin"].upper()), "add", document, performance)
+
+    async def remove(self, coin: str, strategy_id: str) -> Optional[PositionState]:
+        return await self._call(self.shard(coin), "remove", strategy_id)
+
+    async def seed(self, coin: str, closes: List[float], indicators: List[Tuple[str, int]]):
+        await self._call(self.shard(coin), "seed", coin, closes, indicators)
+
+    async def evaluate(self, prices: Dict[str, float], timestamp: float) -> List[OrderIntent]:
+        """Intents from every shard; a lost worker contributes none"""
+        if self.local is not None:
+            return self.local.on_ticks(prices, timestamp)
+
+        shards: Dict[int, Dict[str, float]] = {}
+        for coin, price in prices.items():
+            shards.setdefault(self.shard(coin), {})[coin] = price
+        results = await asyncio.gather(
+            *(self._call(shard, "on_ticks", subset, timestamp) for shard, subset in shards.items()),
+            return_exceptions=True
+        )
+        intents: List[OrderIntent] = []
+        for result in results:
+            if isinstance(result, WorkerLost):
+                continue
+            if isinstance(result, BaseException):
+                raise result
+            intents.extend(result)
+        return intents
+
+    async def confirm(self, coin: str, strategy_id: str, reduce_only: bool,
+                      filled_size: float, fill_price: float) -> Optional[PositionState]:
+        return await self._call(
+            self.shard(coin), "confirm", coin, strategy_id, reduce_only, filled_size, fill_price
+        )
+
+    async def reject(self, coin: str, strategy_id: str):
+        await self._call(self.shard(coin), "reject", coin, strategy_id)
+
+    async def status(self) -> Dict[str, Any]:
+        if self.local is not None:
+            return self.local.status()
+        coins: Dict[str, Any] = {}
+        for result in await asyncio.gather(
+            *(self._call(shard, "status") for shard in range(self.processes)), return_exceptions=True
+        ):
+            if isinstance(result, dict):
+                coins.update(result)
+        return coins
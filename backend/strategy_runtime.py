@@ -0,0 +1,357 @@
+"""
+Executes the ACTIVE strategies stored in Mongo.
+
+One task polls every mid price in a single ``allMids`` request per tick
+(served from shared memory in multi-worker mode) and hands the prices that
+changed to the ``StrategyPool``, where each coin's ``CoinEvaluator`` (see
+strategy_engine) runs in-process or in the worker process owning the coin.
+Hundreds of strategies cost one upstream request and one evaluation pass
+per tick rather than a polling loop each. Indicators are seeded from candle
+history when a strategy is loaded and then updated incrementally on candle
+close.
+
+Order intents come back to this process, which sizes them, applies the
+``max_order_notional`` cap and submits them concurrently as marketable
+IOC orders through ``HyperliquidService.place_order``. A fill is written to
+the strategy's ``performance`` in Mongo before the owning worker books it,
+so a restarted runtime (or a worker lost mid-fill) resumes with the
+position. Nothing is submitted while the
+service has no credentials, and the runtime does not start without a cap.
+
+With several uvicorn workers every one of them would run the strategies and
+place every order once per worker, so only the worker holding an exclusive
+``flock`` on ``lock_path`` runs; the others retry the lock every reload
+interval and take over if the leader exits.
+"""
+
+import asyncio
+import fcntl
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from circuit_breaker import UpstreamUnavailable
+from hyperliquid_service import CANDLE_INTERVAL_MS
+from metrics import metrics
+from models import OrderType, StrategyStatus
+from strategy_engine import OrderIntent, PositionState, StrategyConfigError, compile_strategy
+from strategy_pool import StrategyPool, WorkerLost
+
+strategy_signals = metrics.counter(
+    "hypertrader_strategy_signals_total", "Order intents raised by strategies", ("reason",))
+strategy_orders = metrics.counter(
+    "hypertrader_strategy_orders_total", "Strategy orders by outcome", ("reason", "result"))
+strategy_tick_seconds = metrics.histogram(
+    "hypertrader_strategy_tick_seconds", "Time to evaluate every strategy for one tick, including worker round trips",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5))
+active_strategies = metrics.gauge(
+    "hypertrader_active_strategies", "Strategies being evaluated, per coin", ("coin",))
+
+class StrategyRuntime:
+    def __init__(self, collection, service, tick_interval: float = 1.0, candle_interval: str = "1m",
+                 reload_interval: float = 30.0, lock_path: Optional[str] = None,
+                 processes: int = 0, max_order_notional: float = 0.0, worker_timeout: float = 10.0):
+        self.collection = collection
+        self.service = service
+        self.tick_interval = tick_interval
+        self.candle_interval = candle_interval if candle_interval in CANDLE_INTERVAL_MS else "1m"
+        self.candle_seconds = CANDLE_INTERVAL_MS[self.candle_interval] / 1000
+        self.reload_interval = reload_interval
+        # Orders worth more than this (USD) are refused whatever the strategy says; required to start
+        self.max_order_notional = max_order_notional
+        self.lock_path = lock_path or os.path.join(tempfile.gettempdir(), "hypertrader-strategy-runtime.lock")
+        # Called after the runtime writes to the strategies collection (e.g. to drop cached responses)
+        self.on_change: Optional[Callable[[], None]] = None
+
+        self.pool = StrategyPool(processes, self.candle_seconds, worker_timeout)
+        self.pool.on_worker_lost = self._forget_shard
+        self.fingerprints: Dict[str, Tuple[str, str]] = {}  # Strategy id -> (coin, config) as loaded
+        self.invalid: Dict[str, str] = {}  # Strategy id -> why it could not be compiled
+        self.leader = False
+        self.last_tick: Optional[float] = None
+        self._sent: Dict[str, Tuple[float, int]] = {}  # Coin -> (price, candle) last evaluated
+
+        self._lock_file = None
+        self._reload = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._submissions: Set[asyncio.Task] = set()
+        active_strategies.set_function(self._counts)
+
+    def _counts(self) -> Dict[Tuple[str, ...], float]:
+        counts: Dict[Tuple[str, ...], float] = {}
+        for coin, _ in self.fingerprints.values():
+            counts[(coin,)] = counts.get((coin,), 0) + 1
+        return counts
+
+    def start(self):
+        if self.max_order_notional <= 0:
+            # Percentage sizing trades a share of the whole account; never without a ceiling
+            print("Strategy runtime: not started, STRATEGY_MAX_ORDER_NOTIONAL must be above 0")
+            return
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="strategy-runtime")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        # In-flight orders finish, so their fills are recorded
+        if self._submissions:
+            await asyncio.gather(*self._submissions, return_exceptions=True)
+        await self.pool.stop()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+            self.leader = False
+
+    def request_reload(self):
+        """Pick up strategy writes now instead of at the next reload interval"""
+        self._reload.set()
+
+    def _acquire_leadership(self) -> bool:
+        lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        self.leader = True
+        print(f"Strategy runtime: running in process {os.getpid()}")
+        return True
+
+    async def _run(self):
+        while not self._acquire_leadership():
+            await asyncio.sleep(self.reload_interval)
+
+        self.pool.start()
+        tick_task = asyncio.create_task(self._tick_loop(), name="strategy-ticks")
+        try:
+            while True:
+                self._reload.clear()
+                try:
+                    await self.reload()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Strategy runtime: reload failed: {e}")
+                try:
+                    await asyncio.wait_for(self._reload.wait(), self.reload_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            tick_task.cancel()
+
+    async def reload(self):
+        """Load ACTIVE strategies, keeping the position and indicators of those already running"""
+        documents: Dict[str, Dict[str, Any]] = {}
+        with metrics.track_mongo("find", "strategies"):
+            async for document in self.collection.find({"status": StrategyStatus.ACTIVE.value}):
+                documents[document["id"]] = document
+
+        for strategy_id in [s for s in self.fingerprints if s not in documents]:
+            await self._remove(strategy_id)
+        self.invalid = {s: error for s, error in self.invalid.items() if s in documents}
+
+        seeds: Dict[str, List[Tuple[str, int]]] = {}
+        for strategy_id, document in documents.items():
+            coin = str(document.get("coin", "")).upper()
+            fingerprint = (coin, repr(document.get("config")))
+            previous = self.fingerprints.get(strategy_id)
+            if previous == fingerprint:
+                continue
+            if previous is not None and previous[0] != coin:
+                state = await self._remove(strategy_id)
+                if state is not None and state.size:
+                    print(f"Strategy runtime: {strategy_id} moved off {previous[0]} with an open position")
+                previous = None
+
+            # A strategy new to this runtime resumes the position recorded in Mongo
+            performance = (document.get("performance") or {}) if previous is None else None
+            try:
+                new = await self.pool.add(document, performance)
+            except (StrategyConfigError, KeyError, AttributeError) as e:
+                if self.invalid.get(strategy_id) != str(e):
+                    print(f"Strategy runtime: skipping strategy {strategy_id}: {e}")
+                self.invalid[strategy_id] = str(e)
+                await self._remove(strategy_id)
+                continue
+            self.invalid.pop(strategy_id, None)
+            self.fingerprints[strategy_id] = fingerprint
+            if new:
+                seeds.setdefault(coin, []).extend(new)
+
+        await asyncio.gather(*(self._seed(coin, indicators) for coin, indicators in seeds.items()))
+
+    async def _remove(self, strategy_id: str) -> Optional[PositionState]:
+        fingerprint = self.fingerprints.pop(strategy_id, None)
+        if fingerprint is None:
+            return None
+        try:
+            return await self.pool.remove(fingerprint[0], strategy_id)
+        except WorkerLost:
+            return None
+
+    def _forget_shard(self, shard: int):
+        """A worker restarted empty: re-add its coins' strategies at once"""
+        for strategy_id, (coin, _) in list(self.fingerprints.items()):
+            if self.pool.shard(coin) == shard:
+                del self.fingerprints[strategy_id]
+                self._sent.pop(coin, None)
+        self.request_reload()
+
+    async def _seed(self, coin: str, indicators: List[Tuple[str, int]]):
+        """Feed closed candles to newly added indicators, so they are usable from the first tick"""
+        limit = max(period for _, period in indicators) + 2
+        try:
+            candles = await self.service.get_candlestick_data(coin, self.candle_interval, limit)
+        except Exception as e:
+            # They fill from live ticks instead; conditions on them stay false until then
+            print(f"Strategy runtime: could not seed {coin} indicators: {e}")
+            return
+        current_open = time.time() // self.candle_seconds * self.candle_seconds
+        closes = [candle.close for candle in candles if candle.timestamp.timestamp() < current_open]
+        try:
+            await self.pool.seed(coin, closes, indicators)
+        except WorkerLost:
+            pass
+
+    async def _tick_loop(self):
+        while True:
+            await asyncio.sleep(self.tick_interval)
+            # Unconfigured, the service would only hand back mock orders
+            if not self.fingerprints or not self.service.is_configured:
+                continue
+            try:
+                snapshot = await self.service.get_all_mids_snapshot()
+            except UpstreamUnavailable:
+                continue
+            except Exception as e:
+                print(f"Strategy runtime: could not fetch prices: {e}")
+                continue
+            # Never trade on the last good prices while the API is failing
+            if snapshot.stale:
+                continue
+            self.last_tick = snapshot.fetched_at
+            try:
+                intents = await self.evaluate(snapshot.value, snapshot.fetched_at)
+            except Exception as e:
+                print(f"Strategy runtime: evaluation failed: {e!r}")
+                continue
+            for intent in intents:
+                self._spawn(intent)
+
+    async def evaluate(self, prices: Dict[str, float], timestamp: float) -> List[OrderIntent]:
+        """Evaluate the coins whose price or candle changed since they were last evaluated"""
+        start = time.perf_counter()
+        candle = int(timestamp // self.candle_seconds)
+        changed: Dict[str, float] = {}
+        for coin in {coin for coin, _ in self.fingerprints.values()}:
+            price = prices.get(coin)
+            if price and self._sent.get(coin) != (price, candle):
+                changed[coin] = price
+                self._sent[coin] = (price, candle)
+        intents = await self.pool.evaluate(changed, timestamp) if changed else []
+        strategy_tick_seconds.observe(value=time.perf_counter() - start)
+        return intents
+
+    def _spawn(self, intent: OrderIntent):
+        strategy_signals.inc(intent.reason)
+        task = asyncio.create_task(self._submit(intent), name=f"strategy-order-{intent.strategy_id}")
+        self._submissions.add(task)
+        task.add_done_callback(self._submissions.discard)
+
+    async def _submit(self, intent: OrderIntent):
+        try:
+            size = intent.size
+            if size is None:
+                account = await self.service.get_account_info()
+                size = account.account_value * intent.fraction / intent.price
+            if intent.max_size is not None:
+                size = min(size, intent.max_size)
+            # Exits always go through: refusing one would leave the position open
+            if not intent.reduce_only and size * intent.price > self.max_order_notional:
+                raise ValueError(
+                    f"{size * intent.price:.2f} USD exceeds the {self.max_order_notional:.2f} USD order limit"
+                )
+            order = await self.service.place_order(
+                intent.coin, intent.is_buy, size, order_type=OrderType.MARKET, reduce_only=intent.reduce_only
+            )
+        except Exception as e:
+            print(f"Strategy runtime: {intent.reason} order for {intent.strategy_id} failed: {e}")
+            strategy_orders.inc(intent.reason, "failed")
+            await self._reject(intent)
+            return
+
+        if order.filled_size <= 0:
+            # The IOC found nothing within its limit; the signal may fire again
+            strategy_orders.inc(intent.reason, "unfilled")
+            await self._reject(intent)
+            return
+
+        strategy_orders.inc(intent.reason, "filled")
+        print(f"Strategy runtime: {intent.strategy_id} {intent.reason} filled "
+              f"{order.filled_size} {intent.coin} @ {order.average_fill_price}")
+        fill_price = order.average_fill_price or intent.price
+        # Mongo first: the position must survive the worker dying before it books the fill
+        recorded = await self._record_fill(intent, order.filled_size, fill_price)
+        try:
+            state = await self.pool.confirm(
+                intent.coin, intent.strategy_id, intent.reduce_only, order.filled_size, fill_price
+            )
+        except WorkerLost:
+            if not recorded:
+                print(f"Strategy runtime: fill for {intent.strategy_id} not recorded, its worker was lost")
+            return
+        if state is not None and not recorded:
+            await self._record(intent.strategy_id, state)
+
+    async def _record_fill(self, intent: OrderIntent, filled_size: float, fill_price: float) -> bool:
+        """Apply a fill to the position stored in Mongo; False if it could not be written"""
+        try:
+            with metrics.track_mongo("find_one", "strategies"):
+                document = await self.collection.find_one({"id": intent.strategy_id})
+            if document is None:
+                return False
+            strategy = compile_strategy(document)
+        except Exception as e:
+            print(f"Strategy runtime: could not load {intent.strategy_id} to record its fill: {e}")
+            return False
+        state = PositionState.from_performance(document.get("performance") or {})
+        state.apply_fill(strategy.is_long, intent.reduce_only, filled_size, fill_price, strategy.max_loss)
+        return await self._record(intent.strategy_id, state)
+
+    async def _reject(self, intent: OrderIntent):
+        try:
+            await self.pool.reject(intent.coin, intent.strategy_id)
+        except WorkerLost:
+            pass
+
+    async def _record(self, strategy_id: str, state: PositionState) -> bool:
+        update: Dict[str, Any] = {"performance": state.performance()}
+        if state.halted:
+            # max_loss reached: stop the strategy for good rather than trade on
+            update["status"] = StrategyStatus.STOPPED.value
+            print(f"Strategy runtime: {strategy_id} reached its max loss and was stopped")
+            await self._remove(strategy_id)
+        try:
+            with metrics.track_mongo("update_one", "strategies"):
+                await self.collection.update_one({"id": strategy_id}, {"$set": update})
+        except Exception as e:
+            print(f"Strategy runtime: could not record {strategy_id} performance: {e}")
+            return False
+        if self.on_change:
+            self.on_change()
+        return True
+
+    async def status(self) -> Dict[str, Any]:
+        return {
+            "leader": self.leader,
+            "pid": os.getpid(),
+            "processes": self.pool.processes,
+            "configured": bool(self.service.is_configured),
+            "last_tick_age": round(time.time() - self.last_tick, 3) if self.last_tick else None,
+            "coins": await self.pool.status() if self.leader else {},
+            "invalid": self.invalid,
+        }
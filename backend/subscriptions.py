@@ -0,0 +1,248 @@
+"""
+WebSocket subscription tracking for /api/ws.
+
+Subscriptions are tracked per connection and deduplicated. Each topic
+(a feed plus a key, e.g. market/BTC) has a single shared poller task that
+runs only while at least one client is subscribed, so upstream load
+depends on the number of distinct topics rather than on the number of
+sockets. Disconnecting cancels every subscription of that socket, and a
+server-wide cap bounds the total number of subscriptions.
+
+Updates are delta encoded. A client receives ``<kind>_snapshot`` with the
+full state when it subscribes, then ``<kind>_delta`` messages carrying
+``changes`` (changed keys only, nested objects diffed per key, null meaning
+the value is null) and, when keys went away, ``removed`` (their key paths),
+plus a sequence number. Polls that change nothing send nothing. A client that sees
+a gap in ``seq`` sends ``{"type": "resync", ...}`` to get a fresh snapshot.
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi import WebSocket
+
+from connection_manager import ConnectionManager
+from loop_watchdog import loop_watchdog
+from metrics import metrics
+
+Topic = Tuple[str, str]
+
+active_feeds = metrics.gauge(
+    "hypertrader_websocket_active_feeds", "Shared upstream pollers backing WebSocket subscriptions",
+    ("kind",))
+feed_updates = metrics.counter(
+    "hypertrader_websocket_feed_updates_total", "Feed polls by outcome (snapshot, delta, unchanged)",
+    ("kind", "outcome"))
+
+KeyPath = List[str]
+
+def state_diff(old: Dict[str, Any], new: Dict[str, Any],
+               path: Tuple[str, ...] = ()) -> Tuple[Dict[str, Any], List[KeyPath]]:
+    """Return (changes, removed) turning ``old`` into ``new``; both empty if equal"""
+    changes: Dict[str, Any] = {}
+    removed: List[KeyPath] = []
+    for key, value in new.items():
+        if key not in old:
+            changes[key] = value
+        elif isinstance(value, dict) and isinstance(old[key], dict):
+            nested, nested_removed = state_diff(old[key], value, path + (key,))
+            if nested:
+                changes[key] = nested
+            removed.extend(nested_removed)
+        elif old[key] != value:
+            changes[key] = value
+    removed.extend([*path, key] for key in old if key not in new)
+    return changes, removed
+
+def apply_state_diff(state: Dict[str, Any], changes: Dict[str, Any], removed: List[KeyPath]) -> Dict[str, Any]:
+    """Apply a delta's changes and removals to a copy of the state, as a client does"""
+    def merge(target: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, Any]:
+        merged = dict(target)
+        for key, value in patch.items():
+            current = merged.get(key)
+            merged[key] = merge(current, value) if isinstance(value, dict) and isinstance(current, dict) else value
+        return merged
+
+    result = merge(state, changes)
+    for key_path in removed:
+        parent = result
+        for key in key_path[:-1]:
+            parent[key] = dict(parent[key])
+            parent = parent[key]
+        parent.pop(key_path[-1], None)
+    return result
+
+@dataclass
+class Feed:
+    """How to poll one kind of topic and turn the result into a diffable state.
+
+    States are plain dicts; lists that should diff per element must be keyed
+    into dicts.
+    """
+    fetch: Callable[[str], Awaitable[Any]]
+    state: Callable[[str, Any], Dict[str, Any]]
+    interval: float
+
+@dataclass
+class TopicState:
+    seq: int = 0
+    state: Optional[Dict[str, Any]] = None
+    clients: Set[WebSocket] = field(default_factory=set)
+    poller: Optional[asyncio.Task] = None
+
+class SubscriptionLimitExceeded(Exception):
+    """Raised when the server-wide subscription cap is reached"""
+
+class SubscriptionManager:
+    def __init__(self, connection_manager: ConnectionManager, max_subscriptions: int = 500):
+        self.connection_manager = connection_manager
+        self.max_subscriptions = max_subscriptions
+        self.feeds: Dict[str, Feed] = {}
+
+        self.client_topics: Dict[WebSocket, Set[Topic]] = {}
+        self.topics: Dict[Topic, TopicState] = {}
+
+    @property
+    def subscription_count(self) -> int:
+        return sum(len(topics) for topics in self.client_topics.values())
+
+    def register_feed(self, kind: str, fetch: Callable[[str], Awaitable[Any]],
+                      state: Callable[[str, Any], Dict[str, Any]], interval: float):
+        self.feeds[kind] = Feed(fetch=fetch, state=state, interval=interval)
+
+    async def subscribe(self, websocket: WebSocket, kind: str, key: str = "") -> bool:
+        """Subscribe a socket to a topic; returns False if it was already subscribed"""
+        if kind not in self.feeds:
+            raise ValueError(f"Unknown subscription type: {kind}")
+
+        topic = (kind, key)
+        topics = self.client_topics.setdefault(websocket, set())
+        if topic in topics:
+            return False
+        if self.subscription_count >= self.max_subscriptions:
+            raise SubscriptionLimitExceeded(
+                f"Server subscription limit of {self.max_subscriptions} reached"
+            )
+
+        topics.add(topic)
+        topic_state = self.topics.get(topic)
+        if topic_state is None:
+            topic_state = self.topics[topic] = TopicState()
+            topic_state.poller = asyncio.create_task(
+                self._poll(topic, topic_state), name=f"ws-feed-{kind}-{key}"
+            )
+        topic_state.clients.add(websocket)
+
+        if topic_state.state is not None:
+            # Serve the latest state right away instead of waiting for the next change
+            await self.send_snapshot(websocket, kind, key)
+        return True
+
+    def unsubscribe(self, websocket: WebSocket, kind: str, key: str = "") -> bool:
+        topic = (kind, key)
+        topics = self.client_topics.get(websocket)
+        if not topics or topic not in topics:
+            return False
+
+        topics.discard(topic)
+        self._remove_subscriber(topic, websocket)
+        return True
+
+    def disconnect(self, websocket: WebSocket):
+        """Drop every subscription held by a socket"""
+        for topic in self.client_topics.pop(websocket, set()):
+            self._remove_subscriber(topic, websocket)
+
+    async def send_snapshot(self, websocket: WebSocket, kind: str, key: str = "") -> bool:
+        """Send the full current state of a topic to one subscribed socket"""
+        topic = (kind, key)
+        topic_state = self.topics.get(topic)
+        if topic_state is None or websocket not in topic_state.clients or topic_state.state is None:
+            return False
+
+        await self.connection_manager.send_personal_message(
+            self._snapshot_message(topic, topic_state), websocket,
+            coalesce_key=self._coalesce_key(topic)
+        )
+        return True
+
+    def _remove_subscriber(self, topic: Topic, websocket: WebSocket):
+        topic_state = self.topics.get(topic)
+        if topic_state is not None:
+            topic_state.clients.discard(websocket)
+            if not topic_state.clients:
+                del self.topics[topic]
+                if topic_state.poller:
+                    topic_state.poller.cancel()
+
+    @staticmethod
+    def _coalesce_key(topic: Topic) -> str:
+        return f"{topic[0]}:{topic[1]}"
+
+    @staticmethod
+    def _envelope(topic: Topic, message_type: str, seq: int) -> Dict[str, Any]:
+        kind, key = topic
+        message = {"type": f"{kind}_{message_type}", "seq": seq, "ts": datetime.utcnow().isoformat()}
+        if key:
+            message["coin"] = key
+        return message
+
+    def _snapshot_message(self, topic: Topic, topic_state: TopicState) -> Dict[str, Any]:
+        message = self._envelope(topic, "snapshot", topic_state.seq)
+        message["data"] = topic_state.state
+        return message
+
+    async def _poll(self, topic: Topic, topic_state: TopicState):
+        kind, key = topic
+        feed = self.feeds[kind]
+        loop_watchdog.track_task({"path": f"/api/ws/{kind}", "path_params": {"coin": key or None}})
+        try:
+            while topic_state.clients:
+                try:
+                    data = await feed.fetch(key)
+                    await self._publish(topic, topic_state, feed.state(key, data))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Subscription feed {kind}:{key} failed: {e}")
+                await asyncio.sleep(feed.interval)
+        finally:
+            loop_watchdog.untrack_task()
+
+    async def _publish(self, topic: Topic, topic_state: TopicState, new_state: Dict[str, Any]):
+        kind = topic[0]
+        if topic_state.state is None:
+            topic_state.seq += 1
+            topic_state.state = new_state
+            feed_updates.inc(kind, "snapshot")
+            message = self._snapshot_message(topic, topic_state)
+            await self.connection_manager.send_many(
+                list(topic_state.clients), message, coalesce_key=self._coalesce_key(topic)
+            )
+            return
+
+        changes, removed = state_diff(topic_state.state, new_state)
+        if not changes and not removed:
+            feed_updates.inc(kind, "unchanged")
+            return
+
+        topic_state.seq += 1
+        topic_state.state = new_state
+        feed_updates.inc(kind, "delta")
+        message = self._envelope(topic, "delta", topic_state.seq)
+        message["changes"] = changes
+        if removed:
+            message["removed"] = removed
+        # A client still holding an unsent delta gets a snapshot instead of a gap
+        await self.connection_manager.send_many(
+            list(topic_state.clients), message, coalesce_key=self._coalesce_key(topic),
+            coalesced_message=self._snapshot_message(topic, topic_state)
+        )
+
+    def feed_counts(self) -> Dict[Tuple[str, ...], float]:
+        counts: Dict[Tuple[str, ...], float] = {}
+        for kind, _ in self.topics:
+            counts[(kind,)] = counts.get((kind,), 0) + 1
+        return counts
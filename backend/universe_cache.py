@@ -0,0 +1,171 @@
+"""
+Universe metadata cache persisted to disk.
+
+``meta`` and ``spotMeta`` change a few times a week, so they are kept per API
+base URL in memory and in a JSON file that is read at startup. Startup, the
+shared SDK objects and ``/api/coins`` then work from the stored copy without
+a network round trip. A background task refetches the metadata, and only
+when it actually changed does it persist the new copy and notify listeners
+(e.g. to rebuild SDK state after a listing). Only a base URL that was never
+seen before blocks on the first fetch.
+"""
+
+import asyncio
+import hashlib
+import inspect
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Union
+
+import requests
+
+from fast_json import dumps
+from hl_decode import loads
+from metrics import metrics
+from rounding import RoundingTable
+
+class Asset(NamedTuple):
+    name: str
+    index: int  # Asset id used when placing orders
+    sz_decimals: int
+    max_leverage: int
+    delisted: bool
+
+class Universe:
+    """Perp universe of one API base URL plus the raw metadata it came from"""
+
+    def __init__(self, meta: Dict[str, Any], spot_meta: Any, fetched_at: float):
+        self.meta = meta
+        self.spot_meta = spot_meta
+        self.fetched_at = fetched_at
+        self.digest = hashlib.sha256(dumps([meta, spot_meta])).hexdigest()
+        self.assets = [
+            Asset(
+                name=item.get("name", ""),
+                index=index,
+                sz_decimals=int(item.get("szDecimals", 0)),
+                max_leverage=int(item.get("maxLeverage", 1)),
+                delisted=bool(item.get("isDelisted", False))
+            )
+            for index, item in enumerate(meta.get("universe", []))
+        ]
+        self.by_name = {asset.name: asset for asset in self.assets}
+        # Order rounding rules; rebuilt with the universe whenever it changes
+        self.rounding = RoundingTable(self.assets)
+
+    def active(self) -> List[Asset]:
+        return [asset for asset in self.assets if asset.name and not asset.delisted]
+
+Listener = Callable[[str, Universe], Union[None, Awaitable[None]]]
+
+class UniverseCache:
+    def __init__(self, session: requests.Session, path: str, refresh_interval: float = 600.0):
+        self.session = session
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self._universes: Dict[str, Universe] = {}
+        self._listeners: List[Listener] = []
+        self._fetch_lock = threading.RLock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def load(self):
+        """Read the persisted universes; a missing or corrupt file just means a cold cache"""
+        try:
+            with open(self.path, "rb") as f:
+                stored = loads(f.read())
+            for base_url, entry in stored.items():
+                self._universes[base_url] = Universe(entry["meta"], entry["spot_meta"], entry["fetched_at"])
+            print(f"Universe cache: loaded {len(self._universes)} universe(s) from {self.path}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Universe cache: ignoring unreadable {self.path}: {e}")
+
+    def get(self, base_url: str) -> Optional[Universe]:
+        universe = self._universes.get(base_url)
+        metrics.record_cache("universe", universe is not None)
+        return universe
+
+    def get_or_fetch(self, base_url: str) -> Universe:
+        """Cached universe, fetching it only if this base URL was never seen (blocking)"""
+        universe = self.get(base_url)
+        if universe is None:
+            with self._fetch_lock:
+                universe = self._universes.get(base_url) or self.fetch(base_url)[0]
+        return universe
+
+    async def ensure(self, base_url: str) -> Universe:
+        universe = self.get(base_url)
+        if universe is not None:
+            return universe
+        return await asyncio.to_thread(self.get_or_fetch, base_url)
+
+    def fetch(self, base_url: str):
+        """Fetch metadata from the API; returns (universe, changed) and persists changes (blocking)"""
+        meta = self._fetch_info(base_url, "meta")
+        spot_meta = self._fetch_info(base_url, "spotMeta")
+        universe = Universe(meta, spot_meta, time.time())
+
+        with self._fetch_lock:
+            previous = self._universes.get(base_url)
+            if previous is not None and previous.digest == universe.digest:
+                previous.fetched_at = universe.fetched_at
+                return previous, False
+
+            self._universes[base_url] = universe
+            self._persist()
+            return universe, True
+
+    def _fetch_info(self, base_url: str, info_type: str) -> Any:
+        with metrics.track_upstream(info_type):
+            response = self.session.post(f"{base_url}/info", json={"type": info_type}, timeout=10)
+            response.raise_for_status()
+            return loads(response.content)
+
+    def _persist(self):
+        stored = {
+            base_url: {"meta": u.meta, "spot_meta": u.spot_meta, "fetched_at": u.fetched_at}
+            for base_url, u in self._universes.items()
+        }
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # Per process: the market data owner persists the same file as the server workers
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(dumps(stored))
+            # Atomic swap so a crash never leaves a half-written cache
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Universe cache: failed to persist {self.path}: {e}")
+
+    def on_change(self, listener: Listener):
+        """Register a callback run as listener(base_url, universe) after a universe changes"""
+        self._listeners.append(listener)
+
+    def start_refresh(self, base_urls: List[str]):
+        """Refresh the given base URLs (plus any loaded) now and then every refresh_interval"""
+        if self._refresh_task is None and self.refresh_interval > 0:
+            self._refresh_task = asyncio.create_task(self._refresh_loop(base_urls), name="universe-refresh")
+
+    async def stop_refresh(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+    async def _refresh_loop(self, base_urls: List[str]):
+        while True:
+            for base_url in dict.fromkeys([*base_urls, *self._universes]):
+                try:
+                    universe, changed = await asyncio.to_thread(self.fetch, base_url)
+                    if changed:
+                        print(f"Universe changed for {base_url} ({len(universe.assets)} assets)")
+                        for listener in self._listeners:
+                            result = listener(base_url, universe)
+                            if inspect.isawaitable(result):
+                                await result
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Universe refresh failed for {base_url}: {e}")
+            await asyncio.sleep(self.refresh_interval)
@@ -4,25 +4,47 @@ set -e
 # Start the FastAPI backend
 cd /backend || { echo "Backend directory not found"; exit 1; }
 
+WORKERS="${HYPERTRADER_WORKERS:-1}"
+OWNER_PID=""
+
+if [ "$WORKERS" -gt 1 ]; then
+    # One process polls market data into shared memory; the workers read it
+    echo "Starting market data owner for $WORKERS workers"
+    export MARKET_DATA_SHARED=true
+    python3 market_data_owner.py &
+    OWNER_PID=$!
+fi
+
 echo "Starting FastAPI backend"
 # Start Uvicorn with proper host binding
-uvicorn server:app --host 0.0.0.0 --port 8001 &
+uvicorn server:app --host 0.0.0.0 --port 8001 --workers "$WORKERS" &
 BACKEND_PID=$!
 
-echo "Waiting for backend to start..."
-sleep 30
-
-if ! kill -0 $BACKEND_PID 2>/dev/null; then
-    echo "Backend failed to start at initialization, exiting"
-    exit 1
-fi
+# Poll readiness instead of sleeping a fixed time; the backend answers as soon as
+# it has loaded settings and built its SDK state (see /api/ready)
+READY_TIMEOUT="${BACKEND_READY_TIMEOUT:-120}"
+echo "Waiting for backend to become ready (up to ${READY_TIMEOUT}s)..."
+START_TIME=$(date +%s)
+until wget -q -O /dev/null http://127.0.0.1:8001/api/ready 2>/dev/null; do
+    if ! kill -0 $BACKEND_PID 2>/dev/null; then
+        echo "Backend failed to start at initialization, exiting"
+        exit 1
+    fi
+    if [ $(( $(date +%s) - START_TIME )) -ge "$READY_TIMEOUT" ]; then
+        # Serve anyway; /api/ready shows which dependency is still missing
+        echo "Backend not ready after ${READY_TIMEOUT}s, starting nginx anyway"
+        break
+    fi
+    sleep 0.5
+done
+echo "Backend wait finished after $(( $(date +%s) - START_TIME ))s"
 
 # Start Nginx
 nginx -g 'daemon off;' &
 NGINX_PID=$!
 
 # Handle termination signals
-trap 'kill $BACKEND_PID $NGINX_PID; exit 0' SIGTERM SIGINT
+trap 'kill $BACKEND_PID $NGINX_PID $OWNER_PID; exit 0' SIGTERM SIGINT
 
 # Check if processes are still running
 while kill -0 $BACKEND_PID 2>/dev/null && kill -0 $NGINX_PID 2>/dev/null; do
@@ -32,10 +54,10 @@ done
 # If we get here, one of the processes died
 if kill -0 $BACKEND_PID 2>/dev/null; then
     echo "Nginx died, shutting down backend..."
-    kill $BACKEND_PID
+    kill $BACKEND_PID $OWNER_PID
 else
     echo "Backend died, shutting down nginx..."
-    kill $NGINX_PID
+    kill $NGINX_PID $OWNER_PID
 fi
 
 exit 1
@@ -7,16 +7,26 @@ import json
 import logging
 import requests
 import time
-from typing import Dict, List, Optional, Any
+from typing import TYPE_CHECKING, Dict, List, Optional, Any
 from datetime import datetime, timedelta
 import threading
 import websockets
 
 from config.api_config import HyperliquidConfig
+from core.universe_cache import UniverseCache
 from models.account import Account, Portfolio
 from models.position import Position
-from models.order import Order, OrderType, OrderSide
+from models.order import Order, OrderType, OrderSide, OrderStatus, TimeInForce
 from utils.helpers import format_currency, handle_api_error
+from utils.flow_control import retry, throttle
+import utils.shared  # noqa: F401 - puts backend/ on the path for the shared modules below
+from book_cache import BookCache, marketable_price
+from connection_warmer import ConnectionWarmer
+from hl_decode import decode_all_mids, decode_clearinghouse_state, decode_l2_book
+
+if TYPE_CHECKING:
+    # Imports the SDK; loaded with it in _init_hyperliquid_sdk so the client starts without one
+    from order_pipeline import OrderPipeline
 
 class HyperliquidClient:
     """Hyperliquid API client for trading operations"""
@@ -26,9 +36,31 @@ class HyperliquidClient:
         self.logger = logging.getLogger(__name__)
         self.session = requests.Session()
         self.session.timeout = config.timeout
+        # Pre-connects to the API and keeps pooled connections alive, so an order
+        # placed after an idle period does not pay DNS/TCP/TLS setup
+        self.warmer = ConnectionWarmer(self.session, lambda: [config.base_url], timeout=config.timeout)
+        
+        # Reads retry with jittered backoff within the request timeout. Account, portfolio and
+        # connection checks all read user state, so a burst of them shares one upstream call
+        self._retry = retry(attempts=config.retry_attempts, base_delay=0.5, max_delay=4.0, deadline=config.timeout)
+        self._user_state = throttle(1.0)(self._retry(self._fetch_user_state))
+        
+        # Coin universe from disk, so startup does not wait on meta/spotMeta
+        self.universe = UniverseCache(config.base_url, self.session)
+        self.universe.load()
+        
+        # Books for pricing market orders, kept current by the l2Book stream
+        self.books = BookCache(self._stream_info)
+        self._ws_info = None
+        self.market_max_slippage = 0.01
+        self.market_price_buffer = 0.002
+        self.market_book_max_age = 10  # seconds
         
         # Initialize Hyperliquid SDK components
+        self.pipeline: Optional["OrderPipeline"] = None
         self._init_hyperliquid_sdk()
+        self.universe.start()
+        threading.Thread(target=self._warm_connections, name="connection-warm", daemon=True).start()
         
         # WebSocket connection
         self.ws_connection = None
@@ -43,11 +75,27 @@ class HyperliquidClient:
         """Initialize Hyperliquid Python SDK"""
         try:
             if self.config.is_configured():
+                from eth_account import Account as EthAccount
                 from hyperliquid.info import Info
                 from hyperliquid.exchange import Exchange
+                from order_pipeline import OrderPipeline
                 
-                self.info = Info(self.config.base_url, skip_ws=True)
-                self.exchange = Exchange(None, self.config.base_url, wallet=self.config.api_secret)
+                # The SDK only fetches meta/spotMeta itself when the cache is cold
+                self.info = Info(
+                    self.config.base_url, skip_ws=True,
+                    meta=self.universe.meta, spot_meta=self.universe.spot_meta
+                )
+                # Signs with the API key's private key on behalf of the configured wallet
+                self.exchange = Exchange(
+                    EthAccount.from_key(self.config.api_secret), self.config.base_url,
+                    meta=self.universe.meta, spot_meta=self.universe.spot_meta,
+                    account_address=self.config.wallet_address, timeout=self.config.timeout
+                )
+                # Share one connection pool, the one the warmer keeps open
+                self.info.session = self.session
+                self.exchange.session = self.session
+                # Orders are signed and posted concurrently with locally allocated nonces
+                self.pipeline = OrderPipeline(self.exchange)
                 
                 self.logger.info(f"Hyperliquid SDK initialized for {self.config.environment}")
                 self.logger.info(f"Target wallet: {self.config.wallet_address}")
@@ -62,6 +110,22 @@ class HyperliquidClient:
             self.info = None
             self.exchange = None
             
+    def _warm_connections(self):
+        try:
+            self.warmer.warm_all()
+        except ConnectionError as e:
+            self.logger.warning(f"Connection pre-warm failed: {e}")
+        self.warmer.start()
+        
+    def connection_stats(self) -> Dict[str, float]:
+        """Requests sent, connections opened and the connection reuse rate for the API host"""
+        stats = list(self.warmer.stats().values())
+        sent, opened = sum(sent for sent, _ in stats), sum(opened for _, opened in stats)
+        return {"requests": sent, "connections": opened, "reuse_rate": 1 - opened / sent if sent else 0.0}
+        
+    def _fetch_user_state(self) -> Dict[str, Any]:
+        return self.info.user_state(self.config.wallet_address)
+        
     def test_connection(self) -> bool:
         """Test connection to Hyperliquid API"""
         try:
@@ -69,13 +133,13 @@ class HyperliquidClient:
                 return False
                 
             # Test public API first
-            response = requests.get(f"{self.config.base_url}/info", timeout=10)
+            response = self.session.get(f"{self.config.base_url}/info", timeout=10)
             if response.status_code != 200:
                 return False
                 
             # Test user state endpoint
             if self.info:
-                user_state = self.info.user_state(self.config.wallet_address)
+                user_state = self._user_state()
                 return isinstance(user_state, dict)
                 
             return False
@@ -95,20 +159,20 @@ class HyperliquidClient:
             if self._is_cached(cache_key):
                 return self.last_update[cache_key]["data"]
                 
-            user_state = self.info.user_state(self.config.wallet_address)
+            user_state = self._user_state()
             
             if not user_state:
                 return None
                 
-            margin_summary = user_state.get("marginSummary", {})
+            state = decode_clearinghouse_state(user_state)
             
             account = Account(
                 address=self.config.wallet_address,
-                account_value=float(margin_summary.get("accountValue", 0)),
-                available_balance=float(user_state.get("withdrawable", 0)),
-                margin_used=float(margin_summary.get("totalMarginUsed", 0)),
-                total_pnl=float(margin_summary.get("totalRawUsd", 0)),
-                margin_summary=margin_summary,
+                account_value=state.account_value,
+                available_balance=state.withdrawable,
+                margin_used=state.total_margin_used,
+                total_pnl=state.total_raw_usd,
+                margin_summary=user_state.get("marginSummary", {}),
                 cross_margin_summary=user_state.get("crossMarginSummary", {})
             )
             
@@ -133,38 +197,40 @@ class HyperliquidClient:
             if self._is_cached(cache_key):
                 return self.last_update[cache_key]["data"]
                 
-            user_state = self.info.user_state(self.config.wallet_address)
+            user_state = self._user_state()
             
             if not user_state:
                 return None
                 
-            margin_summary = user_state.get("marginSummary", {})
+            state = decode_clearinghouse_state(user_state)
             
             # Create portfolio
             portfolio = Portfolio(
-                account_value=float(margin_summary.get("accountValue", 0)),
-                available_balance=float(user_state.get("withdrawable", 0)),
-                margin_used=float(margin_summary.get("totalMarginUsed", 0)),
-                total_pnl=float(margin_summary.get("totalRawUsd", 0)),
+                account_value=state.account_value,
+                available_balance=state.withdrawable,
+                margin_used=state.total_margin_used,
+                total_pnl=state.total_raw_usd,
                 daily_pnl=0.0  # Calculate this separately if needed
             )
             
-            # Add positions
-            positions = []
-            for pos_data in user_state.get("assetPositions", []):
-                position_info = pos_data.get("position", {})
-                
-                if float(position_info.get("szi", 0)) != 0:
-                    position = Position(
-                        coin=position_info.get("coin", ""),
-                        size=abs(float(position_info.get("szi", 0))),
-                        entry_price=float(position_info.get("entryPx", 0)),
-                        current_price=0.0,  # Will be updated with market data
-                        unrealized_pnl=float(position_info.get("unrealizedPnl", 0)),
-                        realized_pnl=0.0,  # Not available in this endpoint
-                        side=OrderSide.LONG if float(position_info.get("szi", 0)) > 0 else OrderSide.SHORT
-                    )
-                    positions.append(position)
+            # Add open positions
+            rows = state.positions
+            open_rows = rows.szi.nonzero()[0]
+            positions = [
+                Position(
+                    coin=rows.coins[row],
+                    size=abs(szi),
+                    entry_price=entry_price,
+                    current_price=0.0,  # Will be updated with market data
+                    unrealized_pnl=unrealized_pnl,
+                    realized_pnl=0.0,  # Not available in this endpoint
+                    side=OrderSide.LONG if szi > 0 else OrderSide.SHORT
+                )
+                for row, szi, entry_price, unrealized_pnl in zip(
+                    open_rows.tolist(), rows.szi[open_rows].tolist(),
+                    rows.entry_px[open_rows].tolist(), rows.unrealized_pnl[open_rows].tolist()
+                )
+            ]
                     
             portfolio.positions = positions
             
@@ -190,12 +256,11 @@ class HyperliquidClient:
                 return self.last_update[cache_key]["data"]
                 
             # Get all mids (current prices)
-            all_mids = self.info.all_mids()
+            all_mids = decode_all_mids(self._retry(self.info.all_mids)())
             
-            if coin not in all_mids:
+            current_price = all_mids.price(coin)
+            if current_price is None:
                 return None
-                
-            current_price = float(all_mids[coin])
             
             # Get 24h data (simplified)
             market_data = {
@@ -223,29 +288,24 @@ class HyperliquidClient:
             if not self.info:
                 return None
                 
-            l2_book = self.info.l2_snapshot(coin)
+            l2_book = self._retry(self.info.l2_snapshot)(coin)
             
             if not l2_book:
                 return None
+            self.books.update(l2_book)
                 
-            levels = l2_book.get("levels", [])
-            
-            bids = []
-            asks = []
-            
-            for level in levels:
-                price = float(level["px"])
-                size = float(level["sz"])
-                n = level.get("n", 0)
-                
-                if n > 0:  # Bid
-                    bids.append({"price": price, "size": size})
-                elif n < 0:  # Ask
-                    asks.append({"price": price, "size": size})
-                    
-            # Sort and limit
-            bids = sorted(bids, key=lambda x: x["price"], reverse=True)[:depth]
-            asks = sorted(asks, key=lambda x: x["price"])[:depth]
+            # levels is [bids, asks], each best price first
+            book = decode_l2_book(l2_book)
+            bid_rows = (-book.bid_px).argsort(kind="stable")[:depth]
+            ask_rows = book.ask_px.argsort(kind="stable")[:depth]
+            bids = [
+                {"price": price, "size": size}
+                for price, size in zip(book.bid_px[bid_rows].tolist(), book.bid_sz[bid_rows].tolist())
+            ]
+            asks = [
+                {"price": price, "size": size}
+                for price, size in zip(book.ask_px[ask_rows].tolist(), book.ask_sz[ask_rows].tolist())
+            ]
             
             return {
                 "coin": coin,
@@ -261,65 +321,148 @@ class HyperliquidClient:
     def place_order(self, coin: str, side: OrderSide, size: float, price: Optional[float] = None, 
                    order_type: OrderType = OrderType.LIMIT, reduce_only: bool = False) -> Optional[Order]:
         """Place a trading order"""
-        try:
-            if not self.exchange:
-                self.logger.error("Exchange not initialized")
-                return None
-                
-            # Prepare order request
-            is_buy = side == OrderSide.LONG
-            
-            if order_type == OrderType.MARKET:
-                order_request = {
-                    "coin": coin,
-                    "is_buy": is_buy,
-                    "sz": size,
-                    "order_type": {"market": {}},
-                    "reduce_only": reduce_only
-                }
-            else:  # LIMIT
-                if price is None:
-                    raise ValueError("Price required for limit orders")
-                    
-                order_request = {
-                    "coin": coin,
-                    "is_buy": is_buy,
-                    "sz": size,
-                    "limit_px": price,
-                    "order_type": {"limit": {"tif": "Gtc"}},  # Good Till Cancelled
-                    "reduce_only": reduce_only
-                }
-                
-            response = self.exchange.order(order_request)
+        return self.place_orders([{
+            "coin": coin, "side": side, "size": size, "price": price,
+            "order_type": order_type, "reduce_only": reduce_only
+        }])[0]
+        
+    def place_orders(self, orders: List[Dict[str, Any]]) -> List[Optional[Order]]:
+        """Place independent orders concurrently; results are in the order given.
+        
+        Each entry takes place_order's arguments as keys (coin, side, size and
+        optionally price, order_type, reduce_only).
+        """
+        if not self.exchange:
+            self.logger.error("Exchange not initialized")
+            return [None] * len(orders)
+            
+        # Submit everything first so the whole burst is in flight together
+        pending = []
+        for params in orders:
+            params = {"price": None, "order_type": OrderType.LIMIT, "reduce_only": False, **params}
+            try:
+                order_request = self._order_request(**params)
+                future = self.pipeline.submit([order_request]) if order_request else None
+            except Exception as e:
+                self.logger.error(f"Failed to place order: {e}")
+                future = None
+            pending.append((params, future))
             
-            if response.get("status") == "ok":
-                order_data = response.get("response", {}).get("data", {})
-                
-                order = Order(
-                    order_id=str(order_data.get("oid", "")),
-                    coin=coin,
-                    side=side,
-                    size=size,
-                    price=price,
-                    order_type=order_type,
-                    status="PENDING",
-                    filled_size=0.0,
-                    remaining_size=size,
-                    average_fill_price=0.0,
-                    reduce_only=reduce_only,
-                    timestamp=datetime.utcnow()
-                )
-                
-                self.logger.info(f"Order placed: {side} {size} {coin} @ {price}")
-                return order
-            else:
-                error_msg = response.get("response", {}).get("error", "Unknown error")
-                self.logger.error(f"Order failed: {error_msg}")
+        results = []
+        for params, future in pending:
+            try:
+                results.append(self._order_from_response(future.result(), **params) if future else None)
+            except Exception as e:
+                self.logger.error(f"Failed to place order: {e}")
+                results.append(None)
+        return results
+        
+    def _order_request(self, coin: str, side: OrderSide, size: float, price: Optional[float],
+                       order_type: OrderType, reduce_only: bool) -> Optional[Dict[str, Any]]:
+        # Quantize locally so invalid tick/lot sizes never cost a signed round trip
+        rounding = self.universe.rounding(coin)
+        if rounding:
+            size = rounding.size(size)
+            price = rounding.price(price) if price else price
+            if size <= 0:
+                self.logger.error(f"Order size is below the minimum of {rounding.min_size} {coin}")
                 return None
                 
+        # Prepare order request
+        is_buy = side == OrderSide.LONG
+        
+        if order_type == OrderType.MARKET:
+            # Marketable IOC limit: fills within the slippage cap, the remainder is cancelled
+            return {
+                "coin": coin,
+                "is_buy": is_buy,
+                "sz": size,
+                "limit_px": self.market_price(coin, side, size),
+                "order_type": {"limit": {"tif": "Ioc"}},
+                "reduce_only": reduce_only
+            }
+            
+        # LIMIT
+        if price is None:
+            raise ValueError("Price required for limit orders")
+            
+        return {
+            "coin": coin,
+            "is_buy": is_buy,
+            "sz": size,
+            "limit_px": price,
+            "order_type": {"limit": {"tif": "Gtc"}},  # Good Till Cancelled
+            "reduce_only": reduce_only
+        }
+        
+    def market_price(self, coin: str, side: OrderSide, size: float) -> float:
+        """Aggressive IOC limit for a market order, priced from the cached book"""
+        book = self.books.get(coin, self.market_book_max_age)
+        if book is None:
+            # First order for this coin (or a stalled stream): one snapshot, then the stream takes over
+            book = self.books.update(self.info.l2_snapshot(coin))
+            threading.Thread(target=self._track_book, args=(coin,), daemon=True).start()
+            
+        price = marketable_price(
+            book, side == OrderSide.LONG, size, self.market_max_slippage, self.market_price_buffer
+        )
+        rounding = self.universe.rounding(coin)
+        return rounding.price(price) if rounding else price
+        
+    def _track_book(self, coin: str):
+        try:
+            self.books.track(coin)
         except Exception as e:
-            self.logger.error(f"Failed to place order: {e}")
-            return None
+            self.logger.warning(f"Failed to stream the {coin} order book: {e}")
+            
+    def _stream_info(self):
+        """SDK Info with its WebSocket running, built on first use"""
+        if self._ws_info is None:
+            from hyperliquid.info import Info
+            self._ws_info = Info(
+                self.config.base_url, skip_ws=False,
+                meta=self.universe.meta, spot_meta=self.universe.spot_meta
+            )
+        return self._ws_info
+        
+    def _order_from_response(self, response: Dict[str, Any], coin: str, side: OrderSide, size: float,
+                             price: Optional[float], order_type: OrderType, reduce_only: bool) -> Optional[Order]:
+        if response.get("status") == "ok":
+            statuses = response.get("response", {}).get("data", {}).get("statuses") or [{}]
+            status = statuses[0]
+            if "error" in status:
+                self.logger.error(f"Order rejected: {status['error']}")
+                return None
+            order_data = status.get("resting") or status.get("filled") or {}
+            
+            is_market = order_type == OrderType.MARKET
+            order = Order(
+                order_id=str(order_data.get("oid", "")),
+                coin=coin,
+                side=side,
+                size=size,
+                price=price,
+                order_type=order_type,
+                status=OrderStatus.PENDING,
+                filled_size=0.0,
+                remaining_size=size,
+                average_fill_price=0.0,
+                time_in_force=TimeInForce.IOC if is_market else TimeInForce.GTC,
+                reduce_only=reduce_only,
+                timestamp=datetime.utcnow()
+            )
+            if "filled" in status:
+                order.update_fill(float(order_data.get("totalSz", 0)), float(order_data.get("avgPx", 0)))
+            if is_market and not order.is_filled:
+                # IOC: whatever did not fill within the limit was cancelled
+                order.cancel()
+            
+            self.logger.info(f"Order placed: {side} {size} {coin} @ {price} ({order.status.value})")
+            return order
+            
+        error_msg = response.get("response", {}).get("error", "Unknown error")
+        self.logger.error(f"Order failed: {error_msg}")
+        return None
             
     def cancel_order(self, coin: str, order_id: str) -> bool:
         """Cancel an order"""
@@ -327,7 +470,7 @@ class HyperliquidClient:
             if not self.exchange:
                 return False
                 
-            response = self.exchange.cancel(coin, int(order_id))
+            response = self.pipeline.submit_cancel(coin, int(order_id)).result()
             success = response.get("status") == "ok"
             
             if success:
@@ -348,7 +491,7 @@ class HyperliquidClient:
             if not self.info:
                 return []
                 
-            open_orders = self.info.open_orders(self.config.wallet_address)
+            open_orders = self._retry(self.info.open_orders)(self.config.wallet_address)
             
             orders = []
             for order_data in open_orders:
@@ -380,11 +523,7 @@ class HyperliquidClient:
             if not self.info:
                 return []
                 
-            meta = self.info.meta()
-            universe = meta.get("universe", [])
-            
-            coins = [coin_info["name"] for coin_info in universe]
-            return coins
+            return self.universe.coins()
             
         except Exception as e:
             self.logger.error(f"Failed to get available coins: {e}")
@@ -463,5 +602,12 @@ class HyperliquidClient:
     def cleanup(self):
         """Cleanup resources"""
         self.stop_websocket()
+        self.universe.stop()
+        self.warmer.stop()
+        if self.pipeline:
+            # Orders already submitted still post; the pools stop after the last one
+            self.pipeline.shutdown(timeout=0)
+        if self._ws_info:
+            self._ws_info.disconnect_websocket()
         if self.session:
             self.session.close()
\ No newline at end of file
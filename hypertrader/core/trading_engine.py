@@ -68,8 +68,12 @@ class TradingEngine:
                 self.logger.error(f"Order validation failed: {validation['errors']}")
                 return None
                 
-            # Risk checks
-            if not self._check_risk_limits(size, price):
+            # Risk checks; market orders are checked at the IOC limit they will be sent with,
+            # priced from the client's cached book
+            risk_price = price
+            if order_type == OrderType.MARKET:
+                risk_price = self.hyperliquid_client.market_price(coin, side, size)
+            if not self._check_risk_limits(size, risk_price):
                 self.logger.error("Order rejected by risk management")
                 return None
                 
@@ -261,8 +265,7 @@ class TradingEngine:
         try:
             # Calculate position value
             if price is None:
-                # For market orders, get current price
-                return True  # Skip risk check for market orders for now
+                return True  # No price to value the order at
                 
             position_value = size * price
             
@@ -0,0 +1,132 @@
+"""
+Universe metadata cache for the desktop client
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from utils.flow_control import retry
+import utils.shared  # noqa: F401 - puts backend/ on the path
+from rounding import CoinRounding, coin_rounding
+
+class UniverseCache:
+    """meta/spotMeta persisted under data/ and refreshed in the background"""
+
+    def __init__(self, base_url: str, session: Optional[requests.Session] = None,
+                 refresh_interval: int = 600):
+        self.base_url = base_url
+        self.session = session or requests.Session()
+        self.refresh_interval = refresh_interval
+        self.path = Path(__file__).parent.parent / "data" / "universe_cache.json"
+        self.logger = logging.getLogger(__name__)
+
+        self.meta: Optional[Dict[str, Any]] = None
+        self.spot_meta: Optional[Dict[str, Any]] = None
+        self.fetched_at = 0.0
+        self._assets: Dict[str, Dict[str, Any]] = {}
+        self._rounding: Dict[str, CoinRounding] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def load(self):
+        """Load the persisted universe for this base URL, if any"""
+        try:
+            with open(self.path, "r") as f:
+                entry = json.load(f).get(self.base_url)
+            if entry:
+                self._set(entry["meta"], entry["spot_meta"], entry["fetched_at"])
+                self.logger.info(f"Loaded {len(self._assets)} coins from universe cache")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable universe cache: {e}")
+
+    def coins(self) -> List[str]:
+        """Names of listed, non-delisted coins"""
+        if self.meta is None:
+            self.refresh()
+        return [name for name, asset in self._assets.items() if not asset.get("isDelisted", False)]
+
+    def asset(self, coin: str) -> Optional[Dict[str, Any]]:
+        """Universe entry for a coin (szDecimals, maxLeverage, ...)"""
+        if self.meta is None:
+            self.refresh()
+        return self._assets.get(coin)
+
+    def rounding(self, coin: str) -> Optional[CoinRounding]:
+        """Price/size rounding rules for a coin, built from its szDecimals"""
+        rounding = self._rounding.get(coin)
+        if rounding is None:
+            asset = self.asset(coin)
+            if asset is None:
+                return None
+            rounding = self._rounding[coin] = coin_rounding(coin, int(asset.get("szDecimals", 0)))
+        return rounding
+
+    def refresh(self) -> bool:
+        """Fetch meta/spotMeta; persists and returns True only when they changed"""
+        meta = self._fetch("meta")
+        spot_meta = self._fetch("spotMeta")
+        with self._lock:
+            if meta == self.meta and spot_meta == self.spot_meta:
+                self.fetched_at = time.time()
+                return False
+            self._set(meta, spot_meta, time.time())
+            self._persist()
+        self.logger.info(f"Universe updated: {len(self._assets)} coins")
+        return True
+
+    def start(self):
+        """Start the background refresh thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh_worker, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _refresh_worker(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                self.logger.error(f"Universe refresh failed: {e}")
+            self._stop.wait(self.refresh_interval)
+
+    def _set(self, meta: Dict[str, Any], spot_meta: Dict[str, Any], fetched_at: float):
+        self.meta = meta
+        self.spot_meta = spot_meta
+        self.fetched_at = fetched_at
+        self._assets = {asset["name"]: asset for asset in meta.get("universe", []) if asset.get("name")}
+        self._rounding = {}
+
+    @retry(attempts=3, base_delay=1.0, max_delay=8.0)
+    def _fetch(self, info_type: str) -> Dict[str, Any]:
+        response = self.session.post(f"{self.base_url}/info", json={"type": info_type}, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    def _persist(self):
+        try:
+            stored = {}
+            if self.path.exists():
+                with open(self.path, "r") as f:
+                    stored = json.load(f)
+            stored[self.base_url] = {"meta": self.meta, "spot_meta": self.spot_meta, "fetched_at": self.fetched_at}
+
+            tmp_path = self.path.with_suffix(".json.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(stored, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            self.logger.error(f"Failed to persist universe cache: {e}")
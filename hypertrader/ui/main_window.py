@@ -10,6 +10,7 @@ from typing import Dict, Any
 from config.settings import AppSettings
 from config.api_config import APIConfigManager
 from core.hyperliquid_client import HyperliquidClient
+from utils.flow_control import coalesce
 from ui.components.dashboard import DashboardFrame
 from ui.components.trading_panel import TradingFrame
 from ui.components.portfolio_view import PortfolioFrame
@@ -39,6 +40,9 @@ class MainWindow:
         # Data refresh timer
         self.refresh_timer = None
         
+        # Timer ticks and tab switches in quick succession become one refresh on the Tk loop
+        self._request_refresh = coalesce(0.2, schedule=self._schedule)(self._refresh_current_tab)
+        
         # Initialize UI
         self._setup_ui()
         self._setup_menu()
@@ -73,6 +77,7 @@ class MainWindow:
         # Create notebook for tabs
         self.notebook = ttk.Notebook(main_frame)
         self.notebook.pack(fill=tk.BOTH, expand=True)
+        self.notebook.bind("<<NotebookTabChanged>>", lambda event: self._request_refresh())
         
         # Create tabs
         self._create_tabs()
@@ -198,6 +203,18 @@ class MainWindow:
         
     def _periodic_refresh(self):
         """Periodic data refresh"""
+        self._request_refresh()
+            
+        # Schedule next refresh
+        refresh_interval = self.settings.get('ui.refresh_interval', 5000)
+        self.refresh_timer = self.root.after(refresh_interval, self._periodic_refresh)
+        
+    def _schedule(self, delay: float, callback):
+        """Run a callback on the Tk loop after delay seconds"""
+        self.root.after(int(delay * 1000), callback)
+        
+    def _refresh_current_tab(self):
+        """Refresh the status bar and the visible tab"""
         try:
             # Update status bar
             self._update_status_bar()
@@ -214,10 +231,6 @@ class MainWindow:
         except Exception as e:
             self.logger.error(f"Error in periodic refresh: {e}")
             
-        # Schedule next refresh
-        refresh_interval = self.settings.get('ui.refresh_interval', 5000)
-        self.refresh_timer = self.root.after(refresh_interval, self._periodic_refresh)
-        
     def _update_status_bar(self):
         """Update status bar information"""
         try:
@@ -0,0 +1,189 @@
+"""
+Retry, throttle and coalesce primitives for sync and async callables.
+
+- ``retry``: exponential backoff with full jitter, bounded by an optional
+  overall deadline so a caller never waits longer than it budgeted.
+- ``throttle``: at most one call per interval; callers inside the interval
+  (including ones waiting on an in-flight call) get its result instead of
+  issuing their own.
+- ``coalesce``: trailing-edge batching; every call within ``wait`` of the
+  first is served by one run with the latest arguments, and runs never
+  overlap.
+
+Each works as a decorator on plain functions and on coroutine functions.
+"""
+
+import asyncio
+import functools
+import inspect
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Optional, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Full-jitter delay before retry number ``attempt`` (0-based)"""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+def retry(attempts: int = 3, base_delay: float = 0.5, max_delay: float = 10.0,
+          deadline: Optional[float] = None, retry_on: Tuple[Type[BaseException], ...] = (Exception,)):
+    """Retry on failure with jittered exponential backoff.
+
+    ``deadline`` caps the total time in seconds across attempts and sleeps; no
+    retry starts if its delay would run past it, and the last error is raised.
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                give_up_at = time.monotonic() + deadline if deadline is not None else None
+                for attempt in range(attempts):
+                    try:
+                        return await func(*args, **kwargs)
+                    except retry_on as e:
+                        delay = _next_delay(func, e, attempt, attempts, base_delay, max_delay, give_up_at)
+                    await asyncio.sleep(delay)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            give_up_at = time.monotonic() + deadline if deadline is not None else None
+            for attempt in range(attempts):
+                try:
+                    return func(*args, **kwargs)
+                except retry_on as e:
+                    delay = _next_delay(func, e, attempt, attempts, base_delay, max_delay, give_up_at)
+                time.sleep(delay)
+        return wrapper
+    return decorator
+
+def _next_delay(func, error: BaseException, attempt: int, attempts: int, base_delay: float,
+                max_delay: float, give_up_at: Optional[float]) -> float:
+    """Delay before the next attempt; re-raises the error when out of attempts or time"""
+    delay = backoff_delay(attempt, base_delay, max_delay)
+    if attempt == attempts - 1 or (give_up_at is not None and time.monotonic() + delay >= give_up_at):
+        raise error
+    logger.debug(f"{getattr(func, '__qualname__', func)} failed ({error}); retry {attempt + 1} in {delay:.2f}s")
+    return delay
+
+def throttle(min_interval: float):
+    """Run at most once per ``min_interval`` seconds; calls in between share the last result.
+
+    Only the first call's arguments are used within an interval, so apply it
+    to calls whose arguments do not change (e.g. bound to one wallet).
+    """
+    def decorator(func):
+        state = {"at": float("-inf"), "result": None}
+
+        if inspect.iscoroutinefunction(func):
+            lock: Optional[asyncio.Lock] = None
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                nonlocal lock
+                lock = lock or asyncio.Lock()
+                async with lock:
+                    if time.monotonic() - state["at"] >= min_interval:
+                        state["result"] = await func(*args, **kwargs)
+                        state["at"] = time.monotonic()
+                    return state["result"]
+            return async_wrapper
+
+        thread_lock = threading.Lock()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # Held during the call, so concurrent callers wait for it and reuse its result
+            with thread_lock:
+                if time.monotonic() - state["at"] >= min_interval:
+                    state["result"] = func(*args, **kwargs)
+                    state["at"] = time.monotonic()
+                return state["result"]
+        return wrapper
+    return decorator
+
+Scheduler = Callable[[float, Callable[[], None]], Any]
+
+def _thread_timer(delay: float, callback: Callable[[], None]):
+    timer = threading.Timer(delay, callback)
+    timer.daemon = True
+    timer.start()
+
+class Coalesced:
+    """Trailing-edge coalescing wrapper for a plain function (see ``coalesce``)"""
+
+    def __init__(self, func: Callable, wait: float, schedule: Optional[Scheduler] = None):
+        functools.update_wrapper(self, func)
+        self._func = func
+        self._wait = wait
+        self._schedule = schedule or _thread_timer
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._pending: Optional[Future] = None
+        self._args: Tuple[tuple, dict] = ((), {})
+
+    def __call__(self, *args, **kwargs) -> Future:
+        with self._lock:
+            self._args = (args, kwargs)
+            if self._pending is None:
+                self._pending = Future()
+                self._schedule(self._wait, self._run)
+            return self._pending
+
+    def _run(self):
+        # A burst arriving mid-run waits for this run instead of overlapping it
+        with self._run_lock:
+            with self._lock:
+                future, self._pending = self._pending, None
+                args, kwargs = self._args
+            try:
+                future.set_result(self._func(*args, **kwargs))
+            except Exception as e:
+                logger.error(f"{self._func.__qualname__} failed: {e}")
+                future.set_exception(e)
+
+class AsyncCoalesced:
+    """Trailing-edge coalescing wrapper for a coroutine function (see ``coalesce``)"""
+
+    def __init__(self, func: Callable, wait: float):
+        functools.update_wrapper(self, func)
+        self._func = func
+        self._wait = wait
+        self._run_lock: Optional[asyncio.Lock] = None
+        self._pending: Optional[asyncio.Future] = None
+        self._args: Tuple[tuple, dict] = ((), {})
+
+    def __call__(self, *args, **kwargs) -> asyncio.Future:
+        self._args = (args, kwargs)
+        if self._pending is None:
+            loop = asyncio.get_running_loop()
+            self._pending = loop.create_future()
+            loop.call_later(self._wait, lambda: loop.create_task(self._run()))
+        return self._pending
+
+    async def _run(self):
+        self._run_lock = self._run_lock or asyncio.Lock()
+        async with self._run_lock:
+            future, self._pending = self._pending, None
+            args, kwargs = self._args
+            try:
+                future.set_result(await self._func(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+
+def coalesce(wait: float, schedule: Optional[Scheduler] = None):
+    """Merge calls made within ``wait`` seconds into one trailing run with the latest arguments.
+
+    Every merged call gets the same future for that run's result. Plain
+    functions run on a timer thread by default; pass ``schedule(delay, callback)``
+    to run them elsewhere, e.g. on the Tk main loop via ``widget.after``.
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            return AsyncCoalesced(func, wait)
+        return Coalesced(func, wait, schedule)
+    return decorator
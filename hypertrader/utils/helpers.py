@@ -3,7 +3,6 @@ Utility helper functions
 """
 
 import re
-import time
 from typing import Any, Dict, Optional
 from datetime import datetime, timezone
 import logging
@@ -199,30 +198,3 @@ def parse_timestamp(timestamp_str: str) -> Optional[datetime]:
         return None
     except:
         return None
-
-def debounce(wait_time: float):
-    """Decorator to debounce function calls"""
-    def decorator(func):
-        last_called = [0]
-        
-        def wrapper(*args, **kwargs):
-            now = datetime.utcnow().timestamp()
-            if now - last_called[0] >= wait_time:
-                last_called[0] = now
-                return func(*args, **kwargs)
-        return wrapper
-    return decorator
-
-def retry_on_failure(max_retries: int = 3, delay: float = 1.0):
-    """Decorator to retry function on failure"""
-    def decorator(func):
-        def wrapper(*args, **kwargs):
-            for attempt in range(max_retries):
-                try:
-                    return func(*args, **kwargs)
-                except Exception as e:
-                    if attempt == max_retries - 1:
-                        raise e
-                    time.sleep(delay * (attempt + 1))
-        return wrapper
-    return decorator
\ No newline at end of file
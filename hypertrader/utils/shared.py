@@ -0,0 +1,17 @@
+"""
+Modules shared with the backend.
+
+hl_decode, book_cache, rounding, order_pipeline and connection_warmer live
+only in backend/, next to this app in the repository, so the desktop client
+and the server cannot drift apart. Importing this module appends backend/
+to the path (after the app's own packages, which keep precedence), after
+which they are imported by their plain names.
+"""
+
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[2] / "backend"
+
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
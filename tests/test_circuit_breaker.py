@@ -0,0 +1,138 @@
+"""
+Circuit breaker transitions and last-good snapshots
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import circuit_breaker  # noqa: E402
+from circuit_breaker import CircuitBreaker, UpstreamGuard, UpstreamUnavailable  # noqa: E402
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    # No jitter: the backoff is exactly half fixed plus half of the random range
+    monkeypatch.setattr(circuit_breaker.random, "uniform", lambda low, high: high)
+    return clock
+
+def test_opens_after_the_threshold_and_probes_once_the_backoff_expires(clock):
+    breaker = CircuitBreaker("l2Book", failure_threshold=2, base_backoff=4, max_backoff=60)
+
+    breaker.record_failure()
+    assert not breaker.is_open and breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open and not breaker.allow()
+    assert breaker.retry_after() == 4
+
+    clock.now += 4
+    assert breaker.allow()  # Half-open: one probe
+    assert not breaker.allow()  # ...and only one
+
+    breaker.record_success()
+    assert not breaker.is_open and breaker.allow()
+
+def test_failed_probe_reopens_for_longer(clock):
+    breaker = CircuitBreaker("l2Book", failure_threshold=1, base_backoff=4, max_backoff=10)
+
+    breaker.record_failure()
+    assert breaker.retry_after() == 4
+    clock.now += 4
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.retry_after() == 8
+    clock.now += 8
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.retry_after() == 10  # Capped at max_backoff
+
+def test_call_serves_the_last_good_snapshot_while_failing(clock):
+    guard = UpstreamGuard(failure_threshold=1, base_backoff=4)
+    calls = []
+
+    def fetch(value):
+        def run():
+            calls.append(value)
+            if isinstance(value, Exception):
+                raise value
+            return value
+        return run
+
+    async def scenario():
+        fresh = await guard.call("allMids", "mids", fetch(1))
+        assert (fresh.value, fresh.stale) == (1, False)
+
+        stale = await guard.call("allMids", "mids", fetch(RuntimeError("down")))
+        assert (stale.value, stale.stale) == (1, True)
+
+        # Open: the fetch is not even attempted
+        stale = await guard.call("allMids", "mids", fetch(2))
+        assert (stale.value, stale.stale) == (1, True)
+        assert len(calls) == 2
+
+        with pytest.raises(UpstreamUnavailable):
+            await guard.call("allMids", "other key", fetch(3))
+
+        clock.now += 4
+        fresh = await guard.call("allMids", "mids", fetch(4))
+        assert (fresh.value, fresh.stale) == (4, False)
+        assert not guard.breaker("allMids").is_open
+
+    asyncio.run(scenario())
+
+def test_guard_records_failures_and_fails_fast_when_open(clock):
+    guard = UpstreamGuard(failure_threshold=1, base_backoff=4)
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            async with guard.guard("exchange"):
+                raise RuntimeError("HTTP 502")
+        with pytest.raises(UpstreamUnavailable):
+            async with guard.guard("exchange"):
+                pass
+
+        clock.now += 4
+        async with guard.guard("exchange"):
+            pass
+        assert not guard.breaker("exchange").is_open
+
+    asyncio.run(scenario())
+
+def test_guard_does_not_count_cancellation_as_a_failure(clock):
+    guard = UpstreamGuard(failure_threshold=1, base_backoff=4)
+
+    async def request():
+        async with guard.guard("exchange"):
+            await asyncio.sleep(10)
+
+    async def scenario():
+        task = asyncio.create_task(request())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert guard.breaker("exchange").failures == 0
+
+        # A cancelled half-open probe frees the probe slot instead of wedging the circuit
+        guard.breaker("exchange").record_failure()
+        clock.now += 4
+        task = asyncio.create_task(request())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert guard.breaker("exchange").allow()
+
+    asyncio.run(scenario())
@@ -0,0 +1,140 @@
+"""
+Response compression: negotiation, Vary and the compressed-body cache
+"""
+
+import gzip
+import sys
+from pathlib import Path
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import compression  # noqa: E402
+from compression import CompressedBodyCache, CompressionMiddleware, negotiate  # noqa: E402
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", "gzip"),
+    ("gzip, deflate, br", "gzip"),  # Without the brotli package
+    ("deflate", None),
+    ("", None),
+    ("identity", None),
+    ("gzip;q=0", None),
+    ("*", "gzip"),
+    ("*;q=0", None),
+    ("*;q=0.5, gzip;q=0", None),
+    ("GZIP;Q=0.8", "gzip"),
+    ("gzip;q=oops", None),
+])
+def test_negotiate(monkeypatch, header, expected):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert negotiate(header) == expected
+
+def test_negotiate_prefers_the_highest_weight(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", object())
+    assert negotiate("gzip, br") == "br"
+    assert negotiate("gzip;q=1, br;q=0.5") == "gzip"
+    assert negotiate("gzip;q=0.5, br;q=0.5") == "br"  # Ties go to server preference
+
+BIG = {"coins": ["BTC"] * 500}
+state = {"body": BIG, "etag": '"v1"'}
+
+async def big(request):
+    return JSONResponse(BIG)
+
+async def small(request):
+    return JSONResponse({"ok": True})
+
+async def image(request):
+    return Response(b"\x89PNG" + b"\0" * 4096, media_type="image/png")
+
+async def not_modified(request):
+    return Response(status_code=304, headers={"ETag": '"v1"'})
+
+async def cached(request):
+    return JSONResponse(state["body"], headers={"ETag": state["etag"]})
+
+async def stream(request):
+    async def chunks():
+        for _ in range(4):
+            yield b'{"chunk": "' + b"x" * 1024 + b'"}\n'
+    return StreamingResponse(chunks(), media_type="application/json")
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    app = Starlette(routes=[
+        Route("/big", big), Route("/small", small), Route("/image", image),
+        Route("/not-modified", not_modified), Route("/cached", cached), Route("/stream", stream),
+    ])
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+def get(client, path, accept_encoding):
+    return client.get(path, headers={"Accept-Encoding": accept_encoding})
+
+def test_large_json_is_compressed_with_vary(client):
+    response = get(client, "/big", "gzip")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.json() == BIG
+
+@pytest.mark.parametrize("path, accept_encoding", [
+    ("/small", "gzip"),  # Under the size threshold
+    ("/big", "identity"),  # Client without gzip or brotli
+    ("/big", ""),
+    ("/not-modified", "gzip"),
+])
+def test_uncompressed_variants_still_vary(client, path, accept_encoding):
+    response = get(client, path, accept_encoding)
+
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+
+def test_responses_that_are_never_compressed_do_not_vary(client):
+    response = get(client, "/image", "gzip")
+
+    assert "content-encoding" not in response.headers
+    assert "vary" not in response.headers
+
+def test_streaming_json_is_compressed_incrementally(client):
+    response = get(client, "/stream", "gzip")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text.count('"chunk"') == 4
+
+def test_cached_body_follows_the_bytes_not_the_etag(client):
+    state.update(body=BIG, etag='"v1"')
+    first = get(client, "/cached", "gzip")
+    assert first.headers["etag"] == 'W/"v1"'
+    assert first.json() == BIG
+
+    # Same ETag, different bytes (an envelope field the ETag does not cover changed)
+    state["body"] = {**BIG, "stale": True}
+    second = get(client, "/cached", "gzip")
+    assert second.json() == state["body"]
+
+def test_compressed_body_cache_reuses_and_evicts():
+    cache = CompressedBodyCache(max_bytes=10)
+    cache.put(b"a", "gzip", b"12345")
+    cache.put(b"b", "gzip", b"67890")
+    assert cache.get(b"a", "gzip") == b"12345"  # Now the most recently used
+
+    cache.put(b"c", "gzip", b"abcde")
+    assert cache.get(b"b", "gzip") is None
+    assert cache.get(b"a", "gzip") == b"12345"
+    assert cache.get(b"a", "br") is None
+    assert cache.size == 10
+
+    cache.put(b"huge", "gzip", b"x" * 11)
+    assert cache.get(b"huge", "gzip") is None
+
+def test_cached_bodies_are_valid_gzip():
+    body = b'{"a": 1}' * 200
+    assert gzip.decompress(compression.compress(body, "gzip", 9)) == body
@@ -0,0 +1,119 @@
+"""
+Fills store pagination: bisect pages and opaque cursors
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+import requests
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from fills_store import FillsStore, decode_cursor, encode_cursor  # noqa: E402
+
+BASE_URL = "https://api.hyperliquid-testnet.xyz"
+WALLET = "0x" + "ab" * 20
+
+def fill(tid, time, coin="BTC"):
+    return {"tid": tid, "time": time, "coin": coin, "px": "100", "sz": "1", "side": "B", "oid": tid}
+
+def make_store(*fills):
+    store = FillsStore(requests.Session())
+    store.ingest(BASE_URL, WALLET, list(fills))
+    return store
+
+def tids(page):
+    return [f["tid"] for f in page["fills"]]
+
+def walk(store, limit, **filters):
+    """Every page from the newest, following next_cursor"""
+    pages, cursor = [], None
+    while True:
+        page = store.query(BASE_URL, WALLET, limit=limit, cursor=cursor, **filters)
+        pages.append(page)
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+def test_empty_store():
+    page = make_store().query(BASE_URL, WALLET, limit=10)
+
+    assert page == {"fills": [], "total": 0, "page": 1, "has_more": False, "next_cursor": None}
+
+def test_wallet_address_case_does_not_split_the_store():
+    store = make_store(fill(1, 1000))
+
+    assert tids(store.query(BASE_URL, WALLET.upper().replace("0X", "0x"), limit=10)) == [1]
+
+def test_pages_run_newest_first_and_the_last_page_has_no_cursor():
+    store = make_store(*(fill(tid, 1000 * tid) for tid in range(1, 6)))
+
+    pages = walk(store, limit=2)
+
+    assert [tids(page) for page in pages] == [[5, 4], [3, 2], [1]]
+    assert [page["page"] for page in pages] == [1, 2, 3]
+    assert [page["has_more"] for page in pages] == [True, True, False]
+    assert all(page["total"] == 5 for page in pages)
+
+def test_cursor_exactly_at_the_last_page():
+    store = make_store(*(fill(tid, 1000 * tid) for tid in range(1, 5)))
+
+    first, last = walk(store, limit=2)
+
+    assert tids(last) == [2, 1]
+    assert (last["has_more"], last["next_cursor"]) == (False, None)
+
+def test_duplicate_timestamps_straddling_a_page_boundary():
+    # Five fills in one millisecond (one taker order crossing several makers), then two later ones
+    store = make_store(*(fill(tid, 5000) for tid in range(10, 15)), fill(20, 6000), fill(21, 7000))
+
+    pages = walk(store, limit=3)
+    seen = [tid for page in pages for tid in tids(page)]
+
+    assert seen == [21, 20, 14, 13, 12, 11, 10]
+    assert len(set(seen)) == len(seen)
+
+def test_refetched_fills_are_not_duplicated():
+    store = make_store(fill(1, 1000), fill(2, 2000))
+
+    assert store.ingest(BASE_URL, WALLET, [fill(2, 2000), fill(3, 3000)]) == 1
+    assert tids(store.query(BASE_URL, WALLET, limit=10)) == [3, 2, 1]
+
+def test_coin_and_time_filters_page_within_their_range():
+    store = make_store(*(fill(tid, 1000 * tid, "ETH" if tid % 2 else "BTC") for tid in range(1, 11)))
+
+    pages = walk(store, limit=2, coin="ETH", start_time=3000, end_time=9000)
+
+    assert [tids(page) for page in pages] == [[9, 7], [5, 3]]
+    assert pages[0]["total"] == 4
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor((1700000000000, 42), 3)) == ((1700000000000, 42), 3)
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "!!!", encode_cursor((1, 2), 1)[:-3], "ä"])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        make_store(fill(1, 1000)).query(BASE_URL, WALLET, limit=10, cursor=cursor)
+
+def test_malformed_cursor_is_a_400(monkeypatch):
+    import server
+    from hyperliquid_service import HyperliquidService
+    from service_registry import service_registry
+
+    service = HyperliquidService(environment="testnet", fills_store=make_store(fill(1, 1000)))
+    service.is_configured = True
+    service.wallet_address = WALLET
+
+    async def no_sync(*args, **kwargs):
+        return 0
+
+    monkeypatch.setattr(service.fills_store, "sync", no_sync)
+    monkeypatch.setattr(service_registry, "_current", service)
+    client = TestClient(server.app)
+
+    assert client.get("/api/orders/history", params={"cursor": "not-a-cursor"}).status_code == 400
+    response = client.get("/api/orders/history", params={"limit": 10})
+    assert response.status_code == 200
+    assert response.json()["has_more"] is False
@@ -0,0 +1,29 @@
+"""
+HyperliquidService reads that must follow the configured environment
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from hyperliquid_service import HyperliquidService  # noqa: E402
+
+def test_all_mids_come_from_the_service_environment():
+    mainnet, testnet = HyperliquidService(environment="mainnet"), HyperliquidService(environment="testnet")
+    # Both share one guard, as services built by the registry do
+    testnet.upstream = mainnet.upstream
+    urls = []
+
+    def info_content(payload, shared=None, url=None):
+        urls.append(url)
+        return b'{"BTC": "2.0"}' if "testnet" in url else b'{"BTC": "1.0"}'
+
+    mainnet._info_content = testnet._info_content = info_content
+
+    async def scenario():
+        return (await mainnet.get_all_mids_snapshot()).value, (await testnet.get_all_mids_snapshot()).value
+
+    assert asyncio.run(scenario()) == ({"BTC": 1.0}, {"BTC": 2.0})
+    assert urls == ["https://api.hyperliquid.xyz/info", "https://api.hyperliquid-testnet.xyz/info"]
@@ -0,0 +1,57 @@
+"""
+Market data owner demand filtering
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from market_data_owner import MarketDataOwner, base_url_for  # noqa: E402
+from universe_cache import Universe  # noqa: E402
+
+TESTNET = base_url_for("testnet")
+
+def make_owner(tmp_path):
+    owner = MarketDataOwner("test", str(tmp_path / "owner.sock"), universe_path=str(tmp_path / "universe.json"))
+    fetched = []
+
+    def fetch(base_url):
+        fetched.append(base_url)
+        universe = Universe({"universe": [{"name": "BTC", "szDecimals": 5}]}, {"universe": [], "tokens": []}, 0)
+        owner.universe._universes[base_url] = universe
+        return universe, True
+
+    owner.universe.fetch = fetch
+    owner._poll = lambda key: asyncio.sleep(0)
+    return owner, fetched
+
+def test_first_testnet_demand_loads_the_testnet_universe(tmp_path, capsys):
+    async def scenario():
+        owner, fetched = make_owner(tmp_path)
+        key = f"{TESTNET} l2Book BTC"
+        owner.demand(key)
+        owner.demand(key)
+        assert owner._pollers == {}
+        await asyncio.sleep(0.05)
+
+        owner.demand(key)
+        assert list(owner._pollers) == [key]
+        assert fetched == [TESTNET]
+
+    asyncio.run(scenario())
+    assert capsys.readouterr().out.count("the universe is still loading") == 1
+
+def test_unlisted_coins_and_foreign_hosts_are_rejected_with_a_log_line(tmp_path, capsys):
+    async def scenario():
+        owner, _ = make_owner(tmp_path)
+        await owner.universe.ensure(TESTNET)
+        owner.demand(f"{TESTNET} l2Book NOPE")
+        owner.demand("http://localhost:9 l2Book BTC")
+        assert owner._pollers == {}
+
+    asyncio.run(scenario())
+    out = capsys.readouterr().out
+    assert "NOPE is not listed" in out
+    assert "http://localhost:9 is not a Hyperliquid API host" in out
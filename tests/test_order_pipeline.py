@@ -0,0 +1,65 @@
+"""
+Order pipeline shutdown: accepted actions finish, later ones are refused
+"""
+
+import asyncio
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from order_pipeline import OrderPipeline, PipelineClosed  # noqa: E402
+
+class SlowPipeline(OrderPipeline):
+    """Signs instantly and posts once ``release`` is set"""
+
+    def __init__(self):
+        super().__init__(SimpleNamespace(wallet=SimpleNamespace(address="0xabc")), window=2)
+        self.signed = threading.Event()
+        self.release = threading.Event()
+
+    def _sign_orders(self, order_requests):
+        self.signed.set()
+        return {"type": "order", "orders": order_requests}, None, self.nonces.next()
+
+    def _post(self, signed):
+        self.release.wait(5)
+        return {"status": "ok", "nonce": signed[2]}
+
+ORDER = {"coin": "BTC", "is_buy": True, "sz": 1.0, "limit_px": 100.0, "order_type": {}, "reduce_only": False}
+
+def test_shutdown_lets_a_signed_order_post_then_refuses_new_ones():
+    async def scenario():
+        pipeline = SlowPipeline()
+        order = asyncio.create_task(pipeline.orders([ORDER]))
+        await asyncio.to_thread(pipeline.signed.wait, 5)
+
+        shutdown = asyncio.create_task(asyncio.to_thread(pipeline.shutdown, 5))
+        await asyncio.sleep(0.05)
+        assert not shutdown.done()
+        with pytest.raises(PipelineClosed):
+            await pipeline.orders([ORDER])
+
+        pipeline.release.set()
+        assert (await order)["status"] == "ok"
+        assert await shutdown
+
+    asyncio.run(scenario())
+
+def test_shutdown_timeout_leaves_the_pools_to_the_last_action():
+    async def scenario():
+        pipeline = SlowPipeline()
+        future = pipeline.submit([ORDER])
+        await asyncio.to_thread(pipeline.signed.wait, 5)
+
+        assert not await asyncio.to_thread(pipeline.shutdown, 0.01)
+        pipeline.release.set()
+        assert (await asyncio.wrap_future(future))["status"] == "ok"
+        with pytest.raises(PipelineClosed):
+            pipeline.submit([ORDER])
+
+    asyncio.run(scenario())
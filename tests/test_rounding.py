@@ -0,0 +1,79 @@
+"""
+Order price and size quantization
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from hyperliquid_service import HyperliquidService  # noqa: E402
+from rounding import SPOT_MAX_DECIMALS, RoundingTable, coin_rounding  # noqa: E402
+from universe_cache import Asset, Universe  # noqa: E402
+
+BTC = coin_rounding("BTC", 5)  # Perp, 1 price decimal
+DOGE = coin_rounding("DOGE", 0)  # Perp, 6 price decimals
+PURR = coin_rounding("PURR/USDC", 0, SPOT_MAX_DECIMALS)  # Spot, 8 price decimals
+
+@pytest.mark.parametrize("rounding, price, expected", [
+    (BTC, 64321.57, 64322.0),  # Five significant figures leave no decimals
+    (BTC, 4321.57, 4321.6),  # Five significant figures and the one-decimal limit agree
+    (BTC, 12.3456, 12.3),  # The one-decimal limit is tighter than five figures
+    (BTC, 123456.0, 123456.0),  # Integer prices are accepted whatever their length
+    (DOGE, 0.1234567, 0.12346),
+    (DOGE, 0.000123456, 0.000123),  # The six-decimal perp limit cuts first
+    (PURR, 0.000123456, 0.00012346),  # Spot allows eight decimals
+    (PURR, 1.234567, 1.2346),
+])
+def test_price_rounds_to_significant_figures_and_decimals(rounding, price, expected):
+    assert rounding.price(price) == expected
+
+def test_price_decimals_follow_sz_decimals_for_perp_and_spot():
+    assert (BTC.price_decimals, DOGE.price_decimals, PURR.price_decimals) == (1, 6, 8)
+    assert coin_rounding("X", 2, SPOT_MAX_DECIMALS).price_decimals == 6
+    # More size decimals than the limit leaves integer prices only
+    assert coin_rounding("X", 7).price_decimals == 0
+
+@pytest.mark.parametrize("rounding, size, expected", [
+    (BTC, 0.123456789, 0.12345),  # Always down, never more than asked
+    (BTC, 0.00001, 0.00001),  # Exactly one lot
+    (DOGE, 1.999, 1.0),
+    (coin_rounding("ETH", 2), 0.29, 0.29),  # 0.29 * 100 is 28.999999999999996 in floating point
+    (coin_rounding("ETH", 1), 0.3, 0.3),
+])
+def test_size_rounds_down_to_the_lot(rounding, size, expected):
+    assert rounding.size(size) == expected
+
+def test_size_below_one_lot_rounds_to_zero():
+    assert BTC.size(0.000009) == 0.0
+    assert BTC.min_size == 0.00001
+
+def test_units_round_trip():
+    assert BTC.size_units(0.12345) == 12345
+    assert BTC.size_from_units(12345) == 0.12345
+    assert DOGE.price_units(0.1234567) == 123460
+    assert DOGE.price_from_units(123460) == 0.12346
+
+def test_table_is_built_from_the_universe_assets():
+    table = RoundingTable([Asset("BTC", 0, 5, 50, False), Asset("", 1, 2, 1, False), Asset("DOGE", 2, 0, 10, False)])
+
+    assert len(table) == 2
+    assert table.get("BTC") == BTC
+    assert table.get("missing") is None
+
+def test_service_refuses_an_order_that_rounds_to_zero():
+    service = HyperliquidService(environment="testnet")
+    service.base_url = "https://api.hyperliquid-testnet.xyz"
+    universe = Universe({"universe": [{"name": "BTC", "szDecimals": 5}]}, {"universe": [], "tokens": []}, 0)
+
+    class Universes:
+        def get(self, base_url):
+            return universe
+
+    service.universe = Universes()
+
+    assert service.quantize_order("BTC", 0.123456, 64321.57) == (0.12345, 64322.0)
+    with pytest.raises(ValueError, match="below the minimum"):
+        service.quantize_order("BTC", 0.000009, 64321.57)
@@ -0,0 +1,90 @@
+"""
+Service swaps: orders running on the old service finish on its pipeline
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from hyperliquid_service import HyperliquidService  # noqa: E402
+from service_registry import ServiceRegistry  # noqa: E402
+
+FILLED = {"status": "ok", "response": {"data": {"statuses": [{"filled": {"totalSz": "1", "avgPx": "100", "oid": 7}}]}}}
+
+class FakePipeline:
+    def __init__(self):
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+        self.shut_down = False
+
+    async def order(self, *args):
+        assert not self.shut_down
+        self.started.set()
+        await self.release.wait()
+        return FILLED
+
+    def shutdown(self, timeout=None):
+        self.shut_down = True
+        return True
+
+def configured_service(pipeline):
+    service = HyperliquidService()
+    service.is_configured = True
+    service.base_url = "https://api.hyperliquid-testnet.xyz"
+    service.wallet_address = "0x" + "1" * 40
+    service.pipeline = pipeline
+    return service
+
+def test_swap_mid_order_lets_the_order_finish_on_the_old_pipeline(tmp_path):
+    async def scenario():
+        registry = ServiceRegistry(universe_path=str(tmp_path / "universe.json"))
+        old_pipeline, new_pipeline = FakePipeline(), FakePipeline()
+        registry._current = configured_service(old_pipeline)
+        registry.build = lambda *args: configured_service(new_pipeline)
+
+        order = asyncio.create_task(registry.current.place_order("BTC", True, 1.0, 100.0))
+        await old_pipeline.started.wait()
+
+        await registry.configure("0x" + "2" * 40, "key", "secret", "testnet")
+        assert registry.current.pipeline is new_pipeline
+        await asyncio.sleep(0.05)
+        assert not old_pipeline.shut_down
+
+        old_pipeline.release.set()
+        assert (await order).filled_size == 1.0
+        await asyncio.gather(*registry._retiring)
+        assert old_pipeline.shut_down
+        assert not new_pipeline.shut_down
+
+    asyncio.run(scenario())
+
+def test_unchanged_credentials_keep_the_current_service(tmp_path):
+    async def scenario():
+        registry = ServiceRegistry(universe_path=str(tmp_path / "universe.json"))
+        builds = []
+
+        def build(*credentials):
+            builds.append(credentials)
+            return configured_service(FakePipeline())
+
+        registry.build = build
+        credentials = ("0x" + "2" * 40, "key", "secret", "testnet")
+
+        first = await registry.configure(*credentials)
+        assert await registry.configure(*credentials) is first
+        assert registry.uses_credentials(*credentials)
+        assert len(builds) == 1
+        assert not first.pipeline.shut_down
+
+        await registry.configure(*credentials[:3], "mainnet")
+        assert len(builds) == 2
+
+        # A service whose build failed is retried even for the same credentials
+        registry.current.is_configured = False
+        await registry.configure(*credentials[:3], "mainnet")
+        assert len(builds) == 3
+        await asyncio.gather(*registry._retiring)
+
+    asyncio.run(scenario())
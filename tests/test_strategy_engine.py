@@ -0,0 +1,136 @@
+"""
+Unit tests for the strategy engine's evaluation and position bookkeeping
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from strategy_engine import CoinEvaluator, PositionState, StrategyConfigError, compile_strategy  # noqa: E402
+
+def make_strategy(entry=None, exit=None, risk=None, sizing=None, strategy_id="s1", coin="BTC"):
+    return compile_strategy({
+        "id": strategy_id,
+        "coin": coin,
+        "config": {
+            "entry_conditions": entry if entry is not None else {"price_below": 100},
+            "exit_conditions": exit or {},
+            "risk_management": risk or {},
+            "position_sizing": sizing or {"size_type": "fixed", "amount": 1},
+        },
+    })
+
+def open_position(evaluator, strategy_id, size, price):
+    evaluator.slots[strategy_id].state = PositionState(size=size, entry_price=price)
+
+def test_entry_fires_once_conditions_hold():
+    evaluator = CoinEvaluator("BTC")
+    evaluator.add(make_strategy(sizing={"size_type": "fixed", "amount": 2}))
+
+    assert evaluator.on_tick(101.0, 0) == []
+    intents = evaluator.on_tick(99.0, 1)
+
+    assert len(intents) == 1
+    intent = intents[0]
+    assert (intent.reason, intent.is_buy, intent.reduce_only, intent.size) == ("entry", True, False, 2)
+    assert intent.price == 99.0
+
+def test_pending_entry_does_not_fire_again_until_rejected():
+    evaluator = CoinEvaluator("BTC")
+    evaluator.add(make_strategy())
+
+    assert len(evaluator.on_tick(99.0, 0)) == 1
+    assert evaluator.on_tick(98.0, 1) == []
+    evaluator.reject("s1")
+    assert len(evaluator.on_tick(97.0, 2)) == 1
+
+def test_strategy_without_entry_conditions_never_enters():
+    evaluator = CoinEvaluator("BTC")
+    evaluator.add(make_strategy(entry={}))
+
+    assert evaluator.on_tick(1.0, 0) == []
+
+def test_short_entry_sells():
+    evaluator = CoinEvaluator("BTC")
+    evaluator.add(make_strategy(entry={"price_above": 100}, sizing={"size_type": "fixed", "amount": 1, "side": "short"}))
+
+    intent, = evaluator.on_tick(101.0, 0)
+    assert not intent.is_buy
+
+def test_unknown_condition_is_rejected():
+    with pytest.raises(StrategyConfigError):
+        make_strategy(entry={"volume_above": 10})
+
+@pytest.mark.parametrize("price, reason", [(110.0, "stop_loss"), (90.0, "take_profit"), (104.0, None)])
+def test_short_stop_loss_and_take_profit_follow_the_held_side(price, reason):
+    evaluator = CoinEvaluator("BTC")
+    evaluator.add(make_strategy(
+        entry={"price_above": 1000},
+        risk={"stop_loss": 0.05, "take_profit": 0.05},
+        sizing={"size_type": "fixed", "amount": 1, "side": "short"},
+    ))
+    open_position(evaluator, "s1", 1.0, 100.0)
+
+    intents = evaluator.on_tick(price, 0)
+
+    if reason is None:
+        assert intents == []
+    else:
+        intent, = intents
+        # A short closes by buying back what it holds
+        assert (intent.reason, intent.is_buy, intent.reduce_only, intent.size) == (reason, True, True, 1.0)
+
+@pytest.mark.parametrize("price, reason", [(90.0, "stop_loss"), (110.0, "take_profit")])
+def test_long_stop_loss_and_take_profit(price, reason):
+    evaluator = CoinEvaluator("BTC")
+    evaluator.add(make_strategy(risk={"stop_loss": 0.05, "take_profit": 0.05}))
+    open_position(evaluator, "s1", 1.0, 100.0)
+
+    intent, = evaluator.on_tick(price, 0)
+    assert (intent.reason, intent.is_buy, intent.reduce_only) == (reason, False, True)
+
+def test_short_realized_pnl_counts_a_price_drop_as_profit():
+    evaluator = CoinEvaluator("BTC")
+    evaluator.add(make_strategy(sizing={"size_type": "fixed", "amount": 1, "side": "short"}))
+
+    evaluator.confirm("s1", False, 2.0, 100.0)
+    state = evaluator.confirm("s1", True, 2.0, 90.0)
+
+    assert state.realized_pnl == pytest.approx(20.0)
+    assert (state.size, state.entry_price, state.trades) == (0.0, 0.0, 1)
+
+def test_max_loss_halts_the_strategy():
+    evaluator = CoinEvaluator("BTC")
+    evaluator.add(make_strategy(risk={"max_loss": 15}))
+
+    evaluator.confirm("s1", False, 1.0, 100.0)
+    state = evaluator.confirm("s1", True, 1.0, 90.0)
+    assert not state.halted
+
+    evaluator.confirm("s1", False, 1.0, 100.0)
+    state = evaluator.confirm("s1", True, 1.0, 94.0)
+
+    assert state.realized_pnl == pytest.approx(-16.0)
+    assert state.halted
+    assert evaluator.on_tick(50.0, 0) == []
+
+def test_position_state_round_trips_through_performance():
+    state = PositionState(size=1.5, entry_price=100.0, realized_pnl=-3.0, trades=4)
+
+    restored = PositionState.from_performance(state.performance())
+
+    assert (restored.size, restored.entry_price, restored.realized_pnl, restored.trades) == (1.5, 100.0, -3.0, 4)
+    assert not restored.pending and not restored.halted
+
+def test_position_state_without_entry_price_restores_flat():
+    restored = PositionState.from_performance({"position_size": 2.0, "entry_price": 0.0, "trades": 3.0})
+
+    assert (restored.size, restored.entry_price, restored.trades) == (0.0, 0.0, 3)
+
+def test_position_state_from_empty_performance():
+    restored = PositionState.from_performance({})
+
+    assert (restored.size, restored.entry_price, restored.realized_pnl, restored.trades) == (0.0, 0.0, 0.0, 0)
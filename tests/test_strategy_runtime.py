@@ -0,0 +1,94 @@
+"""
+Strategy runtime tests against an in-memory strategies collection
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from models import Strategy, StrategyConfig  # noqa: E402
+from strategy_runtime import StrategyRuntime  # noqa: E402
+
+class FakeCollection:
+    def __init__(self, *documents):
+        self.documents = {document["id"]: dict(document) for document in documents}
+
+    async def find(self, query):
+        for document in list(self.documents.values()):
+            if all(document.get(key) == value for key, value in query.items()):
+                yield dict(document)
+
+    async def find_one(self, query):
+        return dict(self.documents[query["id"]]) if query["id"] in self.documents else None
+
+    async def update_one(self, query, update):
+        self.documents[query["id"]].update(update["$set"])
+
+class FakeOrder:
+    def __init__(self, filled_size, price):
+        self.filled_size = filled_size
+        self.average_fill_price = price
+
+class FakeService:
+    is_configured = True
+
+    def __init__(self):
+        self.orders = []
+
+    async def place_order(self, coin, is_buy, size, order_type=None, reduce_only=False):
+        self.orders.append((coin, is_buy, size, reduce_only))
+        return FakeOrder(size, self.price)
+
+def strategy(**config):
+    return Strategy(
+        id="s1", name="dip buyer", coin="BTC",
+        config=StrategyConfig(position_sizing={"size_type": "fixed", "amount": 1}, **config),
+    )
+
+def make_runtime(collection, service):
+    return StrategyRuntime(collection, service, max_order_notional=1_000_000)
+
+def position(runtime):
+    return runtime.pool.local.evaluators["BTC"].slots["s1"].state
+
+def test_edit_keeps_the_open_position():
+    async def scenario():
+        created = strategy(entry_conditions={"price_below": 100}, exit_conditions={"price_above": 120})
+        collection = FakeCollection({**created.dict(), "status": "active"})
+        service = FakeService()
+        runtime = make_runtime(collection, service)
+
+        await runtime.reload()
+        service.price = 99.0
+        intent, = await runtime.evaluate({"BTC": 99.0}, 0)
+        await runtime._submit(intent)
+        assert collection.documents["s1"]["performance"]["position_size"] == 1.0
+
+        # The client sends back the strategy it loaded before the fill, performance and all
+        edited = strategy(entry_conditions={"price_below": 100}, exit_conditions={"price_above": 110})
+        await collection.update_one({"id": "s1"}, {"$set": edited.editable_fields()})
+        assert collection.documents["s1"]["performance"]["entry_price"] == 99.0
+
+        # Running runtime: the config changed, the position stays
+        await runtime.reload()
+        assert (position(runtime).size, position(runtime).entry_price) == (1.0, 99.0)
+
+        # Restarted runtime: the position comes back from Mongo, so the exit closes it
+        restarted = make_runtime(collection, service)
+        await restarted.reload()
+        assert (position(restarted).size, position(restarted).entry_price) == (1.0, 99.0)
+        service.price = 111.0
+        intent, = await restarted.evaluate({"BTC": 111.0}, 1)
+        assert (intent.reason, intent.reduce_only, intent.size) == ("exit", True, 1.0)
+        await restarted._submit(intent)
+        assert collection.documents["s1"]["performance"]["realized_pnl"] == 12.0
+
+    asyncio.run(scenario())
+
+def test_editable_fields_leave_identity_and_performance_alone():
+    fields = strategy().editable_fields()
+
+    assert not {"id", "created_at", "performance"} & fields.keys()
+    assert {"name", "coin", "status", "config"} <= fields.keys()
@@ -0,0 +1,57 @@
+"""
+WebSocket delta encoding: changes, nulls and removals
+"""
+
+import copy
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from subscriptions import apply_state_diff, state_diff  # noqa: E402
+
+ORDER = {"coin": "BTC", "price": 100.0, "size": 1.0, "oid": 1}
+
+CASES = {
+    "unchanged": ({"a": 1, "b": {"c": 2}}, {"a": 1, "b": {"c": 2}}),
+    "scalar change": ({"a": 1}, {"a": 2}),
+    "value becomes null": ({"price": 100.0, "coin": "BTC"}, {"price": None, "coin": "BTC"}),
+    "null becomes a value": ({"price": None}, {"price": 101.0}),
+    "key added as null": ({"coin": "BTC"}, {"coin": "BTC", "liquidation_price": None}),
+    "top-level removal": ({"a": 1, "b": 2}, {"a": 1}),
+    "nested removal": ({"orders": {"1": ORDER, "2": {**ORDER, "oid": 2}}}, {"orders": {"1": ORDER}}),
+    "nested null next to removal": (
+        {"positions": {"BTC": {"size": 1.0, "liq": 90.0}, "ETH": {"size": 2.0, "liq": 1.0}}},
+        {"positions": {"BTC": {"size": 1.0, "liq": None}}},
+    ),
+    "dict replaced by scalar": ({"a": {"b": 1}}, {"a": None}),
+    "scalar replaced by dict": ({"a": None}, {"a": {"b": 1}}),
+    "everything removed": ({"1": ORDER, "2": ORDER}, {}),
+}
+
+@pytest.mark.parametrize("old, new", CASES.values(), ids=CASES.keys())
+def test_round_trip(old, new):
+    original = copy.deepcopy(old)
+    changes, removed = state_diff(old, new)
+
+    assert apply_state_diff(old, changes, removed) == new
+    assert old == original  # Clients keep their copy until the delta applies
+
+def test_equal_states_give_an_empty_delta():
+    assert state_diff({"a": {"b": None}}, {"a": {"b": None}}) == ({}, [])
+
+def test_null_is_a_value_not_a_removal():
+    changes, removed = state_diff({"price": 100.0}, {"price": None})
+
+    assert (changes, removed) == ({"price": None}, [])
+
+def test_removals_are_key_paths():
+    old = {"positions": {"BTC": {"size": 1.0}, "ETH": {"size": 2.0}}, "account_value": 10.0}
+    new = {"positions": {"BTC": {"size": 1.5}}}
+
+    changes, removed = state_diff(old, new)
+
+    assert changes == {"positions": {"BTC": {"size": 1.5}}}
+    assert sorted(removed) == [["account_value"], ["positions", "ETH"]]
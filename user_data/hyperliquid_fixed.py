@@ -4,6 +4,7 @@ Based on working implementation from Hypertrader-1.5
 """
 
 import logging
+import numpy as np
 import requests
 import json
 from datetime import datetime, timedelta
@@ -31,6 +32,10 @@ class HyperliquidFixed(OriginalHyperliquid):
         # Use testnet or mainnet based on sandbox setting
         self.hyperliquid_api_url = self.testnet_api_url if self._api.sandbox else self.api_url
         
+        # One pooled session, so polling reuses its connection instead of a new TLS handshake per call
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+        
         logger.info(f"HyperliquidFixed initialized with API: {self.hyperliquid_api_url}")
 
     def _make_hyperliquid_request(self, request_type: str, params: Optional[dict] = None) -> Optional[dict]:
@@ -40,10 +45,9 @@ class HyperliquidFixed(OriginalHyperliquid):
             if params:
                 payload.update(params)
                 
-            response = requests.post(
+            response = self.session.post(
                 self.hyperliquid_api_url,
                 json=payload,
-                headers={"Content-Type": "application/json"},
                 timeout=10
             )
             
@@ -71,25 +75,38 @@ class HyperliquidFixed(OriginalHyperliquid):
                 logger.error("Failed to fetch mids data from Hyperliquid")
                 return super().get_tickers(symbols, cached)  # Fallback to original
             
-            # Get meta information for volume and other data
-            meta_data = self._make_hyperliquid_request("meta")
-            if not meta_data:
-                logger.warning("Failed to fetch meta data from Hyperliquid")
-                meta_data = {"universe": []}
+            # Universe plus 24h asset contexts (prevDayPx, dayNtlVlm) in one request
+            ctx_data = self._make_hyperliquid_request("metaAndAssetCtxs")
+            if ctx_data and len(ctx_data) == 2:
+                universe, asset_ctxs = ctx_data[0].get("universe", []), ctx_data[1]
+            else:
+                logger.warning("Failed to fetch asset contexts from Hyperliquid")
+                universe, asset_ctxs = [], []
+            
+            # Decode every numeric column in one NumPy call instead of float() per field
+            coins = [asset.get("name", "") for asset in universe]
+            prices = np.array([mids_data.get(coin) for coin in coins], dtype=np.float64)
+            prev_prices = np.array([ctx.get("prevDayPx") for ctx in asset_ctxs], dtype=np.float64)
+            volumes = np.array([ctx.get("dayNtlVlm") for ctx in asset_ctxs], dtype=np.float64)
+            if len(prev_prices) != len(prices):
+                prev_prices = np.full_like(prices, np.nan)
+                volumes = np.full_like(prices, np.nan)
+            
+            prev_prices = np.where(prev_prices > 0, prev_prices, prices)
+            volumes = np.where(np.isnan(volumes), prices * 1000000, volumes)  # Approximate when missing
+            with np.errstate(divide="ignore", invalid="ignore"):
+                changes = np.where(prev_prices > 0, (prices - prev_prices) / prev_prices * 100, 0.0)
+            
+            now = datetime.utcnow()
+            timestamp = int(now.timestamp() * 1000)
             
             # Build tickers dictionary
             tickers = {}
-            
-            # Process each asset in the universe
-            universe = meta_data.get("universe", [])
-            for asset in universe:
-                coin = asset.get("name", "")
-                if not coin:
-                    continue
-                    
-                # Get current price from mids
-                current_price = float(mids_data.get(coin, 0))
-                if current_price <= 0:
+            for coin, current_price, prev_price, change_24h, volume in zip(
+                coins, prices.tolist(), prev_prices.tolist(), changes.tolist(), volumes.tolist()
+            ):
+                # Skip assets without a current price
+                if not coin or not current_price > 0:
                     continue
                 
                 # Create Freqtrade-compatible symbol
@@ -101,23 +118,13 @@ class HyperliquidFixed(OriginalHyperliquid):
                 
                 # Calculate bid/ask spread (approximate 0.1% spread)
                 spread = current_price * 0.001
-                bid = current_price - spread
-                ask = current_price + spread
-                
-                # Get 24h data if available
-                prev_day_px = asset.get("prevDayPx", "0")
-                try:
-                    prev_price = float(prev_day_px) if prev_day_px else current_price
-                    change_24h = ((current_price - prev_price) / prev_price * 100) if prev_price > 0 else 0
-                except:
-                    change_24h = 0
                 
                 # Build ticker in Freqtrade format
                 tickers[symbol] = {
                     'symbol': symbol,
                     'last': current_price,
-                    'bid': bid,
-                    'ask': ask,
+                    'bid': current_price - spread,
+                    'ask': current_price + spread,
                     'high': current_price * 1.02,  # Approximate
                     'low': current_price * 0.98,   # Approximate  
                     'open': prev_price,
@@ -125,10 +132,10 @@ class HyperliquidFixed(OriginalHyperliquid):
                     'change': current_price - prev_price,
                     'percentage': change_24h,
                     'average': current_price,
-                    'quoteVolume': float(asset.get("volume24h", current_price * 1000000)),  # Approximate
-                    'baseVolume': float(asset.get("volume24h", 1000000)),  # Approximate
-                    'timestamp': int(datetime.utcnow().timestamp() * 1000),
-                    'datetime': datetime.utcnow().isoformat(),
+                    'quoteVolume': volume,
+                    'baseVolume': volume / current_price,
+                    'timestamp': timestamp,
+                    'datetime': now.isoformat(),
                     'vwap': current_price,
                 }
             